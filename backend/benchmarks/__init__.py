@@ -0,0 +1,6 @@
+"""Benchmarks measuring the performance of the flaskr app.
+
+Each module is run from the backend folder, e.g.:
+
+Usage: python -m benchmarks.quiz_selection
+"""
@@ -0,0 +1,649 @@
+"""Load test of every endpoint against a seeded synthetic dataset.
+
+Seeds an empty db with a synthetic dataset of the given size and then drives
+every route, first one request at a time through the flask test client and
+then concurrently through a real WSGI server listening on localhost. For
+each route it reports requests per second, p50 and p99 latency and SQL
+statements per request, the latter read from the app's own metrics. Results
+are written as json so runs can be compared for regressions.
+
+By default the dataset is seeded into a fresh sqlite file in a temporary
+folder. Passing --database runs against another db, such as a local
+postgresql, which must be empty. Requests needing other data first, such as
+deleting a question or answering a quiz session, are set up before each
+route is timed, so only the route itself is measured.
+
+Usage: python -m benchmarks.endpoints
+       python -m benchmarks.endpoints --questions 1000000 --output run.json
+       python -m benchmarks.endpoints --database postgresql://localhost/bench
+
+Attributes:
+    QUESTIONS: An int representing the default number of questions seeded
+    CATEGORIES: An int representing the default number of categories seeded
+    USERS: An int representing the default number of users seeded
+    REQUESTS: An int representing the default number of timed requests per
+        route and driver
+    CONCURRENCY: An int representing the default number of concurrent
+        clients of the WSGI server
+    SEED_BATCH_SIZE: An int representing how many rows are inserted at a
+        time while seeding
+    DELETE_BATCH_SIZE: An int representing how many questions each batch
+        delete request deletes
+    WORDS: A tuple of strs representing the words questions are made of,
+        which are also used as search terms
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from werkzeug.serving import make_server
+
+from flaskr import create_app
+from flaskr.bulk_import import insert_batch
+from flaskr.migrations import upgrade_db
+from models import Category, Question, User, db
+
+QUESTIONS = 10_000
+CATEGORIES = 200
+USERS = 100_000
+REQUESTS = 100
+CONCURRENCY = 8
+SEED_BATCH_SIZE = 10_000
+DELETE_BATCH_SIZE = 10
+WORDS = (
+    "actor",
+    "bridge",
+    "capital",
+    "dynasty",
+    "element",
+    "fossil",
+    "glacier",
+    "harbor",
+    "island",
+    "jazz",
+    "kingdom",
+    "lunar",
+    "mountain",
+    "novel",
+    "ocean",
+    "planet",
+)
+
+
+def seed(questions, categories, users, reserve):
+    """Migrates an empty db and fills it with a synthetic dataset.
+
+    Args:
+        questions: An int representing how many questions to seed
+        categories: An int representing how many categories to seed
+        users: An int representing how many users to seed
+        reserve: An int representing how many extra questions to seed for
+            the delete endpoints to delete
+
+    Returns:
+        dataset: A dict representing the size of the dataset, along with an
+            iterator over the ids of the questions reserved for deletion and
+            a lock guarding it
+    """
+    upgrade_db()
+
+    if db.session.query(Question.id).first() is not None:
+        raise RuntimeError("The db to benchmark must be empty")
+
+    rng = random.Random(0)
+    db.session.execute(
+        Category.__table__.insert().values(
+            [{"name": f"Category {i}"} for i in range(1, categories + 1)]
+        )
+    )
+    db.session.commit()
+
+    for start in range(0, questions + reserve, SEED_BATCH_SIZE):
+        insert_batch(
+            [
+                {
+                    "question": " ".join(rng.choices(WORDS, k=8)) + "?",
+                    "answer": rng.choice(WORDS),
+                    "category_id": rng.randint(1, categories),
+                    "rating": rng.randint(1, 5),
+                    "difficulty": rng.randint(1, 5),
+                }
+                for _ in range(
+                    start, min(start + SEED_BATCH_SIZE, questions + reserve)
+                )
+            ]
+        )
+
+    for start in range(0, users, SEED_BATCH_SIZE):
+        db.session.execute(
+            User.__table__.insert(),
+            [
+                {"username": f"user{i}", "score": rng.randint(0, 10_000)}
+                for i in range(start, min(start + SEED_BATCH_SIZE, users))
+            ],
+        )
+        db.session.commit()
+
+    dataset = {
+        "questions": questions,
+        "categories": categories,
+        "users": users,
+        "reserved": iter(range(questions + 1, questions + reserve + 1)),
+        "lock": threading.Lock(),
+    }
+
+    return dataset
+
+
+def take_reserved(dataset, count):
+    """Takes the ids of questions reserved for deletion.
+
+    Args:
+        dataset: A dict returned by seed
+        count: An int representing how many ids to take
+
+    Returns:
+        A list of ints representing question ids not yet deleted
+    """
+    with dataset["lock"]:
+        return [next(dataset["reserved"]) for _ in range(count)]
+
+
+def build_scenarios():
+    """Builds a request for every route of the api.
+
+    Each scenario is a function taking a random.Random object, the dataset
+    and a function sending a request, which it may use to set up data the
+    request needs, and returning the request to time as a tuple of the http
+    method, path and a dict holding its json, form or raw data.
+
+    Returns:
+        scenarios: A dict mapping the name of a route handler, followed by
+            the kind of request if the route serves several, to its scenario
+    """
+
+    def question_id(rng, dataset):
+        return rng.randint(1, dataset["questions"])
+
+    def category_id(rng, dataset):
+        return rng.randint(1, dataset["categories"])
+
+    def user_id(rng, dataset):
+        return rng.randint(1, dataset["users"])
+
+    def create_session(rng, dataset, send):
+        _, body = send(
+            "POST",
+            "/quizzes/sessions",
+            {"json": {"quiz_category_id": category_id(rng, dataset)}},
+        )
+        return json.loads(body)["session_id"]
+
+    def import_rows(rng, dataset):
+        rows = [
+            {
+                "question": " ".join(rng.choices(WORDS, k=8)) + "?",
+                "answer": rng.choice(WORDS),
+                "category_id": category_id(rng, dataset),
+                "rating": 3,
+                "difficulty": 3,
+            }
+            for _ in range(10)
+        ]
+        return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+    scenarios = {
+        "get_questions": lambda rng, dataset, send: (
+            "GET",
+            f"/questions?page={rng.randint(1, 5)}",
+            {},
+        ),
+        "create_question (search)": lambda rng, dataset, send: (
+            "POST",
+            "/questions",
+            {"json": {"search_term": rng.choice(WORDS)}},
+        ),
+        "create_question": lambda rng, dataset, send: (
+            "POST",
+            "/questions",
+            {
+                "json": {
+                    "question": " ".join(rng.choices(WORDS, k=8)) + "?",
+                    "answer": rng.choice(WORDS),
+                    "category_id": category_id(rng, dataset),
+                    "rating": 3,
+                    "difficulty": 3,
+                }
+            },
+        ),
+        "import_questions_upload": lambda rng, dataset, send: (
+            "POST",
+            "/questions/import",
+            {
+                "data": import_rows(rng, dataset),
+                "content_type": "application/x-ndjson",
+            },
+        ),
+        "export_questions_download": lambda rng, dataset, send: (
+            "GET",
+            f"/questions/export?category_id={category_id(rng, dataset)}",
+            {},
+        ),
+        "patch_question_rating": lambda rng, dataset, send: (
+            "PATCH",
+            f"/questions/{question_id(rng, dataset)}",
+            {"json": {"rating": rng.randint(1, 5)}},
+        ),
+        "delete_question": lambda rng, dataset, send: (
+            "DELETE",
+            f"/questions/{take_reserved(dataset, 1)[0]}",
+            {},
+        ),
+        "patch_question_ratings": lambda rng, dataset, send: (
+            "PATCH",
+            "/questions/batch",
+            {
+                "json": {
+                    "ratings": [
+                        {
+                            "id": question_id(rng, dataset),
+                            "rating": rng.randint(1, 5),
+                        }
+                        for _ in range(DELETE_BATCH_SIZE)
+                    ]
+                }
+            },
+        ),
+        "delete_questions": lambda rng, dataset, send: (
+            "DELETE",
+            "/questions/batch",
+            {
+                "json": {
+                    "question_ids": take_reserved(dataset, DELETE_BATCH_SIZE)
+                }
+            },
+        ),
+        "get_categories": lambda rng, dataset, send: (
+            "GET",
+            "/categories",
+            {},
+        ),
+        "create_category": lambda rng, dataset, send: (
+            "POST",
+            "/categories",
+            {"form": {"name": f"Category {rng.getrandbits(64):x}"}},
+        ),
+        "get_category_questions": lambda rng, dataset, send: (
+            "GET",
+            f"/categories/{category_id(rng, dataset)}/questions",
+            {},
+        ),
+        "get_stats": lambda rng, dataset, send: ("GET", "/stats", {}),
+        "create_quiz": lambda rng, dataset, send: (
+            "POST",
+            "/quizzes",
+            {
+                "json": {
+                    "quiz_category_id": category_id(rng, dataset),
+                    "previous_question_ids": [],
+                }
+            },
+        ),
+        "create_quiz_session": lambda rng, dataset, send: (
+            "POST",
+            "/quizzes/sessions",
+            {"json": {"quiz_category_id": category_id(rng, dataset)}},
+        ),
+        "next_quiz_question": lambda rng, dataset, send: (
+            "POST",
+            f"/quizzes/sessions/{create_session(rng, dataset, send)}/next",
+            {},
+        ),
+        "delete_quiz_session": lambda rng, dataset, send: (
+            "DELETE",
+            f"/quizzes/sessions/{create_session(rng, dataset, send)}",
+            {},
+        ),
+        "get_users": lambda rng, dataset, send: ("GET", "/users", {}),
+        "create_user": lambda rng, dataset, send: (
+            "POST",
+            "/users",
+            {"json": {"username": f"user{rng.getrandbits(64):x}"}},
+        ),
+        "patch_user_score": lambda rng, dataset, send: (
+            "PATCH",
+            f"/users/{user_id(rng, dataset)}",
+            {"json": {"score": rng.randint(1, 10)}},
+        ),
+        "get_leaderboard": lambda rng, dataset, send: (
+            "GET",
+            "/leaderboard",
+            {},
+        ),
+        "get_user_rank": lambda rng, dataset, send: (
+            "GET",
+            f"/leaderboard/{user_id(rng, dataset)}",
+            {},
+        ),
+        "get_metrics": lambda rng, dataset, send: ("GET", "/metrics", {}),
+        "get_db_health": lambda rng, dataset, send: (
+            "GET",
+            "/health/db",
+            {},
+        ),
+        "get_cache_health": lambda rng, dataset, send: (
+            "GET",
+            "/health/cache",
+            {},
+        ),
+    }
+
+    return scenarios
+
+
+def test_client_sender(app):
+    """Builds a function sending requests through the flask test client.
+
+    Args:
+        app: A flask Flask object representing the app
+
+    Returns:
+        send: A function taking the method, path and options of a request
+            and returning its status code and body
+    """
+    client = app.test_client()
+
+    def send(method, path, options):
+        response = client.open(
+            path,
+            method=method,
+            json=options.get("json"),
+            data=options.get("form", options.get("data")),
+            content_type=options.get("content_type"),
+        )
+        return response.status_code, response.get_data()
+
+    return send
+
+
+def wsgi_sender(port):
+    """Builds a function sending requests to a WSGI server on localhost.
+
+    Each thread sending requests uses its own connection.
+
+    Args:
+        port: An int representing the port the server listens on
+
+    Returns:
+        send: A function taking the method, path and options of a request
+            and returning its status code and body
+    """
+    local = threading.local()
+
+    def send(method, path, options):
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection("127.0.0.1", port)
+
+        headers = {}
+        body = options.get("data")
+
+        if "json" in options:
+            body = json.dumps(options["json"]).encode()
+            headers["Content-Type"] = "application/json"
+        elif "form" in options:
+            body = urlencode(options["form"]).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif "content_type" in options:
+            headers["Content-Type"] = options["content_type"]
+
+        local.connection.request(method, path, body=body, headers=headers)
+        response = local.connection.getresponse()
+
+        return response.status, response.read()
+
+    return send
+
+
+def sql_statements(metrics, endpoint):
+    """Reads the statements the app has counted for a route so far.
+
+    Args:
+        metrics: A Metrics object holding the metrics of the app
+        endpoint: A str representing the name of the route handler
+
+    Returns:
+        A tuple of ints representing the number of statements and requests
+    """
+    with metrics.lock:
+        histogram = metrics.statements.get(endpoint)
+
+        if histogram is None:
+            return 0, 0
+
+        return histogram.total, histogram.count
+
+
+def run_scenario(send, metrics, endpoint, dataset, requests, concurrency):
+    """Times the requests of a single route.
+
+    The requests are built, along with anything they need set up, and a
+    warm-up request is sent before the timed requests are sent.
+
+    Args:
+        send: A function sending a request, as built by a sender
+        metrics: A Metrics object holding the metrics of the app
+        endpoint: A str representing the name of the scenario
+        dataset: A dict returned by seed
+        requests: An int representing how many requests to time
+        concurrency: An int representing how many requests are sent at once
+
+    Returns:
+        A dict representing the summary of the route's requests
+    """
+    rng = random.Random(endpoint)
+    scenario = build_scenarios()[endpoint]
+    specs = [scenario(rng, dataset, send) for _ in range(requests + 1)]
+    send(*specs.pop())
+    route = endpoint.partition(" ")[0]
+    statements, _ = sql_statements(metrics, route)
+
+    def timed(spec):
+        start = time.perf_counter()
+        status, _ = send(*spec)
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(timed, specs))
+
+    seconds = time.perf_counter() - start
+    latencies, statuses = zip(*timings)
+
+    return summarize(
+        latencies,
+        statuses,
+        seconds,
+        sql_statements(metrics, route)[0] - statements,
+    )
+
+
+def summarize(latencies, statuses, seconds, statements):
+    """Summarizes the timed requests of a route.
+
+    Args:
+        latencies: A list of floats representing request latencies in seconds
+        statuses: A list of ints representing the status codes
+        seconds: A float representing the seconds taken by all requests
+        statements: An int representing the SQL statements they executed
+
+    Returns:
+        summary: A dict representing the throughput, latency percentiles,
+            errors and SQL statements per request of the route
+    """
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    summary = {
+        "requests": len(latencies),
+        "errors": sum(status >= 400 for status in statuses),
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "sql_statements_per_request": round(statements / len(latencies), 2),
+    }
+
+    return summary
+
+
+def run_driver(send, metrics, dataset, requests, concurrency):
+    """Times every route through a single driver.
+
+    Args:
+        send: A function sending a request, as built by a sender
+        metrics: A Metrics object holding the metrics of the app
+        dataset: A dict returned by seed
+        requests: An int representing how many requests to time per route
+        concurrency: An int representing how many requests are sent at once
+
+    Returns:
+        results: A dict mapping the name of a route handler to its summary
+    """
+    results = {}
+
+    for endpoint in build_scenarios():
+        results[endpoint] = run_scenario(
+            send, metrics, endpoint, dataset, requests, concurrency
+        )
+        print(
+            f"{endpoint:>26} {results[endpoint]['requests_per_second']:>9} "
+            f"{results[endpoint]['p50_ms']:>9} "
+            f"{results[endpoint]['p99_ms']:>9} "
+            f"{results[endpoint]['sql_statements_per_request']:>6} "
+            f"{results[endpoint]['errors']:>6}",
+            file=sys.stderr,
+        )
+
+    return results
+
+
+def parse_args(argv):
+    """Parses the command line arguments of the benchmark.
+
+    Args:
+        argv: A list of strs representing the arguments
+
+    Returns:
+        args: An argparse.Namespace object holding the parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.endpoints")
+    parser.add_argument("--questions", type=int, default=QUESTIONS)
+    parser.add_argument("--categories", type=int, default=CATEGORIES)
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument(
+        "--database", help="an empty db, defaults to a new sqlite file"
+    )
+    parser.add_argument(
+        "--output", default="-", help="where to write the json results"
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    """Seeds the dataset, runs both drivers and writes the results.
+
+    Args:
+        argv: A list of strs representing the command line arguments
+    """
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        database = args.database or (
+            f"sqlite:///{os.path.join(folder, 'benchmark.db')}"
+        )
+        app = create_app({"DATABASE_PATH": database})
+        # Every timed request, and its warm-up, of the two delete routes
+        # needs questions of its own to delete.
+        reserve = 2 * (args.requests + 1) * (1 + DELETE_BATCH_SIZE)
+
+        with app.app_context():
+            start = time.perf_counter()
+            dataset = seed(
+                args.questions, args.categories, args.users, reserve
+            )
+            seed_seconds = time.perf_counter() - start
+            dialect = db.engine.dialect.name
+
+        print(f"Seeded in {seed_seconds:.1f}s", file=sys.stderr)
+        header = (
+            f"{'endpoint':>26} {'req/s':>9} {'p50 (ms)':>9} "
+            f"{'p99 (ms)':>9} {'sql':>6} {'errors':>6}"
+        )
+
+        print("test client", file=sys.stderr)
+        print(header, file=sys.stderr)
+        test_client = run_driver(
+            test_client_sender(app),
+            app.config["METRICS"],
+            dataset,
+            args.requests,
+            1,
+        )
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        try:
+            print(f"wsgi server, {args.concurrency} clients", file=sys.stderr)
+            print(header, file=sys.stderr)
+            wsgi = run_driver(
+                wsgi_sender(server.port),
+                app.config["METRICS"],
+                dataset,
+                args.requests,
+                args.concurrency,
+            )
+        finally:
+            server.shutdown()
+
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    report = {
+        "database": dialect,
+        "dataset": {
+            "questions": args.questions,
+            "categories": args.categories,
+            "users": args.users,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "results": {"test_client": test_client, "wsgi": wsgi},
+    }
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,121 @@
+"""Benchmark of encoding large question listings as json responses.
+
+Builds a payload shaped like a GET /questions response holding many questions
+and times turning it into a response with flask's stdlib json provider and
+with the app's provider, both with default and compact output. The app's
+provider only differs from the stdlib one when orjson is installed. No db is
+needed.
+
+Usage: python -m benchmarks.json_encoding [sizes...]
+
+Attributes:
+    SIZES: A tuple of ints representing the numbers of questions per payload
+    QUESTIONS: An int representing roughly how many questions to encode per
+        size and provider
+"""
+
+import sys
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from flaskr import create_app
+from flaskr.json_provider import FastJSONProvider, orjson
+from flaskr.pagination import format_rows
+
+SIZES = (10, 1_000, 100_000)
+QUESTIONS = 200_000
+
+
+def build_payload(size):
+    """Builds a listing response payload holding a number of questions.
+
+    Args:
+        size: An int representing how many questions the payload holds
+
+    Returns:
+        A dict shaped like the body of a GET /questions response
+    """
+    rows = [
+        (
+            question_id,
+            f"What is the answer to trivia question number {question_id}?",
+            f"Answer {question_id}",
+            question_id % 6 + 1,
+            question_id % 5 + 1,
+            question_id % 5 + 1,
+        )
+        for question_id in range(1, size + 1)
+    ]
+
+    return {
+        "success": True,
+        "questions": format_rows(rows),
+        "total_questions": size,
+        "current_category_id": None,
+        "categories": {str(i): f"Category {i}" for i in range(1, 7)},
+        "next_cursor": None,
+    }
+
+
+def throughput(provider, payload, size):
+    """Times repeated encodings of a payload into a response.
+
+    Args:
+        provider: A flask JSONProvider object to encode with
+        payload: A dict representing the response body
+        size: An int representing how many questions the payload holds
+
+    Returns:
+        A tuple of floats representing responses and megabytes per second
+    """
+    passes = max(1, QUESTIONS // size)
+    encoded = 0
+    start = time.perf_counter()
+
+    for _ in range(passes):
+        encoded += len(provider.response(payload).get_data())
+
+    seconds = time.perf_counter() - start
+    return passes / seconds, encoded / seconds / 1_000_000
+
+
+def main(sizes):
+    """Runs the benchmark and prints a table of encoding throughput.
+
+    Args:
+        sizes: A list of ints representing the numbers of questions per
+            payload
+    """
+    app = create_app()
+    providers = {}
+
+    for compact in (False, True):
+        for name, provider_class in (
+            ("stdlib", DefaultJSONProvider),
+            ("app", FastJSONProvider),
+        ):
+            provider = provider_class(app)
+            provider.compact = compact
+            provider.sort_keys = not compact
+            providers[f"{name}{' compact' if compact else ''}"] = provider
+
+    print(f"orjson is {'not ' if orjson is None else ''}installed")
+    print(
+        f"{'questions':>10} {'provider':>15} {'responses/s':>12} "
+        f"{'MB/s':>8}"
+    )
+
+    for size in sizes:
+        payload = build_payload(size)
+
+        for name, provider in providers.items():
+            responses, megabytes = throughput(provider, payload, size)
+            print(
+                f"{size:>10} {name:>15} {responses:>12,.1f} "
+                f"{megabytes:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
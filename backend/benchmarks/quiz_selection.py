@@ -0,0 +1,114 @@
+"""Benchmark of per-turn quiz question selection as a category grows.
+
+Compares the selection engine used by POST /quizzes against materializing the
+remaining candidates and picking one of them, which is what loading every
+eligible question with .all() does at a minimum. The engine is timed both
+for plain quizzes and for quizzes limited to a range of difficulties and
+biased by rating. Both run against in-memory ids so that only the cost of
+selection is measured; the engine additionally does a single primary key
+lookup per turn which does not depend on the size of the category.
+
+Usage: python -m benchmarks.quiz_selection [sizes...]
+
+Attributes:
+    SIZES: A tuple of ints representing the category sizes to benchmark
+    TURNS: An int representing how many quiz turns to time per size
+    QUIZ_LENGTH: An int representing how many questions are asked per quiz
+    DIFFICULTY_RANGE: A range of ints representing the difficulties that
+        weighted quizzes are limited to
+    RATING_BIAS: A float representing the rating bias of weighted quizzes
+"""
+
+import random
+import sys
+import time
+
+from flaskr.selection import QuestionPool
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+TURNS = 1_000
+QUIZ_LENGTH = 10
+DIFFICULTY_RANGE = range(2, 5)
+RATING_BIAS = 1.0
+
+
+def materialized_choice(ids, exclude):
+    """Picks a random id by first building the list of remaining ids.
+
+    Args:
+        ids: A list of ints representing the ids in the category
+        exclude: A set of ints representing ids already asked
+
+    Returns:
+        An int representing a random id, or None if every id is excluded
+    """
+    remaining = [id_ for id_ in ids if id_ not in exclude]
+
+    if len(remaining) == 0:
+        return None
+
+    return random.choice(remaining)
+
+
+def time_turns(choose, turns):
+    """Times a number of quiz turns.
+
+    Args:
+        choose: A function taking a set of excluded ids and returning an id
+        turns: An int representing how many turns to time
+
+    Returns:
+        A float representing the mean latency of a turn in microseconds
+    """
+    exclude = set()
+    start = time.perf_counter()
+
+    for _ in range(turns):
+        if len(exclude) == QUIZ_LENGTH:
+            exclude = set()
+        exclude.add(choose(exclude))
+
+    return (time.perf_counter() - start) / turns * 1_000_000
+
+
+def main(sizes):
+    """Runs the benchmark and prints a table of per-turn latencies.
+
+    Args:
+        sizes: A list of ints representing the category sizes to benchmark
+    """
+    print(
+        f"{'questions':>10} {'engine (us)':>12} {'weighted (us)':>14} "
+        f"{'materialized (us)':>18}"
+    )
+
+    for size in sizes:
+        ids = list(range(1, size + 1))
+        questions = [
+            (id_, random.randint(1, 5), random.randint(1, 5)) for id_ in ids
+        ]
+        pool = QuestionPool(
+            loader=lambda category_id, questions=questions: questions
+        )
+        pool.get(1)
+
+        engine = time_turns(lambda exclude: pool.choose(1, exclude), TURNS)
+        weighted = time_turns(
+            lambda exclude: pool.choose(
+                1, exclude, DIFFICULTY_RANGE, RATING_BIAS
+            ),
+            TURNS,
+        )
+        materialized = time_turns(
+            lambda exclude, ids=ids: materialized_choice(ids, exclude),
+            max(1, TURNS * 1_000 // size),
+        )
+
+        print(
+            f"{size:>10} {engine:>12.2f} {weighted:>14.2f} "
+            f"{materialized:>18.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,109 @@
+"""Benchmark of serializing question listings as the page size grows.
+
+Compares loading Question objects and calling .format() on each of them,
+which is how listings used to be built, against selecting only the listed
+columns as tuples and turning them straight into dicts, which is how
+paginate_questions builds them now. Each pass starts from an empty session,
+as a request does. The db at DATABASE_URL must already be migrated and hold
+at least as many questions as the largest size.
+
+Usage: python -m benchmarks.serialization [sizes...]
+
+Attributes:
+    SIZES: A tuple of ints representing the numbers of rows to serialize
+    ROWS: An int representing roughly how many rows to time per size and path
+"""
+
+import sys
+import time
+
+from flaskr import create_app
+from flaskr.pagination import format_rows, select_columns
+from models import Question, db
+
+SIZES = (10, 100, 1_000)
+ROWS = 100_000
+
+
+def orm_path(size):
+    """Serializes questions by loading and formatting Question objects.
+
+    Args:
+        size: An int representing how many questions to serialize
+
+    Returns:
+        A list of dicts representing the questions
+    """
+    questions = Question.query.order_by(Question.id).limit(size).all()
+    return [question.format() for question in questions]
+
+
+def column_path(size):
+    """Serializes questions by selecting their columns as tuples.
+
+    Args:
+        size: An int representing how many questions to serialize
+
+    Returns:
+        A list of dicts representing the questions
+    """
+    query = select_columns(Question.query.order_by(Question.id))
+    return format_rows(query.limit(size).all())
+
+
+def rows_per_second(serialize, size):
+    """Times repeated serializations of a number of questions.
+
+    Args:
+        serialize: A function taking a size and returning a list of dicts
+        size: An int representing how many questions to serialize per pass
+
+    Returns:
+        A float representing how many questions were serialized per second
+    """
+    passes = max(1, ROWS // size)
+    rows = 0
+    start = time.perf_counter()
+
+    for _ in range(passes):
+        rows += len(serialize(size))
+        db.session.remove()
+
+    return rows / (time.perf_counter() - start)
+
+
+def main(sizes):
+    """Runs the benchmark and prints a table of serialization throughput.
+
+    Args:
+        sizes: A list of ints representing the numbers of rows to serialize
+    """
+    app = create_app()
+
+    with app.app_context():
+        total = Question.query.count()
+
+        if orm_path(1) != column_path(1):
+            raise RuntimeError("The serialization paths disagree")
+
+        print(
+            f"{'rows':>6} {'format() (rows/s)':>18} "
+            f"{'columns (rows/s)':>17} {'speedup':>8}"
+        )
+
+        for size in sizes:
+            if size > total:
+                print(f"{size:>6} skipped, the db has {total} questions")
+                continue
+
+            orm = rows_per_second(orm_path, size)
+            columns = rows_per_second(column_path, size)
+
+            print(
+                f"{size:>6} {orm:>18,.0f} {columns:>17,.0f} "
+                f"{columns / orm:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,228 @@
+"""Benchmark of quiz turns served by the sync app and by the gevent mode.
+
+Each mode serves the app from a single process started in a fresh
+interpreter. The sync mode serves one request at a time, as a gunicorn sync
+worker does, while the gevent mode of flaskr.green serves every request in
+its own greenlet. An asyncio client then keeps many quiz turns, POST
+/quizzes, in flight at once and reports throughput and latency. The gevent
+mode only pulls ahead when requests wait on postgresql, so the db at
+DATABASE_URL should be a migrated postgresql holding questions. The gevent
+mode is skipped when gevent is not installed, see requirements-gevent.txt.
+
+Usage: python -m benchmarks.serving_modes [in_flight]
+
+Attributes:
+    IN_FLIGHT: An int representing the default number of quiz turns in
+        flight at once
+    TURNS: An int representing how many quiz turns to time per mode
+    MODES: A tuple of strs representing the serving modes to compare
+    SERVER: A str representing the script run by each server process
+"""
+
+import asyncio
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+IN_FLIGHT = 500
+TURNS = 5_000
+MODES = ("sync", "gevent")
+SERVER = """
+import sys
+
+mode, port = sys.argv[1], int(sys.argv[2])
+
+if mode == "gevent":
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    from gevent.pywsgi import WSGIServer
+
+    from flaskr.green import create_app
+
+    WSGIServer(("127.0.0.1", port), create_app(), log=None).serve_forever()
+else:
+    from werkzeug.serving import make_server
+
+    from flaskr import create_app
+
+    make_server("127.0.0.1", port, create_app()).serve_forever()
+"""
+
+
+def start_server(mode):
+    """Starts a server process for a mode and waits until it listens.
+
+    Args:
+        mode: A str representing the serving mode, one of MODES
+
+    Returns:
+        server: A subprocess.Popen object representing the server process
+        port: An int representing the port it listens on
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER, mode, str(port)],
+        cwd=backend,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return server, port
+        except ConnectionRefusedError:
+            time.sleep(0.1)
+
+    server.kill()
+    raise RuntimeError(f"The {mode} server did not start")
+
+
+def get_category_ids(port):
+    """Retrieves the ids of the categories to start quizzes in.
+
+    Args:
+        port: An int representing the port the server listens on
+
+    Returns:
+        A list of ints representing the category ids
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request("GET", "/categories")
+    categories = json.loads(connection.getresponse().read())["categories"]
+    connection.close()
+
+    return [int(category_id) for category_id in categories]
+
+
+async def quiz_turn(port, category_id):
+    """Sends a single quiz turn on a connection of its own.
+
+    Args:
+        port: An int representing the port the server listens on
+        category_id: An int representing the category of the quiz
+
+    Returns:
+        A tuple of a float representing the latency of the turn in seconds
+            and an int representing its status code, 0 if it failed
+    """
+    body = json.dumps(
+        {"quiz_category_id": category_id, "previous_question_ids": []}
+    ).encode()
+    start = time.perf_counter()
+
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            b"POST /quizzes HTTP/1.0\r\n"
+            b"Content-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        status = int(response.split(b" ", 2)[1])
+    except (OSError, IndexError, ValueError):
+        status = 0
+
+    return time.perf_counter() - start, status
+
+
+async def run_turns(port, category_ids, turns, in_flight):
+    """Sends quiz turns, keeping a number of them in flight at once.
+
+    Args:
+        port: An int representing the port the server listens on
+        category_ids: A list of ints representing the categories to use
+        turns: An int representing how many turns to send
+        in_flight: An int representing how many turns are sent at once
+
+    Returns:
+        A list of tuples of the latency and status code of each turn
+    """
+    rng = random.Random(0)
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def limited_turn():
+        async with semaphore:
+            return await quiz_turn(port, rng.choice(category_ids))
+
+    return await asyncio.gather(*(limited_turn() for _ in range(turns)))
+
+
+def time_mode(mode, in_flight):
+    """Times quiz turns against a server of a single mode.
+
+    Args:
+        mode: A str representing the serving mode, one of MODES
+        in_flight: An int representing how many turns are sent at once
+
+    Returns:
+        summary: A dict representing the throughput, latency and errors of
+            the turns
+    """
+    server, port = start_server(mode)
+
+    try:
+        category_ids = get_category_ids(port)
+        asyncio.run(run_turns(port, category_ids, in_flight, in_flight))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_turns(port, category_ids, TURNS, in_flight))
+        seconds = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for latency, _ in results)
+    summary = {
+        "turns_per_second": len(results) / seconds,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": sum(status != 200 for _, status in results),
+    }
+
+    return summary
+
+
+def main(in_flight):
+    """Runs the benchmark and prints a table of quiz turn throughput.
+
+    Args:
+        in_flight: An int representing how many turns are sent at once
+    """
+    print(f"{TURNS} quiz turns, {in_flight} in flight")
+    print(
+        f"{'mode':>7} {'turns/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+        f"{'errors':>7}"
+    )
+
+    for mode in MODES:
+        if mode == "gevent" and importlib.util.find_spec("gevent") is None:
+            print(f"{mode:>7} skipped, gevent is not installed")
+            continue
+
+        summary = time_mode(mode, in_flight)
+        print(
+            f"{mode:>7} {summary['turns_per_second']:>9.1f} "
+            f"{summary['p50_ms']:>9.1f} {summary['p99_ms']:>9.1f} "
+            f"{summary['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else IN_FLIGHT)
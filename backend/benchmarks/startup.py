@@ -0,0 +1,112 @@
+"""Benchmark of worker start-up, from importing the app to its first response.
+
+Each run starts a fresh interpreter, imports flaskr, builds the app with
+create_app and serves GET /categories through the test client. The eager mode
+additionally runs db.create_all() while building the app, which is what every
+import of flaskr used to do, so the two modes compare start-up before and
+after the app factory. The db at DATABASE_URL must already be migrated.
+
+Usage: python -m benchmarks.startup [runs]
+
+Attributes:
+    RUNS: An int representing how many fresh interpreters to time per mode
+    MODES: A tuple of strs representing the start-up modes to compare
+    WORKER: A str representing the script run by each fresh interpreter
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 10
+MODES = ("eager", "lazy")
+WORKER = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+
+from flaskr import create_app
+from models import db
+
+imported = time.perf_counter()
+app = create_app()
+
+if sys.argv[1] == "eager":
+    with app.app_context():
+        db.create_all()
+
+created = time.perf_counter()
+response = app.test_client().get("/categories")
+finished = time.perf_counter()
+
+print(
+    json.dumps(
+        {
+            "status": response.status_code,
+            "import": imported - start,
+            "create_app": created - imported,
+            "first_request": finished - created,
+            "total": finished - start,
+        }
+    )
+)
+"""
+
+
+def time_startup(mode):
+    """Times a single start-up in a fresh interpreter.
+
+    Args:
+        mode: A str representing the start-up mode, either eager or lazy
+
+    Returns:
+        timings: A dict mapping a start-up phase to its duration in seconds
+    """
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER, mode],
+        cwd=backend,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    timings = json.loads(result.stdout.splitlines()[-1])
+
+    if timings.pop("status") != 200:
+        raise RuntimeError(f"GET /categories failed in {mode} mode")
+
+    return timings
+
+
+def main(runs):
+    """Runs the benchmark and prints a table of median start-up latencies.
+
+    Args:
+        runs: An int representing how many start-ups to time per mode
+    """
+    print(
+        f"{'mode':>6} {'import (ms)':>12} {'create_app (ms)':>16} "
+        f"{'first request (ms)':>19} {'total (ms)':>11}"
+    )
+
+    for mode in MODES:
+        samples = [time_startup(mode) for _ in range(runs)]
+        medians = {
+            phase: statistics.median(sample[phase] for sample in samples)
+            * 1000
+            for phase in samples[0]
+        }
+
+        print(
+            f"{mode:>6} {medians['import']:>12.1f} "
+            f"{medians['create_app']:>16.1f} "
+            f"{medians['first_request']:>19.1f} {medians['total']:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
@@ -4,48 +4,240 @@ Users can add questions to the trivia database, view questions in the database,
 and play a trivia game using those questions
 
 Usage: flask run
+       flask migrate
+       flask check-indexes
+
+The app is built by create_app, which flask finds on its own when FLASK_APP
+is set to flaskr. Building the app does not connect to the db, the engine is
+created on first use and the schema is created with `flask migrate`.
 
 Attributes:
-    QUESTIONS_PER_PAGE: An int that is a global constant representing how many
-        questions to show on a page
-    app: A flask Flask object creating the flask app
+    LEADERBOARD_LIMIT: An int representing how many users the leaderboard
+        shows by default
+    MAX_LEADERBOARD_LIMIT: An int representing the most users the leaderboard
+        shows at once
+    MAX_BATCH_SIZE: An int representing the most questions a batch request
+        may change at once
+    api: A flask Blueprint object holding the routes of the app
 """
 
+import io
 import os
-import random
 
-from flask import Flask, abort, jsonify, request
+import click
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
-from models import Category, Question, User, setup_db
+from flaskr.bulk_export import MIMETYPES, export_questions
+from flaskr.bulk_import import (
+    FORMATS,
+    IMPORT_BATCH_SIZE,
+    VALUE_RANGE,
+    import_questions,
+)
+from flaskr.categories import CategoryCache, DbGeneration
+from flaskr.compression import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    compress_response,
+)
+from flaskr.http_cache import MAX_AGE, SHARED_MAX_AGE, conditional
+from flaskr.json_provider import FastJSONProvider
+from flaskr.leaderboard import Leaderboard
+from flaskr.metrics import (
+    CONTENT_TYPE,
+    SLOW_QUERY_SECONDS,
+    Metrics,
+    finish_request,
+    start_request,
+)
+from flaskr.migrations import check_indexes, upgrade_db
+from flaskr.pagination import decode_cursor, paginate_questions
+from flaskr.quiz_sessions import QUIZ_DECK_SIZE, MemorySessionStore
+from flaskr.replicas import (
+    CHECK_INTERVAL,
+    STICKY_SECONDS,
+    ReplicaSet,
+    read_only,
+    stick_to_primary,
+)
+from flaskr.response_cache import (
+    LruResponseCache,
+    cached_listing,
+    clear_pages,
+    evict_category,
+)
+from flaskr.scores import ScoreAggregator
+from flaskr.search import InvertedIndex, search_questions
+from flaskr.selection import MAX_RATING_BIAS, QuestionPool, choose_question
+from models import (
+    DB_PATH,
+    DIFFICULTIES,
+    REPLICA_PATHS,
+    Category,
+    CategoryStats,
+    Question,
+    User,
+    db,
+    setup_db,
+)
+
+LEADERBOARD_LIMIT = 10
+MAX_LEADERBOARD_LIMIT = 100
+MAX_BATCH_SIZE = 1000
+
+api = Blueprint("api", __name__, cli_group=None)
+
+
+def create_app(config=None):
+    """Creates and configures the flask app.
+
+    Args:
+        config: A dict of config values overriding the defaults, such as
+            DATABASE_PATH for the location of the db, DB_ENGINE_SETTINGS
+            for a dict of engine settings, JSON_COMPACT for unindented,
+            unsorted json responses, COMPRESSION_MIN_SIZE for the smallest
+            response compressed or DATABASE_REPLICAS for the locations of
+            read replicas
 
-QUESTIONS_PER_PAGE = 10
+    Every app keeps its own category map, quiz question pool, search index
+    and leaderboard, so apps built for different dbs share no state.
 
-app = Flask(__name__)
-setup_db(app)
-CORS(app)
+    Returns:
+        app: A flask Flask object representing the app
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config["DATABASE_PATH"] = DB_PATH
+    app.config["DB_ENGINE_SETTINGS"] = None
+    app.config["HTTP_CACHE_MAX_AGE"] = MAX_AGE
+    app.config["HTTP_CACHE_SHARED_MAX_AGE"] = SHARED_MAX_AGE
+    app.config["COMPRESSION_MIN_SIZE"] = COMPRESSION_MIN_SIZE
+    app.config["COMPRESSION_GZIP_LEVEL"] = COMPRESSION_GZIP_LEVEL
+    app.config["COMPRESSION_BROTLI_QUALITY"] = COMPRESSION_BROTLI_QUALITY
+    app.config["QUIZ_SESSION_STORE"] = MemorySessionStore()
+    app.config["CATEGORY_CACHE"] = CategoryCache(
+        generation=DbGeneration("categories")
+    )
+    app.config["QUESTION_POOL"] = QuestionPool()
+    app.config["SEARCH_INDEX"] = InvertedIndex()
+    app.config["LEADERBOARD"] = Leaderboard()
+    app.config["RESPONSE_CACHE"] = LruResponseCache()
+    app.config["SCORE_WRITE_BEHIND"] = bool(
+        os.environ.get("SCORE_WRITE_BEHIND")
+    )
+    app.config["SCORE_AGGREGATOR"] = None
+    app.config["JSON_COMPACT"] = bool(os.environ.get("JSON_COMPACT"))
+    app.config["METRICS"] = Metrics()
+    app.config["METRICS_SLOW_QUERY_SECONDS"] = SLOW_QUERY_SECONDS
+    app.config["DATABASE_REPLICAS"] = REPLICA_PATHS
+    app.config["REPLICA_CHECK_SECONDS"] = CHECK_INTERVAL
+    app.config["REPLICA_STICKY_SECONDS"] = STICKY_SECONDS
+    app.config["REPLICA_SET"] = None
+    app.config.update(config or {})
+
+    if app.config["JSON_COMPACT"]:
+        app.json.compact = True
+        app.json.sort_keys = False
+
+    setup_db(
+        app,
+        app.config["DATABASE_PATH"],
+        app.config["DB_ENGINE_SETTINGS"],
+        app.config["DATABASE_REPLICAS"],
+    )
+    CORS(app)
 
+    if app.config["DATABASE_REPLICAS"]:
+        app.config["REPLICA_SET"] = ReplicaSet(
+            app,
+            app.config["SQLALCHEMY_BINDS"],
+            app.config["REPLICA_CHECK_SECONDS"],
+        )
+    app.register_blueprint(api)
 
-def paginate_questions(questions, page):
-    """Retrieve questions for the current page only.
+    if app.config["SCORE_WRITE_BEHIND"]:
+        app.config["SCORE_AGGREGATOR"] = ScoreAggregator()
+        app.config["SCORE_AGGREGATOR"].start(app)
 
-    Args:
-        questions: A list of Question objects
-        page: An int representing the page number to retrieve questions for
+    return app
+
+
+def get_page_args():
+    """Retrieve the pagination parameters of the current request.
+
+    Returns:
+        page: An int representing the page number requested
+        after_id: An int representing the id of the last question seen, or
+            None if the request is not using a cursor
+    """
+    page = request.args.get("page", 1, type=int)
+    after_id = request.args.get("after_id", type=int)
+    cursor = request.args.get("cursor")
+
+    if cursor is not None:
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError:
+            abort(400)
+
+    return page, after_id
+
+
+def get_batch_ratings():
+    """Retrieve the ratings of a batch rating change in the current request.
 
     Returns:
-        A list of dicts representing questions for the given page
+        ratings: A dict mapping the id of each question to its new rating
     """
-    questions = [question.format() for question in questions]
-    start = (page - 1) * QUESTIONS_PER_PAGE
-    end = start + QUESTIONS_PER_PAGE
-    current_questions = questions[start:end]
+    try:
+
+        updates = request.json.get("ratings")
+
+    except AttributeError:
+        abort(400)
+
+    if not isinstance(updates, list) or not all(
+        isinstance(update, dict) for update in updates
+    ):
+        abort(400)
+
+    try:
+
+        ratings = {
+            int(update["id"]): int(update["rating"]) for update in updates
+        }
+
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+
+    if len(ratings) == 0 or len(ratings) > MAX_BATCH_SIZE:
+        abort(400)
+
+    if any(rating not in VALUE_RANGE for rating in ratings.values()):
+        abort(400)
+
+    return ratings
+
 
-    return current_questions
+@api.before_app_request
+def before_request():
+    """Starts recording the metrics of a request."""
+    start_request()
 
 
-@app.after_request
+@api.after_app_request
 def after_request(response):
     """Adds response headers after request.
 
@@ -65,37 +257,96 @@ def after_request(response):
     return response
 
 
-@app.route("/questions", methods=["GET"])
+@api.after_app_request
+def record_metrics(response):
+    """Records the latency and SQL statements of a request.
+
+    Args:
+        response: The response object the request was answered with
+
+    Returns:
+        response: The response object, unchanged
+    """
+    endpoint = "unmatched"
+
+    if request.endpoint is not None:
+        endpoint = request.endpoint.rpartition(".")[2]
+
+    finish_request(endpoint, request.method, response)
+
+    return response
+
+
+@api.after_app_request
+def remember_writes(response):
+    """Keeps a client that wrote reading from the primary db for a while.
+
+    Args:
+        response: The response object the request was answered with
+
+    Returns:
+        response: The response object, with a cookie set if the request
+            wrote to the db
+    """
+    response = stick_to_primary(response)
+
+    return response
+
+
+@api.after_app_request
+def compress(response):
+    """Compresses large response bodies the client accepts compressed.
+
+    Args:
+        response: The response object to compress
+
+    Returns:
+        response: The response object, compressed with gzip or brotli if it
+            is large enough
+    """
+    response = compress_response(response)
+
+    return response
+
+
+@api.route("/questions", methods=["GET"])
+@read_only
+@cached_listing
+@conditional("questions", "categories")
 def get_questions():
     """Route handler for endpoint showing questions for a given page.
 
     Returns:
         response: A json object representing questions for a given page
     """
-    questions = Question.query.order_by(Question.id).all()
-    page = request.args.get("page", 1, type=int)
-    current_questions = paginate_questions(questions, page)
+    questions = Question.query.order_by(Question.id)
+    page, after_id = get_page_args()
+    current_questions, next_cursor = paginate_questions(
+        questions, page, after_id
+    )
 
     if len(current_questions) == 0:
         abort(404)
 
-    categories = Category.query.order_by(Category.id).all()
-    categories = {category.id: category.name for category in categories}
+    total_questions = CategoryStats.total_questions()
+
+    categories = current_app.config["CATEGORY_CACHE"].get()
 
     response = jsonify(
         {
             "success": True,
             "questions": current_questions,
-            "total_questions": len(questions),
+            "total_questions": total_questions,
             "current_category_id": None,
             "categories": categories,
+            "next_cursor": next_cursor,
         }
     )
 
     return response
 
 
-@app.route("/questions", methods=["POST"])
+@api.route("/questions", methods=["POST"])
 def create_question():
     """Route handler for endpoint to create a question.
 
@@ -109,26 +360,17 @@ def create_question():
 
         if search_term is not None:
 
-            questions = (
-                Question.query.filter(
-                    Question.question.ilike(f"%{search_term}%")
-                )
-                .order_by(Question.id)
-                .all()
-            )
             page = request.args.get("page", 1, type=int)
-            current_questions = paginate_questions(questions, page)
-
-            categories = Category.query.order_by(Category.id).all()
-            categories = {
-                category.id: category.name for category in categories
-            }
+            current_questions, total_questions = search_questions(
+                search_term, page
+            )
+            categories = current_app.config["CATEGORY_CACHE"].get()
 
             response = jsonify(
                 {
                     "success": True,
                     "questions": current_questions,
-                    "total_questions": len(questions),
+                    "total_questions": total_questions,
                     "current_category_id": None,
                     "categories": categories,
                 }
@@ -145,6 +387,16 @@ def create_question():
             )
 
             question.insert()
+            evict_category(question.category_id)
+            current_app.config["QUESTION_POOL"].add(
+                question.id,
+                question.category_id,
+                question.difficulty,
+                question.rating,
+            )
+            current_app.config["SEARCH_INDEX"].add(
+                question.id, question.question
+            )
 
             response = jsonify(
                 {"success": True, "created_question_id": question.id}
@@ -156,7 +408,70 @@ def create_question():
     return response
 
 
-@app.route("/questions/<int:question_id>", methods=["PATCH"])
+@api.route("/questions/import", methods=["POST"])
+def import_questions_upload():
+    """Route handler for endpoint importing questions in bulk.
+
+    The request body is streamed, as NDJSON when the content type is
+    application/x-ndjson or as CSV with a header row when it is text/csv.
+
+    Returns:
+        response: A json object representing how many questions were
+            imported, the rows that were rejected and the throughput of
+            each batch
+    """
+    file_formats = {"application/x-ndjson": "ndjson", "text/csv": "csv"}
+    file_format = file_formats.get(request.mimetype)
+    batch_size = request.args.get("batch_size", IMPORT_BATCH_SIZE, type=int)
+
+    if file_format is None or batch_size < 1:
+        abort(400)
+
+    lines = io.TextIOWrapper(
+        request.stream,
+        encoding="utf-8",
+        errors="surrogateescape",
+        newline="",
+    )
+    report = import_questions(lines, file_format, batch_size)
+
+    if report["imported"] > 0:
+        current_app.config["QUESTION_POOL"].clear()
+        current_app.config["SEARCH_INDEX"].clear()
+        clear_pages()
+
+    response = jsonify({"success": True, **report})
+
+    return response
+
+
+@api.route("/questions/export", methods=["GET"])
+@read_only
+def export_questions_download():
+    """Route handler for endpoint exporting questions in bulk.
+
+    Returns:
+        response: A streamed NDJSON or CSV file with a question per line
+    """
+    file_format = request.args.get("format", "ndjson")
+    category_id = request.args.get("category_id", type=int)
+    difficulty = request.args.get("difficulty", type=int)
+
+    if file_format not in FORMATS:
+        abort(400)
+
+    lines = export_questions(file_format, category_id, difficulty)
+    response = Response(
+        stream_with_context(lines), mimetype=MIMETYPES[file_format]
+    )
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=questions.{file_format}"
+    )
+
+    return response
+
+
+@api.route("/questions/<int:question_id>", methods=["PATCH"])
 def patch_question_rating(question_id):
     """Route handler for endpoint updating the rating of a single question.
 
@@ -181,6 +496,10 @@ def patch_question_rating(question_id):
             question.rating = int(rating)
 
         question.update()
+        evict_category(question.category_id)
+        current_app.config["QUESTION_POOL"].update_rating(
+            question_id, question.category_id, question.rating
+        )
 
     except AttributeError:
         abort(400)
@@ -197,7 +516,7 @@ def patch_question_rating(question_id):
     return response
 
 
-@app.route("/questions/<int:question_id>", methods=["DELETE"])
+@api.route("/questions/<int:question_id>", methods=["DELETE"])
 def delete_question(question_id):
     """Route handler for endpoint to delete a single question.
 
@@ -214,29 +533,122 @@ def delete_question(question_id):
     if question is None:
         abort(422)
 
+    category_id = question.category_id
     question.delete()
+    evict_category(category_id)
+    current_app.config["QUESTION_POOL"].remove(question_id, category_id)
+    current_app.config["SEARCH_INDEX"].remove(question_id)
 
     response = jsonify({"success": True, "deleted_question_id": question_id})
 
     return response
 
 
-@app.route("/categories", methods=["GET"])
+@api.route("/questions/batch", methods=["PATCH"])
+def patch_question_ratings():
+    """Route handler for endpoint updating the ratings of many questions.
+
+    Returns:
+        response: A json object representing the result of each update
+    """
+    ratings = get_batch_ratings()
+    updated = Question.update_ratings(ratings)
+    results = []
+
+    for question_id, rating in ratings.items():
+        if question_id in updated:
+            results.append(
+                {
+                    "id": question_id,
+                    "success": True,
+                    "old_rating": updated[question_id][1],
+                    "new_rating": rating,
+                }
+            )
+        else:
+            results.append({"id": question_id, "success": False})
+
+    for category_id in {category_id for category_id, _ in updated.values()}:
+        evict_category(category_id)
+
+    for question_id, (category_id, _) in updated.items():
+        current_app.config["QUESTION_POOL"].update_rating(
+            question_id, category_id, ratings[question_id]
+        )
+
+    response = jsonify(
+        {"success": True, "updated": len(updated), "results": results}
+    )
+
+    return response
+
+
+@api.route("/questions/batch", methods=["DELETE"])
+def delete_questions():
+    """Route handler for endpoint deleting many questions.
+
+    Returns:
+        response: A json object representing the result of each deletion
+    """
+    try:
+
+        question_ids = request.json.get("question_ids")
+
+    except AttributeError:
+        abort(400)
+
+    if not isinstance(question_ids, list):
+        abort(400)
+
+    try:
+
+        question_ids = list(
+            dict.fromkeys(int(question_id) for question_id in question_ids)
+        )
+
+    except (TypeError, ValueError):
+        abort(400)
+
+    if len(question_ids) == 0 or len(question_ids) > MAX_BATCH_SIZE:
+        abort(400)
+
+    deleted = Question.delete_many(question_ids)
+    results = [
+        {"id": question_id, "success": question_id in deleted}
+        for question_id in question_ids
+    ]
+
+    for question_id, category_id in deleted.items():
+        current_app.config["QUESTION_POOL"].remove(question_id, category_id)
+        current_app.config["SEARCH_INDEX"].remove(question_id)
+
+    for category_id in set(deleted.values()):
+        evict_category(category_id)
+
+    response = jsonify(
+        {"success": True, "deleted": len(deleted), "results": results}
+    )
+
+    return response
+
+
+@api.route("/categories", methods=["GET"])
+@read_only
+@conditional("categories")
 def get_categories():
     """Route handler for endpoint showing all categories.
 
     Returns:
         response: A json object representing all categories
     """
-    categories = Category.query.order_by(Category.id).all()
-    categories = {category.id: category.name for category in categories}
+    categories = current_app.config["CATEGORY_CACHE"].get()
 
     response = jsonify({"success": True, "categories": categories})
 
     return response
 
 
-@app.route("/categories", methods=["POST"])
+@api.route("/categories", methods=["POST"])
 def create_category():
     """Route handler for endpoint to create a category.
 
@@ -257,10 +669,13 @@ def create_category():
 
             ext = os.path.splitext(icon.filename)[1]
             filename = secure_filename(name.lower() + ext)
-            icon.save(os.path.join(app.config["UPLOAD_FOLDER"], filename))
+            upload_folder = current_app.config["UPLOAD_FOLDER"]
+            icon.save(os.path.join(upload_folder, filename))
 
         category = Category(name=name)
         category.insert()
+        current_app.config["CATEGORY_CACHE"].invalidate()
+        clear_pages()
 
         response = jsonify(
             {"success": True, "created_category_id": category.id}
@@ -272,7 +687,10 @@ def create_category():
     return response
 
 
-@app.route("/categories/<int:category_id>/questions")
+@api.route("/categories/<int:category_id>/questions")
+@read_only
+@cached_listing
+@conditional("questions", "categories")
 def get_category_questions(category_id):
     """Route handler for endpoint showing all questions for a given category.
 
@@ -283,34 +701,62 @@ def get_category_questions(category_id):
     Returns:
         response: A json object representing questions for a specific category
     """
-    questions = (
-        Question.query.filter(Question.category_id == category_id)
-        .order_by(Question.id)
-        .all()
+    questions = Question.query.filter(
+        Question.category_id == category_id
+    ).order_by(Question.id)
+    page, after_id = get_page_args()
+    current_questions, next_cursor = paginate_questions(
+        questions, page, after_id
     )
-    page = request.args.get("page", 1, type=int)
-    current_questions = paginate_questions(questions, page)
 
     if len(current_questions) == 0:
         abort(404)
 
-    categories = Category.query.order_by(Category.id).all()
-    categories = {category.id: category.name for category in categories}
+    total_questions = CategoryStats.total_questions(category_id)
+
+    categories = current_app.config["CATEGORY_CACHE"].get()
 
     response = jsonify(
         {
             "success": True,
             "questions": current_questions,
-            "total_questions": len(questions),
+            "total_questions": total_questions,
             "current_category_id": category_id,
             "categories": categories,
+            "next_cursor": next_cursor,
+        }
+    )
+
+    return response
+
+
+@api.route("/stats", methods=["GET"])
+@read_only
+@conditional("questions", "categories")
+def get_stats():
+    """Route handler for endpoint showing statistics of the questions.
+
+    Returns:
+        response: A json object representing the number of questions, their
+            average rating and how many there are of each difficulty, both
+            overall and for each category
+    """
+    categories = CategoryStats.query.order_by(CategoryStats.category_id).all()
+    totals = CategoryStats.combine(categories).format()
+    del totals["category_id"]
+
+    response = jsonify(
+        {
+            "success": True,
+            **totals,
+            "categories": [stats.format() for stats in categories],
         }
     )
 
     return response
 
 
-@app.route("/quizzes", methods=["POST"])
+@api.route("/quizzes", methods=["POST"])
 def create_quiz():
     """Route handler for endpoint starting a new quiz.
 
@@ -320,33 +766,141 @@ def create_quiz():
     """
     try:
 
-        quiz_category_id = request.json.get("quiz_category_id")
-        previous_question_ids = request.json.get("previous_question_ids")
-        questions = Question.query.filter(
-            ~Question.id.in_(previous_question_ids)
-        )
-
-        if quiz_category_id != 0:
-            questions = questions.filter(
-                Question.category_id == quiz_category_id
+        quiz_category_id = int(request.json.get("quiz_category_id"))
+        previous_question_ids = {
+            int(question_id)
+            for question_id in request.json.get("previous_question_ids")
+        }
+        difficulties = None
+
+        if (
+            "min_difficulty" in request.json
+            or "max_difficulty" in request.json
+        ):
+            difficulties = range(
+                int(request.json.get("min_difficulty", DIFFICULTIES[0])),
+                int(request.json.get("max_difficulty", DIFFICULTIES[-1])) + 1,
             )
 
-        questions = questions.all()
+        rating_bias = float(request.json.get("rating_bias", 0))
 
-        if len(questions) > 0:
-            question = random.choice(questions).format()
-        else:
-            question = None
+    except (AttributeError, TypeError, ValueError):
+        abort(400)
 
-        response = jsonify({"success": True, "question": question})
+    if difficulties is not None and (
+        len(difficulties) == 0
+        or difficulties[0] not in DIFFICULTIES
+        or difficulties[-1] not in DIFFICULTIES
+    ):
+        abort(400)
 
-    except AttributeError:
+    if not abs(rating_bias) <= MAX_RATING_BIAS:
         abort(400)
 
+    question = choose_question(
+        quiz_category_id, previous_question_ids, difficulties, rating_bias
+    )
+
+    if question is not None:
+        question = question.format()
+
+    response = jsonify({"success": True, "question": question})
+
+    return response
+
+
+@api.route("/quizzes/sessions", methods=["POST"])
+def create_quiz_session():
+    """Route handler for endpoint starting a new quiz session.
+
+    Returns:
+        response: A json object containing the id of the session that was
+            created and how many questions were dealt into it
+    """
+    try:
+
+        quiz_category_id = int(request.json.get("quiz_category_id"))
+        max_questions = int(request.json.get("max_questions", QUIZ_DECK_SIZE))
+
+    except (AttributeError, TypeError, ValueError):
+        abort(400)
+
+    if max_questions < 1:
+        abort(400)
+
+    deck = current_app.config["QUESTION_POOL"].sample(
+        quiz_category_id, max_questions
+    )
+    session_id = current_app.config["QUIZ_SESSION_STORE"].create(deck)
+
+    response = jsonify(
+        {
+            "success": True,
+            "session_id": session_id,
+            "total_questions": len(deck),
+        }
+    )
+
+    return response
+
+
+@api.route("/quizzes/sessions/<session_id>/next", methods=["POST"])
+def next_quiz_question(session_id):
+    """Route handler for endpoint retrieving the next question of a session.
+
+    Args:
+        session_id: A str representing the identifier for the quiz session
+
+    Returns:
+        response: A json object representing the next question of the
+            session, or null if the session has run out of questions
+    """
+    store = current_app.config["QUIZ_SESSION_STORE"]
+    question = None
+
+    while question is None:
+
+        try:
+            question_id = store.pop(session_id)
+        except KeyError:
+            abort(404)
+
+        if question_id is None:
+            break
+
+        question = Question.query.get(question_id)
+
+    if question is not None:
+        question = question.format()
+
+    response = jsonify({"success": True, "question": question})
+
     return response
 
 
-@app.route("/users", methods=["GET"])
+@api.route("/quizzes/sessions/<session_id>", methods=["DELETE"])
+def delete_quiz_session(session_id):
+    """Route handler for endpoint ending a quiz session.
+
+    Args:
+        session_id: A str representing the identifier for the quiz session
+
+    Returns:
+        response: A json object containing the id of the session that was
+            deleted
+    """
+    try:
+        current_app.config["QUIZ_SESSION_STORE"].delete(session_id)
+    except KeyError:
+        abort(404)
+
+    response = jsonify({"success": True, "deleted_session_id": session_id})
+
+    return response
+
+
+@api.route("/users", methods=["GET"])
+@read_only
 def get_users():
     """Route handler for endpoint showing all users.
 
@@ -361,7 +915,7 @@ def get_users():
     return response
 
 
-@app.route("/users", methods=["POST"])
+@api.route("/users", methods=["POST"])
 def create_user():
     """Route handler for endpoint to create a user.
 
@@ -382,7 +936,7 @@ def create_user():
     return response
 
 
-@app.route("/users/<int:user_id>", methods=["PATCH"])
+@api.route("/users/<int:user_id>", methods=["PATCH"])
 def patch_user_score(user_id):
     """Route handler for endpoint updating the score of a single user.
 
@@ -393,37 +947,229 @@ def patch_user_score(user_id):
     Returns:
         response: A json object stating if the request was successful
     """
-    user = User.query.get(user_id)
+    try:
 
-    if user is None:
+        score = request.json.get("score")
+        delta = 0 if score is None else int(score)
+
+    except (AttributeError, TypeError, ValueError):
+        abort(400)
+
+    aggregator = current_app.config["SCORE_AGGREGATOR"]
+
+    if aggregator is None:
+        new_score = User.add_score(user_id, delta)
+    else:
+        new_score = aggregator.add_score(user_id, delta)
+
+    if new_score is None:
         abort(422)
 
-    try:
+    response = jsonify(
+        {
+            "success": True,
+            "updated_user_id": user_id,
+            "old_score": new_score - delta,
+            "new_score": new_score,
+        }
+    )
 
-        old_score = user.score
-        score = request.json.get("score")
+    return response
 
-        if score is not None:
-            user.score += int(score)
 
-        user.update()
+@api.route("/leaderboard", methods=["GET"])
+def get_leaderboard():
+    """Route handler for endpoint showing the highest scoring users.
 
-    except AttributeError:
+    Returns:
+        response: A json object representing the highest ranked users
+    """
+    limit = request.args.get("limit", LEADERBOARD_LIMIT, type=int)
+
+    if limit < 1 or limit > MAX_LEADERBOARD_LIMIT:
         abort(400)
 
+    leaderboard = current_app.config["LEADERBOARD"]
+
     response = jsonify(
         {
             "success": True,
-            "updated_user_id": user_id,
-            "old_score": old_score,
-            "new_score": user.score,
+            "leaderboard": leaderboard.top(limit),
+            "total_users": leaderboard.count(),
         }
     )
 
     return response
 
 
-@app.errorhandler(400)
+@api.route("/leaderboard/<int:user_id>", methods=["GET"])
+def get_user_rank(user_id):
+    """Route handler for endpoint showing the rank of a single user.
+
+    Args:
+        user_id: An int representing the identifier for the user to rank
+
+    Returns:
+        response: A json object representing the ranked user
+    """
+    leaderboard = current_app.config["LEADERBOARD"]
+    user = leaderboard.rank(user_id)
+
+    if user is None:
+        abort(404)
+
+    response = jsonify(
+        {"success": True, "user": user, "total_users": leaderboard.count()}
+    )
+
+    return response
+
+
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Route handler for endpoint showing request and SQL metrics.
+
+    Returns:
+        response: A text response with the metrics of this worker in the
+            Prometheus text format
+    """
+    response = Response(
+        current_app.config["METRICS"].format(), content_type=CONTENT_TYPE
+    )
+
+    return response
+
+
+@api.route("/health/db", methods=["GET"])
+def get_db_health():
+    """Route handler for endpoint showing the state of the db connections.
+
+    Returns:
+        response: A json object representing the connection pool's usage,
+            how long requests have waited for a connection and the health of
+            the read replicas, or null if there are none
+    """
+    replicas = current_app.config["REPLICA_SET"]
+
+    response = jsonify(
+        {
+            "success": True,
+            "pool": current_app.config["POOL_STATS"].format(db.engine.pool),
+            "replicas": None if replicas is None else replicas.format(),
+        }
+    )
+
+    return response
+
+
+@api.route("/health/cache", methods=["GET"])
+def get_cache_health():
+    """Route handler for endpoint showing the state of the response cache.
+
+    Returns:
+        response: A json object representing the response cache's hits,
+            misses and evictions, or null if the cache is disabled
+    """
+    cache = current_app.config["RESPONSE_CACHE"]
+
+    response = jsonify(
+        {"success": True, "cache": None if cache is None else cache.format()}
+    )
+
+    return response
+
+
+@api.cli.command("migrate")
+def migrate_command():
+    """Applies any pending schema migrations to the db."""
+    applied = upgrade_db()
+
+    for migration in applied:
+        action = "Applied" if migration.path is not None else "Skipped"
+        click.echo(f"{action} {migration.version:04d}_{migration.name}")
+
+    if len(applied) == 0:
+        click.echo("The db is already up to date")
+
+
+@api.cli.command("import-questions")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(FORMATS),
+    help="The format of the file, by default taken from its extension.",
+)
+@click.option(
+    "--batch-size",
+    default=IMPORT_BATCH_SIZE,
+    type=click.IntRange(min=1),
+    help="The number of questions inserted per transaction.",
+)
+def import_questions_command(path, file_format, batch_size):
+    """Imports questions in bulk from an NDJSON or CSV file."""
+    if file_format is None:
+        file_format = "csv" if path.lower().endswith(".csv") else "ndjson"
+
+    def echo_batch(batch):
+        click.echo(
+            f"Batch {batch['batch']}: {batch['rows']} rows in "
+            f"{batch['seconds']:.3f}s ({batch['rows_per_second']} rows/s)"
+        )
+
+    with open(
+        path, encoding="utf-8", errors="surrogateescape", newline=""
+    ) as lines:
+        report = import_questions(lines, file_format, batch_size, echo_batch)
+
+    for rejection in report["rejections"]:
+        click.echo(f"Rejected line {rejection['line']}: {rejection['error']}")
+
+    click.echo(
+        f"Imported {report['imported']} questions, "
+        f"rejected {report['rejected']} rows"
+    )
+
+
+@api.cli.command("export-questions")
+@click.argument("path", default="-", type=click.Path(dir_okay=False))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(FORMATS),
+    help="The format of the file, by default taken from its extension.",
+)
+@click.option("--category", "category_id", type=int, help="A category id.")
+@click.option("--difficulty", type=int, help="A difficulty.")
+def export_questions_command(path, file_format, category_id, difficulty):
+    """Exports questions to an NDJSON or CSV file, or to stdout."""
+    if file_format is None:
+        file_format = "csv" if path.lower().endswith(".csv") else "ndjson"
+
+    with click.open_file(path, "w", encoding="utf-8") as lines:
+        for line in export_questions(file_format, category_id, difficulty):
+            lines.write(line)
+
+
+@api.cli.command("check-indexes")
+def check_indexes_command():
+    """Reports any hot query that runs without an index."""
+    missing = 0
+
+    for hot_query, plan, uses_index in check_indexes():
+        status = "ok" if uses_index else "NO INDEX"
+        click.echo(f"{status:>8}  {hot_query.name}")
+
+        if not uses_index:
+            missing += 1
+            for line in plan.splitlines():
+                click.echo(f"          {line}")
+
+    if missing > 0:
+        raise click.ClickException(f"{missing} hot queries have no index")
+
+
+@api.app_errorhandler(400)
 def bad_request(error):  # pylint: disable=unused-argument
     """Error handler for 400 bad request.
 
@@ -439,7 +1185,7 @@ def bad_request(error):  # pylint: disable=unused-argument
     return response, 400
 
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):  # pylint: disable=unused-argument
     """Error handler for 404 not found.
 
@@ -455,7 +1201,7 @@ def not_found(error):  # pylint: disable=unused-argument
     return response, 404
 
 
-@app.errorhandler(405)
+@api.app_errorhandler(405)
 def method_not_allowed(error):  # pylint: disable=unused-argument
     """Error handler for 405 method not allowed.
 
@@ -471,7 +1217,7 @@ def method_not_allowed(error):  # pylint: disable=unused-argument
     return response, 405
 
 
-@app.errorhandler(422)
+@api.app_errorhandler(422)
 def unprocessable_entity(error):  # pylint: disable=unused-argument
     """Error handler for 422 unprocessable entity.
 
@@ -491,7 +1237,7 @@ def unprocessable_entity(error):  # pylint: disable=unused-argument
     return response, 422
 
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_server_error(error):  # pylint: disable=unused-argument
     """Error handler for 500 internal server error.
 
@@ -0,0 +1,92 @@
+"""Streaming bulk export of questions to NDJSON or CSV.
+
+Questions are read through a server-side cursor in fixed size batches and
+written out one row at a time, so memory use stays the same however many
+questions are exported. Exported files can be loaded back with the bulk
+import.
+
+Usage: flask export-questions questions.ndjson
+       flask export-questions questions.csv --category 1 --difficulty 2
+
+Attributes:
+    EXPORT_BATCH_SIZE: An int representing how many rows are fetched from
+        the db at a time
+    EXPORT_COLUMNS: A tuple of strs representing the question columns
+        exported
+    MIMETYPES: A dict mapping a file format to its mimetype
+"""
+
+import csv
+import io
+import itertools
+
+from flask import current_app
+
+from flaskr.bulk_import import COLUMNS
+from models import Question, db
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ("id",) + COLUMNS
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def query_export(category_id=None, difficulty=None):
+    """Builds the query streaming the questions to export.
+
+    Columns are selected instead of Question objects so that exported rows
+    are not kept in the session's identity map.
+
+    Args:
+        category_id: An int representing the category to export, or None
+            for every category
+        difficulty: An int representing the difficulty to export, or None
+            for every difficulty
+
+    Returns:
+        query: A Query object yielding tuples of EXPORT_COLUMNS in id order
+    """
+    query = db.session.query(
+        *(getattr(Question, column) for column in EXPORT_COLUMNS)
+    )
+
+    if category_id is not None:
+        query = query.filter(Question.category_id == category_id)
+
+    if difficulty is not None:
+        query = query.filter(Question.difficulty == difficulty)
+
+    return query.order_by(Question.id).yield_per(EXPORT_BATCH_SIZE)
+
+
+def export_questions(file_format, category_id=None, difficulty=None):
+    """Generates the lines of an export file.
+
+    Args:
+        file_format: A str representing the format of the file, either
+            ndjson or csv
+        category_id: An int representing the category to export, or None
+            for every category
+        difficulty: An int representing the difficulty to export, or None
+            for every difficulty
+
+    Yields:
+        A str representing a line of the file, including its line ending
+    """
+    rows = query_export(category_id, difficulty)
+
+    if file_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        for row in itertools.chain([EXPORT_COLUMNS], rows):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        return
+
+    dumps = current_app.json.dumps
+
+    for row in rows:
+        yield dumps(dict(zip(EXPORT_COLUMNS, row)), sort_keys=False) + "\n"
@@ -0,0 +1,291 @@
+"""Bulk import of questions from NDJSON or CSV.
+
+Rows are read one at a time from a stream, validated, and inserted in
+batches, each in its own transaction, instead of one transaction per
+question. On postgresql a batch is loaded with COPY, elsewhere with a single
+multi-row INSERT, which is also used when psycopg2 waits through a callback,
+as in the gevent mode of flaskr.green, since it then refuses COPY. Invalid
+rows are rejected with the reason and the rest of the import carries on.
+
+Usage: flask import-questions questions.ndjson
+       flask import-questions questions.csv --batch-size 5000
+
+Attributes:
+    IMPORT_BATCH_SIZE: An int representing the default number of rows
+        inserted per transaction
+    MAX_REJECTIONS_REPORTED: An int representing the most rejected rows
+        listed in a report, though all of them are counted
+    FORMATS: A tuple of strs representing the supported file formats
+    COLUMNS: A tuple of strs representing the question columns imported
+    VALUE_RANGE: A range representing the valid ratings and difficulties
+"""
+
+import csv
+import io
+import json
+import time
+
+from psycopg2 import extensions
+
+from flaskr.metrics import timed_statement
+from models import Category, CategoryStats, Generation, Question, db
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REJECTIONS_REPORTED = 100
+FORMATS = ("ndjson", "csv")
+COLUMNS = ("question", "answer", "category_id", "rating", "difficulty")
+VALUE_RANGE = range(1, 6)
+
+
+def is_utf8(text):
+    """Checks that text was decoded from valid UTF-8.
+
+    Args:
+        text: A str decoded with the surrogateescape error handler, which
+            keeps invalid bytes as lone surrogates
+
+    Returns:
+        A bool that is True if the text holds no invalid bytes
+    """
+    try:
+        text.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+
+    return True
+
+
+def read_csv_rows(lines):
+    """Parses the rows of a CSV file with a header row.
+
+    Args:
+        lines: An iterable of strs representing the lines of the file,
+            decoded with the surrogateescape error handler
+
+    Yields:
+        A tuple of an int representing the line number of the row, a dict
+            representing the row, or None if it could not be parsed, and a
+            str representing the parse error, or None
+    """
+    reader = csv.DictReader(lines)
+
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            yield reader.line_num, None, f"invalid csv: {error}"
+            continue
+
+        if not all(is_utf8(str(value)) for value in row.values()):
+            yield reader.line_num, None, "invalid utf-8"
+            continue
+
+        yield reader.line_num, row, None
+
+
+def read_ndjson_rows(lines):
+    """Parses the rows of an NDJSON file, skipping blank lines.
+
+    Args:
+        lines: An iterable of strs representing the lines of the file,
+            decoded with the surrogateescape error handler
+
+    Yields:
+        A tuple of an int representing the line number of the row, a dict
+            representing the row, or None if it could not be parsed, and a
+            str representing the parse error, or None
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        if not is_utf8(line):
+            yield line_number, None, "invalid utf-8"
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "invalid json"
+            continue
+
+        if not isinstance(row, dict):
+            yield line_number, None, "row is not an object"
+            continue
+
+        yield line_number, row, None
+
+
+def read_rows(lines, file_format):
+    """Parses the rows of a file one line at a time.
+
+    Rows that are not valid UTF-8 or CSV are yielded with a parse error, so
+    they are rejected and the rest of the file is still read.
+
+    Args:
+        lines: An iterable of strs representing the lines of the file,
+            decoded with the surrogateescape error handler
+        file_format: A str representing the format of the file, one of
+            FORMATS
+
+    Returns:
+        A generator of tuples of an int representing the line number of the
+            row, a dict representing the row, or None if it could not be
+            parsed, and a str representing the parse error, or None
+    """
+    if file_format == "csv":
+        return read_csv_rows(lines)
+
+    return read_ndjson_rows(lines)
+
+
+def validate_row(row, category_ids):
+    """Checks a row and converts it into question column values.
+
+    Args:
+        row: A dict representing the parsed row
+        category_ids: A set of ints representing the existing categories
+
+    Returns:
+        values: A dict mapping each of COLUMNS to its value, or None if the
+            row is invalid
+        error: A str representing why the row is invalid, or None
+    """
+    values = {}
+
+    for column in ("question", "answer"):
+        value = row.get(column)
+
+        if not isinstance(value, str) or not value.strip():
+            return None, f"{column} is missing"
+
+        values[column] = value
+
+    for column in ("category_id", "rating", "difficulty"):
+        try:
+            values[column] = int(row.get(column))
+        except (TypeError, ValueError):
+            return None, f"{column} is not an int"
+
+    if values["category_id"] not in category_ids:
+        return None, f"category {values['category_id']} does not exist"
+
+    for column in ("rating", "difficulty"):
+        if values[column] not in VALUE_RANGE:
+            return None, (
+                f"{column} must be between {VALUE_RANGE.start} and "
+                f"{VALUE_RANGE.stop - 1}"
+            )
+
+    return values, None
+
+
+def insert_batch(batch):
+    """Inserts a batch of questions in a single transaction.
+
+    The statistics of their categories are updated in the same transaction.
+
+    Args:
+        batch: A list of dicts mapping each of COLUMNS to its value
+    """
+    if (
+        db.engine.dialect.name == "postgresql"
+        and extensions.get_wait_callback() is None
+    ):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            [values[column] for column in COLUMNS] for values in batch
+        )
+        buffer.seek(0)
+
+        statement = (
+            f"COPY questions ({', '.join(COLUMNS)}) FROM STDIN WITH CSV"
+        )
+        cursor = db.session.connection().connection.cursor()
+
+        with timed_statement(statement):
+            cursor.copy_expert(statement, buffer)
+    else:
+        db.session.execute(Question.__table__.insert().values(batch))
+
+    CategoryStats.apply(
+        CategoryStats.tally(
+            added=[
+                (values["category_id"], values["rating"], values["difficulty"])
+                for values in batch
+            ]
+        )
+    )
+    db.session.commit()
+    Generation.bump("questions")
+
+
+def import_questions(
+    lines, file_format, batch_size=IMPORT_BATCH_SIZE, on_batch=None
+):
+    """Imports questions from a file in batched transactions.
+
+    Args:
+        lines: An iterable of strs representing the lines of the file
+        file_format: A str representing the format of the file, one of
+            FORMATS
+        batch_size: An int representing how many rows are inserted per
+            transaction
+        on_batch: A function called with the dict reporting each batch once
+            it has been inserted
+
+    Returns:
+        report: A dict representing the number of imported and rejected rows,
+            the rejected rows and the throughput of each batch
+    """
+    category_ids = {
+        category_id for (category_id,) in db.session.query(Category.id)
+    }
+    report = {"imported": 0, "rejected": 0, "rejections": [], "batches": []}
+    batch = []
+
+    def flush():
+        start = time.perf_counter()
+        insert_batch(batch)
+        seconds = time.perf_counter() - start
+        batch_report = {
+            "batch": len(report["batches"]) + 1,
+            "rows": len(batch),
+            "seconds": round(seconds, 6),
+            "rows_per_second": (
+                round(len(batch) / seconds) if seconds else None
+            ),
+        }
+        report["imported"] += len(batch)
+        report["batches"].append(batch_report)
+        batch.clear()
+
+        if on_batch is not None:
+            on_batch(batch_report)
+
+    for line_number, row, error in read_rows(lines, file_format):
+        values = None
+
+        if error is None:
+            values, error = validate_row(row, category_ids)
+
+        if error is not None:
+            report["rejected"] += 1
+            if len(report["rejections"]) < MAX_REJECTIONS_REPORTED:
+                report["rejections"].append(
+                    {"line": line_number, "error": error}
+                )
+            continue
+
+        batch.append(values)
+
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return report
@@ -0,0 +1,118 @@
+"""A cached map of category ids to names.
+
+Categories almost never change, so the map is built once and shared by every
+listing endpoint. It is invalidated locally when a category is created, and
+the categories generation counter, which Category.insert bumps, is checked
+periodically so that categories created by other workers are picked up as
+well.
+
+Attributes:
+    GENERATION_CHECK_INTERVAL: An int representing how many seconds pass
+        between checks of the generation counter
+
+Classes:
+    DbGeneration()
+    CategoryCache()
+"""
+
+import threading
+import time
+
+from models import Category, Generation, db
+
+GENERATION_CHECK_INTERVAL = 5
+
+
+def load_categories():
+    """Retrieve all categories from the db.
+
+    Returns:
+        A dict mapping category ids to category names
+    """
+    categories = db.session.query(Category.id, Category.name).order_by(
+        Category.id
+    )
+    return {category_id: name for category_id, name in categories}
+
+
+class DbGeneration:
+    """A generation counter stored in the db and shared between workers.
+
+    Attributes:
+        name: A str representing the name of the counter
+    """
+
+    def __init__(self, name):
+        """Set-up for DbGeneration object."""
+        self.name = name
+
+    def current(self):
+        """Retrieves the current generation.
+
+        Returns:
+            An int representing the current generation
+        """
+        return Generation.current(self.name)
+
+
+class CategoryCache:
+    """A cache of the category map.
+
+    Attributes:
+        loader: A function returning a dict mapping category ids to names
+        generation: An object with a current() method returning a counter
+            that is advanced by writes in any worker, or None to only
+            invalidate locally
+        check_interval: An int representing how many seconds pass between
+            checks of the generation
+        state: A tuple of the cached category map and the generation it was
+            loaded at, or None if nothing is cached
+        checked_at: A float representing when the generation was last checked
+        lock: A threading.Lock object guarding reloads
+    """
+
+    def __init__(
+        self,
+        loader=load_categories,
+        generation=None,
+        check_interval=GENERATION_CHECK_INTERVAL,
+    ):
+        """Set-up for CategoryCache object."""
+        self.loader = loader
+        self.generation = generation
+        self.check_interval = check_interval
+        self.state = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Retrieve the category map, loading it if it is missing or stale.
+
+        Returns:
+            A dict mapping category ids to category names
+        """
+        state = self.state
+        now = time.monotonic()
+
+        if state is not None and (
+            self.generation is None
+            or now - self.checked_at < self.check_interval
+        ):
+            return state[0]
+
+        with self.lock:
+            generation = None
+
+            if self.generation is not None:
+                generation = self.generation.current()
+
+            if self.state is None or self.state[1] != generation:
+                self.state = (self.loader(), generation)
+
+            self.checked_at = now
+
+            return self.state[0]
+
+    def invalidate(self):
+        """Drops the cached map of this worker."""
+        self.state = None
@@ -0,0 +1,160 @@
+"""Compression of large json, NDJSON and CSV responses.
+
+Responses are compressed with brotli, when it is installed, or gzip depending
+on the client's Accept-Encoding. Bodies smaller than a minimum size go out
+as they are, as compressing them saves less than it costs. Streamed
+responses, such as exports, are compressed a chunk at a time as they are
+streamed, so they are never held in memory.
+
+The COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL and
+COMPRESSION_BROTLI_QUALITY app config values override the defaults, and a
+COMPRESSION_MIN_SIZE of None turns compression off.
+
+Attributes:
+    COMPRESSION_MIN_SIZE: An int representing the default number of bytes a
+        body must have to be compressed
+    COMPRESSION_GZIP_LEVEL: An int from 1 to 9 representing the default gzip
+        compression level
+    COMPRESSION_BROTLI_QUALITY: An int from 0 to 11 representing the default
+        brotli quality
+    COMPRESSIBLE_MIMETYPES: A tuple of strs representing the mimetypes of
+        responses that are compressed
+    brotli: The brotli module, or None if it is not installed
+"""
+
+import gzip
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+)
+
+
+def choose_encoding():
+    """Chooses the encoding to compress the current response with.
+
+    Returns:
+        encoding: A str representing the content encoding, either br or gzip,
+            or None if the client accepts neither
+    """
+    encodings = ["gzip"]
+
+    if brotli is not None:
+        encodings.insert(0, "br")
+
+    encoding = request.accept_encodings.best_match(encodings)
+    return encoding
+
+
+def compress_chunks(chunks, encoding, level):
+    """Compresses the chunks of a streamed body as they are streamed.
+
+    Args:
+        chunks: An iterable of bytes or strs representing the body
+        encoding: A str representing the content encoding, either br or gzip
+        level: An int representing the gzip level or brotli quality
+
+    Yields:
+        A bytes object representing the next piece of the compressed body
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        compress, flush = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, wbits=16 + zlib.MAX_WBITS)
+        compress, flush = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+
+        compressed = compress(chunk)
+
+        if compressed:
+            yield compressed
+
+    yield flush()
+
+
+def compress_body(body, encoding, level):
+    """Compresses a whole body.
+
+    Args:
+        body: A bytes object representing the body
+        encoding: A str representing the content encoding, either br or gzip
+        level: An int representing the gzip level or brotli quality
+
+    Returns:
+        A bytes object representing the compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+
+    return gzip.compress(body, compresslevel=level)
+
+
+def compress_response(response):
+    """Compresses a response if the client accepts a compressed body.
+
+    Args:
+        response: The response object to compress
+
+    Returns:
+        response: The response object, with its body compressed if it is a
+            large or streamed json, NDJSON or CSV response
+    """
+    min_size = current_app.config.get(
+        "COMPRESSION_MIN_SIZE", COMPRESSION_MIN_SIZE
+    )
+
+    if (
+        min_size is None
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding()
+
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        level = current_app.config.get(
+            "COMPRESSION_BROTLI_QUALITY", COMPRESSION_BROTLI_QUALITY
+        )
+    else:
+        level = current_app.config.get(
+            "COMPRESSION_GZIP_LEVEL", COMPRESSION_GZIP_LEVEL
+        )
+
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+
+        if len(body) < min_size:
+            return response
+
+        response.set_data(compress_body(body, encoding, level))
+
+    response.headers["Content-Encoding"] = encoding
+
+    return response
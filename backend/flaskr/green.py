@@ -0,0 +1,66 @@
+"""Cooperative serving mode on gevent.
+
+A sync worker serves one request at a time and blocks while postgresql
+answers, so concurrency is capped at the number of workers. In this mode
+every request runs in its own greenlet and psycopg2 waits for postgresql
+through gevent instead of blocking the process, so thousands of requests,
+such as quiz turns, can be in flight in a single process while they share the
+connections of its pool. The routes are the same as those of the sync app.
+
+The standard library has to be patched by gevent before flaskr is imported,
+which gunicorn's gevent worker does on its own. sqlite does not support
+cooperative waits, so on sqlite requests still block the process while they
+query the db. psycopg2 refuses COPY while a wait callback is set, so in this
+mode imports insert their batches with multi-row INSERTs, which is slower.
+
+gevent is not in requirements.txt, install the tested version with
+`pip install -r requirements-gevent.txt`.
+
+Usage: gunicorn -k gevent --worker-connections 2000 "flaskr.green:create_app()"
+"""
+
+from gevent.socket import wait_read, wait_write
+from psycopg2 import OperationalError, extensions
+
+import flaskr
+
+
+def wait_callback(connection, timeout=None):  # pylint: disable=unused-argument
+    """Waits for a psycopg2 connection without blocking other greenlets.
+
+    Args:
+        connection: A psycopg2 connection object in asynchronous mode
+        timeout: unused
+
+    Raises:
+        OperationalError: An error occurred as the connection reported an
+            unexpected state
+    """
+    while True:
+        state = connection.poll()
+
+        if state == extensions.POLL_OK:
+            break
+
+        if state == extensions.POLL_READ:
+            wait_read(connection.fileno())
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno())
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def create_app(config=None):
+    """Creates the flask app with psycopg2 waiting through gevent.
+
+    Args:
+        config: A dict of config values overriding the defaults, as taken by
+            flaskr.create_app
+
+    Returns:
+        app: A flask Flask object representing the app
+    """
+    extensions.set_wait_callback(wait_callback)
+    app = flaskr.create_app(config)
+
+    return app
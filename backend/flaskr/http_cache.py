@@ -0,0 +1,129 @@
+"""Conditional GET for the read endpoints.
+
+Each listing is built from a few tables, and every write to one of those
+tables bumps the table's counter in the generations table. The ETag and
+Last-Modified of a listing are derived from the counters of its tables, so a
+request revalidating a copy it already holds is answered with 304 Not Modified
+after a single lookup of the counters, without reading any rows. Cache-Control
+lets browsers and a CDN in front of the api reuse responses.
+
+Attributes:
+    MAX_AGE: An int representing the default number of seconds a browser may
+        reuse a response without revalidating it
+    SHARED_MAX_AGE: An int representing the default number of seconds a
+        shared cache, such as a CDN, may reuse a response without
+        revalidating it
+"""
+
+import functools
+from datetime import timezone
+
+from flask import current_app, request
+
+from models import Generation
+
+MAX_AGE = 0
+SHARED_MAX_AGE = 60
+
+
+def get_validators(tables):
+    """Builds the validators of a listing from the counters of its tables.
+
+    Args:
+        tables: A tuple of strs representing the tables the listing reads
+
+    Returns:
+        etag: A str representing the version of the listing
+        last_modified: A datetime in utc representing when one of the tables
+            was last written to, or None if none of them have been
+    """
+    versions = Generation.versions(tables)
+    etag = ".".join(f"{table}-{versions[table][0]}" for table in tables)
+    modified = [
+        updated_at
+        for _, updated_at in versions.values()
+        if updated_at is not None
+    ]
+    last_modified = None
+
+    if modified:
+        last_modified = max(modified).replace(
+            tzinfo=timezone.utc, microsecond=0
+        )
+
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified):
+    """Checks whether the client's copy of a listing is still current.
+
+    Args:
+        etag: A str representing the version of the listing
+        last_modified: A datetime representing when the listing last
+            changed, or None if it is unknown
+
+    Returns:
+        A bool that is True if the listing may be answered with a 304
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+
+    return False
+
+
+def set_cache_headers(response, etag, last_modified):
+    """Adds the validators and Cache-Control of a listing to a response.
+
+    Args:
+        response: The response object to add headers to
+        etag: A str representing the version of the listing
+        last_modified: A datetime representing when the listing last
+            changed, or None if it is unknown
+
+    Returns:
+        response: The response object that the headers were added to
+    """
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get(
+        "HTTP_CACHE_MAX_AGE", MAX_AGE
+    )
+    response.cache_control.s_maxage = current_app.config.get(
+        "HTTP_CACHE_SHARED_MAX_AGE", SHARED_MAX_AGE
+    )
+
+    return response
+
+
+def conditional(*tables):
+    """Makes a read endpoint answer conditional requests with a 304.
+
+    Args:
+        tables: strs representing the tables the endpoint's response reads
+
+    Returns:
+        decorator: A function wrapping a route handler
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = get_validators(tables)
+
+            if is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+
+                if response.status_code != 200:
+                    return response
+
+            return set_cache_headers(response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
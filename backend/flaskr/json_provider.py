@@ -0,0 +1,121 @@
+"""JSON encoding of responses with a faster encoder when one is installed.
+
+Every response made with jsonify, including those of the error handlers, is
+encoded by the app's JSON provider. When orjson is installed it encodes
+responses straight to bytes, otherwise, or for anything it cannot encode, the
+stdlib json module is used as before. Output is plain UTF-8 rather than
+ASCII with escape sequences either way, so both encoders produce the same
+text.
+
+Setting the JSON_COMPACT app config value, or the environment variable of
+the same name, turns off indentation in debug mode and sorting of keys, which
+makes large listings cheaper to encode.
+
+Attributes:
+    orjson: The orjson module, or None if it is not installed
+
+Classes:
+    FastJSONProvider()
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """A JSON provider encoding with orjson, falling back to stdlib json.
+
+    Dates and other types orjson does not handle the same way as flask are
+    passed through to the provider's default function, so responses look the
+    same whichever encoder produced them.
+
+    Attributes:
+        ensure_ascii: A bool that is False so that the stdlib fallback writes
+            UTF-8 like orjson does
+    """
+
+    ensure_ascii = False
+
+    def encode(self, obj, indent=False, sort_keys=None):
+        """Serializes data as JSON to bytes with orjson.
+
+        Args:
+            obj: The data to serialize
+            indent: A bool that is True if the output should be indented
+            sort_keys: A bool that is True if the keys of dicts should be
+                sorted, or None to use the provider's sort_keys
+
+        Returns:
+            A bytes object representing the data as UTF-8 encoded JSON
+
+        Raises:
+            TypeError: An error occurred as orjson cannot encode the data
+        """
+        option = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+        if indent:
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        """Serializes data as JSON to a str.
+
+        Args:
+            obj: The data to serialize
+            kwargs: Arguments passed on to json.dumps, of which indent,
+                separators and sort_keys are also understood by orjson
+
+        Returns:
+            A str representing the data as JSON
+        """
+        if orjson is not None and kwargs.get("indent") in (None, 2):
+            if set(kwargs) <= {"indent", "separators", "sort_keys"}:
+                try:
+                    return self.encode(
+                        obj, kwargs.get("indent"), kwargs.get("sort_keys")
+                    ).decode()
+                except TypeError:
+                    pass
+
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """Serializes data as JSON into a response.
+
+        Args:
+            args: A single value to serialize, or many to serialize as a
+                list
+            kwargs: Values to serialize as a dict
+
+        Returns:
+            response: A flask Response object with the data as its body
+        """
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (
+            self.compact is None and self._app.debug
+        )
+
+        try:
+            body = self.encode(obj, indent)
+        except TypeError:
+            return super().response(*args, **kwargs)
+
+        response = self._app.response_class(
+            body + b"\n", mimetype=self.mimetype
+        )
+        return response
@@ -0,0 +1,167 @@
+"""A ranking of users by score, read from the db.
+
+The top users are read with ORDER BY score DESC LIMIT n and the rank of a
+user is one more than the number of users with a higher score, so both are
+answered from the index on users.score instead of loading and sorting every
+user. Nothing is kept in memory, so every worker serves the same ranking.
+
+When the app has a score aggregator, the score deltas it has not flushed
+yet are added to the scores read, so write-behind increments are ranked as
+soon as they are accepted.
+
+Classes:
+    Leaderboard()
+"""
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import User, db
+
+
+class Leaderboard:
+    """A ranking of users by score.
+
+    Users with the same score share a rank, and the next rank after them is
+    skipped, e.g. 1, 2, 2, 4.
+    """
+
+    @staticmethod
+    def read(query):
+        """Runs a db read alongside the score deltas not flushed yet.
+
+        Args:
+            query: A function taking a dict mapping a user id to the delta
+                not flushed yet and reading from the db
+
+        Returns:
+            The result of query
+        """
+        aggregator = current_app.config["SCORE_AGGREGATOR"]
+
+        if aggregator is None:
+            return query({})
+
+        return aggregator.read(query)
+
+    @staticmethod
+    def format(rank, user_id, username, score):
+        """Formats a ranked user as a dict.
+
+        Args:
+            rank: An int representing the rank of the user
+            user_id: An int representing the id of the user
+            username: A str representing the name of the user
+            score: An int representing the score of the user
+
+        Returns:
+            A dict representing the ranked user
+        """
+        return {
+            "rank": rank,
+            "id": user_id,
+            "username": username,
+            "score": score,
+        }
+
+    def top(self, limit):
+        """Retrieve the highest ranked users.
+
+        A pending delta can move a user into or out of the top, so as many
+        extra users are read as there are pending deltas, along with the
+        users those deltas belong to.
+
+        Args:
+            limit: An int representing how many users to retrieve
+
+        Returns:
+            A list of dicts representing ranked users, the highest first
+        """
+
+        def query(pending):
+            columns = (User.id, User.username, User.score)
+            rows = (
+                db.session.query(*columns)
+                .order_by(User.score.desc())
+                .limit(limit + len(pending))
+                .all()
+            )
+
+            if pending:
+                rows += (
+                    db.session.query(*columns)
+                    .filter(User.id.in_(pending))
+                    .all()
+                )
+
+            return {
+                user_id: (username, (score or 0) + pending.get(user_id, 0))
+                for user_id, username, score in rows
+            }
+
+        users = sorted(
+            self.read(query).items(),
+            key=lambda user: (-user[1][1], user[0]),
+        )[:limit]
+        top_users = []
+
+        for index, (user_id, (username, score)) in enumerate(users):
+            if index == 0 or score != users[index - 1][1][1]:
+                rank = index + 1
+            top_users.append(self.format(rank, user_id, username, score))
+
+        return top_users
+
+    def rank(self, user_id):
+        """Retrieve the rank of a single user.
+
+        Args:
+            user_id: An int representing the id of the user
+
+        Returns:
+            A dict representing the ranked user, or None if the user does
+            not exist
+        """
+
+        def query(pending):
+            user = (
+                db.session.query(User.username, User.score)
+                .filter(User.id == user_id)
+                .first()
+            )
+
+            if user is None:
+                return None
+
+            score = (user.score or 0) + pending.get(user_id, 0)
+            higher = (
+                db.session.query(func.count(User.id))
+                .filter(User.score > score)
+                .scalar()
+            )
+            others = {
+                other_id: delta
+                for other_id, delta in pending.items()
+                if other_id != user_id
+            }
+
+            if others:
+                for other_id, other_score in db.session.query(
+                    User.id, User.score
+                ).filter(User.id.in_(others)):
+                    other_score = other_score or 0
+                    higher += int(other_score + others[other_id] > score)
+                    higher -= int(other_score > score)
+
+            return self.format(higher + 1, user_id, user.username, score)
+
+        return self.read(query)
+
+    @staticmethod
+    def count():
+        """Retrieve the number of ranked users.
+
+        Returns:
+            An int representing the number of ranked users
+        """
+        return db.session.query(func.count(User.id)).scalar()
@@ -0,0 +1,366 @@
+"""Per-endpoint request latency and SQL instrumentation.
+
+Every request is timed and counted under the name of the route handler that
+served it, along with how many SQL statements it executed and how long they
+took, which are counted by hooks on every SQLAlchemy engine. Statements run
+on a raw DBAPI cursor, such as the COPY of bulk imports, bypass those hooks
+and are timed with timed_statement instead. A streamed response is recorded
+once its body has been sent, so the statements run while it streams count
+towards it. Statements that take longer than a threshold are logged with
+their SQL. The metrics of each app are kept in process memory, in its
+METRICS app config value, and exposed in the Prometheus text format by
+GET /metrics, so each worker is scraped on its own.
+
+The METRICS_SLOW_QUERY_SECONDS app config value overrides the slow query
+threshold, and None turns slow query logging off.
+
+Attributes:
+    LATENCY_BUCKETS: A tuple of floats representing the upper bounds, in
+        seconds, of the request and SQL duration histograms
+    STATEMENT_BUCKETS: A tuple of ints representing the upper bounds of the
+        histogram of SQL statements per request
+    SLOW_QUERY_SECONDS: A float representing the default number of seconds
+        after which a statement is logged as slow
+    CONTENT_TYPE: A str representing the content type of the Prometheus text
+        format
+
+Classes:
+    Histogram()
+    Metrics()
+"""
+
+import bisect
+import contextlib
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SLOW_QUERY_SECONDS = 0.5
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """A histogram of observations in fixed buckets.
+
+    Attributes:
+        buckets: A tuple of numbers representing the upper bound of each
+            bucket
+        counts: A list of ints representing how many observations fell in
+            each bucket, and a last one for those above every bound
+        total: A float representing the sum of the observations
+        count: An int representing how many observations were made
+    """
+
+    def __init__(self, buckets):
+        """Set-up for Histogram object."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        """Records an observation.
+
+        Args:
+            value: A number representing the observed value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def format(self, name, labels):
+        """Formats the histogram as lines of the Prometheus text format.
+
+        Args:
+            name: A str representing the name of the metric
+            labels: A str representing the labels of the histogram, without
+                braces
+
+        Returns:
+            lines: A list of strs representing the samples of the histogram
+        """
+        lines = []
+        cumulative = 0
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+
+        for bound, count in zip(bounds, self.counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            )
+
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+
+        return lines
+
+
+class Metrics:
+    """Request and SQL metrics of an app, by endpoint.
+
+    Attributes:
+        requests: A dict mapping a tuple of the endpoint, method and status
+            code to how many such requests were served
+        durations: A dict mapping a tuple of the endpoint and method to a
+            Histogram of request durations
+        statements: A dict mapping an endpoint to a Histogram of the number
+            of SQL statements per request
+        sql_durations: A dict mapping an endpoint to a Histogram of the time
+            spent in SQL per request
+        slow_queries: An int representing how many slow statements were
+            logged
+        lock: A threading.Lock object guarding the metrics
+    """
+
+    def __init__(self):
+        """Set-up for Metrics object."""
+        self.requests = {}
+        self.durations = {}
+        self.statements = {}
+        self.sql_durations = {}
+        self.slow_queries = 0
+        self.lock = threading.Lock()
+
+    def observe_request(
+        self, endpoint, method, status, seconds, statements, sql_seconds
+    ):
+        """Records a request that has been served.
+
+        Args:
+            endpoint: A str representing the route handler that served it
+            method: A str representing the http method of the request
+            status: An int representing the status code of the response
+            seconds: A float representing how long the request took
+            statements: An int representing how many SQL statements it ran
+            sql_seconds: A float representing how long the statements took
+        """
+        with self.lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            if (endpoint, method) not in self.durations:
+                self.durations[endpoint, method] = Histogram(LATENCY_BUCKETS)
+
+            if endpoint not in self.statements:
+                self.statements[endpoint] = Histogram(STATEMENT_BUCKETS)
+                self.sql_durations[endpoint] = Histogram(LATENCY_BUCKETS)
+
+            self.durations[endpoint, method].observe(seconds)
+            self.statements[endpoint].observe(statements)
+            self.sql_durations[endpoint].observe(sql_seconds)
+
+    def observe_slow_query(self):
+        """Records a statement that was logged as slow."""
+        with self.lock:
+            self.slow_queries += 1
+
+    def format(self):
+        """Formats every metric in the Prometheus text format.
+
+        Returns:
+            text: A str representing the metrics, one sample per line
+        """
+        lines = [
+            "# HELP trivia_requests_total Requests served, by endpoint.",
+            "# TYPE trivia_requests_total counter",
+        ]
+
+        with self.lock:
+            for (endpoint, method, status), count in sorted(
+                self.requests.items()
+            ):
+                lines.append(
+                    f'trivia_requests_total{{endpoint="{endpoint}",'
+                    f'method="{method}",status="{status}"}} {count}'
+                )
+
+            lines.extend(
+                [
+                    "# HELP trivia_request_duration_seconds Request "
+                    "latency, by endpoint.",
+                    "# TYPE trivia_request_duration_seconds histogram",
+                ]
+            )
+
+            for (endpoint, method), histogram in sorted(
+                self.durations.items()
+            ):
+                lines.extend(
+                    histogram.format(
+                        "trivia_request_duration_seconds",
+                        f'endpoint="{endpoint}",method="{method}"',
+                    )
+                )
+
+            for name, description, histograms in (
+                (
+                    "trivia_request_sql_statements",
+                    "SQL statements per request, by endpoint.",
+                    self.statements,
+                ),
+                (
+                    "trivia_request_sql_duration_seconds",
+                    "Time spent in SQL per request, by endpoint.",
+                    self.sql_durations,
+                ),
+            ):
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+
+                for endpoint, histogram in sorted(histograms.items()):
+                    lines.extend(
+                        histogram.format(name, f'endpoint="{endpoint}"')
+                    )
+
+            lines.extend(
+                [
+                    "# HELP trivia_sql_slow_queries_total SQL statements "
+                    "slower than the slow query threshold.",
+                    "# TYPE trivia_sql_slow_queries_total counter",
+                    f"trivia_sql_slow_queries_total {self.slow_queries}",
+                ]
+            )
+
+        text = "\n".join(lines) + "\n"
+        return text
+
+
+def start_request():
+    """Starts timing the current request and counting its statements."""
+    g.metrics_start = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+
+
+def finish_request(endpoint, method, response):
+    """Records the current request once its response has been sent.
+
+    A streamed response is recorded when its body has been sent, or closed,
+    rather than now.
+
+    Args:
+        endpoint: A str representing the route handler that served it
+        method: A str representing the http method of the request
+        response: A flask Response object the request was answered with
+    """
+    if g.get("metrics_start") is None:
+        return
+
+    metrics = current_app.config["METRICS"]
+    state = g._get_current_object()  # pylint: disable=protected-access
+
+    def observe():
+        metrics.observe_request(
+            endpoint,
+            method,
+            response.status_code,
+            time.perf_counter() - state.metrics_start,
+            state.sql_statements,
+            state.sql_seconds,
+        )
+
+    if not response.is_streamed:
+        observe()
+        return
+
+    body = response.response
+
+    def stream():
+        try:
+            yield from body
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+            observe()
+
+    response.response = stream()
+
+
+def observe_statement(statement, seconds):
+    """Counts a statement towards the current request and logs it if slow.
+
+    Args:
+        statement: A str representing the SQL of the statement
+        seconds: A float representing how long the statement took
+    """
+    if has_request_context() and "sql_statements" in g:
+        g.sql_statements += 1
+        g.sql_seconds += seconds
+
+    threshold = SLOW_QUERY_SECONDS
+    metrics = None
+
+    if has_app_context():
+        threshold = current_app.config.get(
+            "METRICS_SLOW_QUERY_SECONDS", SLOW_QUERY_SECONDS
+        )
+        metrics = current_app.config.get("METRICS")
+
+    if threshold is not None and seconds >= threshold:
+        if metrics is not None:
+            metrics.observe_slow_query()
+        logger.warning("Slow query took %.3fs: %s", seconds, statement)
+
+
+@contextlib.contextmanager
+def timed_statement(statement):
+    """Times a statement run on a raw DBAPI cursor.
+
+    Args:
+        statement: A str representing the SQL of the statement
+
+    Yields:
+        None, once timing has started
+    """
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        observe_statement(statement, time.perf_counter() - start)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):  # pylint: disable=unused-argument,too-many-arguments
+    """Notes when a statement starts executing on any engine."""
+    conn.info.setdefault("statement_starts", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "handle_error")
+def handle_error(exception_context):
+    """Forgets when a statement that failed started executing."""
+    connection = exception_context.connection
+
+    if connection is not None and connection.info.get("statement_starts"):
+        connection.info["statement_starts"].pop()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):  # pylint: disable=unused-argument,too-many-arguments
+    """Counts a statement towards the current request and logs it if slow."""
+    seconds = time.perf_counter() - conn.info["statement_starts"].pop()
+    observe_statement(statement, seconds)
@@ -0,0 +1,281 @@
+"""Versioned schema migrations and an index check for hot queries.
+
+Migrations are sql scripts in the backend/migrations folder named
+NNNN_description.sql. A script named NNNN_description.<dialect>.sql replaces
+the generic script of the same version on that dialect, and a version with
+only dialect specific scripts is skipped on other dialects. Applied versions
+are recorded in the schema_migrations table so each script runs once.
+
+Usage: flask migrate
+       flask check-indexes
+
+Attributes:
+    MIGRATIONS_FOLDER: A str representing the location of the migrations
+    MIGRATION_LOCK_ID: An int representing the postgresql advisory lock held
+        while a migration is applied
+    HOT_QUERIES: A tuple of HotQuery objects representing the queries that
+        are expected to be served by an index
+
+Classes:
+    Migration()
+    HotQuery()
+"""
+
+import os
+import re
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from models import db
+
+MIGRATIONS_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+MIGRATION_LOCK_ID = 7_411_823
+
+Migration = namedtuple("Migration", ["version", "name", "path"])
+HotQuery = namedtuple(
+    "HotQuery", ["name", "table", "sql", "params", "dialects"]
+)
+
+HOT_QUERIES = (
+    HotQuery(
+        "get_questions (cursor)",
+        "questions",
+        "SELECT id FROM questions WHERE id > :after_id ORDER BY id LIMIT 10",
+        {"after_id": 1},
+        None,
+    ),
+    HotQuery(
+        "get_category_questions",
+        "questions",
+        "SELECT id FROM questions WHERE category_id = :category_id "
+        "ORDER BY id LIMIT 10",
+        {"category_id": 1},
+        None,
+    ),
+    HotQuery(
+        "get_category_questions (cursor)",
+        "questions",
+        "SELECT id FROM questions "
+        "WHERE category_id = :category_id AND id > :after_id "
+        "ORDER BY id LIMIT 10",
+        {"category_id": 1, "after_id": 1},
+        None,
+    ),
+    HotQuery(
+        "create_quiz",
+        "questions",
+        "SELECT id FROM questions WHERE category_id = :category_id",
+        {"category_id": 1},
+        None,
+    ),
+    HotQuery(
+        "search_questions",
+        "questions",
+        "SELECT id FROM questions WHERE question ILIKE :search_term",
+        {"search_term": "%hanks%"},
+        ("postgresql",),
+    ),
+    HotQuery(
+        "get_leaderboard",
+        "users",
+        "SELECT id FROM users ORDER BY score DESC LIMIT 10",
+        {},
+        None,
+    ),
+    HotQuery(
+        "get_user_rank",
+        "users",
+        "SELECT count(*) FROM users WHERE score > :score",
+        {"score": 1},
+        None,
+    ),
+)
+
+
+def discover_migrations(dialect, folder=MIGRATIONS_FOLDER):
+    """Finds the migration scripts to apply on a dialect.
+
+    Args:
+        dialect: A str representing the name of the db dialect
+        folder: A str representing the location of the migrations
+
+    Returns:
+        A list of Migration objects ordered by version, where path is None
+            for versions that have no script for this dialect
+    """
+    names = {}
+    paths = {}
+
+    for filename in sorted(os.listdir(folder)):
+        match = re.fullmatch(r"(\d+)_(\w+?)(?:\.(\w+))?\.sql", filename)
+
+        if match is None:
+            continue
+
+        version, name, script_dialect = match.groups()
+        version = int(version)
+        names[version] = name
+
+        if script_dialect == dialect:
+            paths[version] = os.path.join(folder, filename)
+        elif script_dialect is None:
+            paths.setdefault(version, os.path.join(folder, filename))
+
+    return [
+        Migration(version, names[version], paths.get(version))
+        for version in sorted(names)
+    ]
+
+
+def split_statements(sql):
+    """Splits a sql script into its statements.
+
+    Args:
+        sql: A str representing the contents of a sql script
+
+    Returns:
+        A list of strs representing each statement without comments
+    """
+    lines = [
+        line for line in sql.splitlines() if not line.strip().startswith("--")
+    ]
+    statements = [
+        statement.strip() for statement in "\n".join(lines).split(";")
+    ]
+    return [statement for statement in statements if statement]
+
+
+def upgrade_db(engine=None):
+    """Applies every pending migration, each in its own transaction.
+
+    Args:
+        engine: A sqlalchemy Engine object for the db to migrate, defaults to
+            the engine of the flask app
+
+    Returns:
+        applied: A list of Migration objects representing the migrations that
+            were applied
+    """
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    applied = []
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INTEGER PRIMARY KEY, "
+                "name TEXT, "
+                "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+            )
+        )
+
+    for migration in discover_migrations(dialect):
+
+        with engine.begin() as connection:
+
+            if dialect == "postgresql":
+                connection.execute(
+                    text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                    lock_id=MIGRATION_LOCK_ID,
+                )
+
+            already_applied = connection.execute(
+                text(
+                    "SELECT 1 FROM schema_migrations WHERE version = :version"
+                ),
+                version=migration.version,
+            ).scalar()
+
+            if already_applied:
+                continue
+
+            if migration.path is not None:
+                with open(migration.path) as script:
+                    for statement in split_statements(script.read()):
+                        connection.execute(text(statement))
+
+            connection.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, name) "
+                    "VALUES (:version, :name)"
+                ),
+                version=migration.version,
+                name=migration.name,
+            )
+
+        applied.append(migration)
+
+    return applied
+
+
+def explain(connection, hot_query):
+    """Retrieve the query plan of a hot query.
+
+    Args:
+        connection: A sqlalchemy Connection object
+        hot_query: A HotQuery object representing the query to plan
+
+    Returns:
+        plan: A str representing the query plan
+        uses_index: A bool representing whether the query's table is read
+            through an index rather than scanned in full
+    """
+    if connection.dialect.name == "postgresql":
+        # Small tables are cheaper to scan, so only fall back to a scan when
+        # there is no index that can serve the query at all.
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = connection.execute(
+            text(f"EXPLAIN {hot_query.sql}"), **hot_query.params
+        )
+        plan = "\n".join(row[0] for row in rows)
+        uses_index = f"Seq Scan on {hot_query.table}" not in plan
+    else:
+        rows = connection.execute(
+            text(f"EXPLAIN QUERY PLAN {hot_query.sql}"), **hot_query.params
+        )
+        plan = "\n".join(row[-1] for row in rows)
+        uses_index = not re.search(
+            rf"\bSCAN (TABLE )?{hot_query.table}\b(?! USING)", plan
+        )
+
+    return plan, uses_index
+
+
+def check_indexes(engine=None):
+    """Plans every hot query to find the ones that run without an index.
+
+    Args:
+        engine: A sqlalchemy Engine object for the db to check, defaults to
+            the engine of the flask app
+
+    Returns:
+        results: A list of tuples of a HotQuery object, its query plan and
+            whether it uses an index
+    """
+    engine = engine or db.engine
+    results = []
+
+    for hot_query in HOT_QUERIES:
+
+        if (
+            hot_query.dialects is not None
+            and engine.dialect.name not in hot_query.dialects
+        ):
+            continue
+
+        connection = engine.connect()
+        transaction = connection.begin()
+
+        try:
+            plan, uses_index = explain(connection, hot_query)
+        finally:
+            transaction.rollback()
+            connection.close()
+
+        results.append((hot_query, plan, uses_index))
+
+    return results
@@ -0,0 +1,134 @@
+"""SQL-backed pagination for question listings.
+
+Pages are fetched with LIMIT/OFFSET so only the rows being shown are loaded
+from the db, and listing totals are read from the category statistics.
+Deep pages can instead be walked with an opaque cursor which seeks past the
+last question id seen, so every page costs the same amount of work. Listings
+are read-only, so only the columns shown are selected and each row is turned
+straight into a dict, without building Question objects.
+
+Attributes:
+    QUESTIONS_PER_PAGE: An int that is a global constant representing how many
+        questions to show on a page
+    QUESTION_COLUMNS: A tuple of strs representing the question columns shown
+        in listings, in the order they are selected
+"""
+
+import base64
+import binascii
+
+from models import Question
+
+QUESTIONS_PER_PAGE = 10
+QUESTION_COLUMNS = (
+    "id",
+    "question",
+    "answer",
+    "category_id",
+    "rating",
+    "difficulty",
+)
+
+
+def encode_cursor(question_id):
+    """Encodes a question id as an opaque cursor.
+
+    Args:
+        question_id: An int representing the id of the last question seen
+
+    Returns:
+        cursor: A str representing the position after the given question
+    """
+    cursor = base64.urlsafe_b64encode(f"id:{question_id}".encode()).decode()
+    return cursor
+
+
+def decode_cursor(cursor):
+    """Decodes an opaque cursor into a question id.
+
+    Args:
+        cursor: A str previously returned by encode_cursor
+
+    Returns:
+        question_id: An int representing the id of the last question seen
+
+    Raises:
+        ValueError: An error occurred decoding the cursor
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    prefix, _, question_id = decoded.partition(":")
+
+    if prefix != "id":
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    return int(question_id)
+
+
+def select_columns(query):
+    """Narrows a question query to the columns shown in listings.
+
+    The rows of the resulting query are plain tuples, which are neither
+    instrumented nor tracked in the session's identity map.
+
+    Args:
+        query: A Query object for questions
+
+    Returns:
+        query: A Query object yielding tuples of QUESTION_COLUMNS
+    """
+    query = query.with_entities(
+        *(getattr(Question, column) for column in QUESTION_COLUMNS)
+    )
+    return query
+
+
+def format_rows(rows):
+    """Formats rows of QUESTION_COLUMNS as dicts.
+
+    Args:
+        rows: An iterable of tuples of QUESTION_COLUMNS
+
+    Returns:
+        questions: A list of dicts representing the questions, in the same
+            form as Question.format()
+    """
+    questions = [dict(zip(QUESTION_COLUMNS, row)) for row in rows]
+    return questions
+
+
+def paginate_questions(query, page=1, after_id=None):
+    """Retrieve questions for the current page only.
+
+    Args:
+        query: A Query object for questions ordered by Question.id
+        page: An int representing the page number to retrieve questions for
+        after_id: An int representing the id of the last question seen, in
+            which case page is ignored and the page following it is retrieved
+
+    Returns:
+        current_questions: A list of dicts representing questions for the
+            given page
+        next_cursor: A str representing the cursor for the following page or
+            None if this is the last page
+    """
+    if after_id is not None:
+        query = query.filter(Question.id > after_id)
+    elif page < 1:
+        return [], None
+    else:
+        query = query.offset((page - 1) * QUESTIONS_PER_PAGE)
+
+    rows = select_columns(query).limit(QUESTIONS_PER_PAGE + 1).all()
+    next_cursor = None
+
+    if len(rows) > QUESTIONS_PER_PAGE:
+        rows = rows[:QUESTIONS_PER_PAGE]
+        next_cursor = encode_cursor(rows[-1][0])
+
+    current_questions = format_rows(rows)
+
+    return current_questions, next_cursor
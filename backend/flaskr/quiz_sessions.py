@@ -0,0 +1,160 @@
+"""Server-side quiz sessions.
+
+A quiz session holds a deck of question ids that is shuffled once when the
+quiz starts, so each turn just pops the next id from the deck instead of the
+client resending every previous question id.
+
+Attributes:
+    SESSION_TTL: An int representing how many seconds an idle session is kept
+        before it is evicted
+    QUIZ_DECK_SIZE: An int representing the default number of questions dealt
+        into a session's deck
+
+Classes:
+    SessionStore()
+    MemorySessionStore()
+"""
+
+import abc
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_TTL = 3600
+QUIZ_DECK_SIZE = 100
+
+
+class SessionStore(abc.ABC):
+    """The interface a quiz session store is expected to implement.
+
+    Stores are pluggable through the QUIZ_SESSION_STORE app config value, so
+    sessions may be kept somewhere shared between workers.
+    """
+
+    @abc.abstractmethod
+    def create(self, deck):
+        """Creates a new session.
+
+        Args:
+            deck: A list of ints representing the question ids of the session
+                in the order they should be asked
+
+        Returns:
+            A str representing the id of the session
+        """
+
+    @abc.abstractmethod
+    def pop(self, session_id):
+        """Removes the next question id from the deck of a session.
+
+        Args:
+            session_id: A str representing the id of the session
+
+        Returns:
+            An int representing the next question id, or None if the deck is
+            empty
+
+        Raises:
+            KeyError: The session does not exist or has expired
+        """
+
+    @abc.abstractmethod
+    def delete(self, session_id):
+        """Deletes a session.
+
+        Args:
+            session_id: A str representing the id of the session
+
+        Raises:
+            KeyError: The session does not exist or has expired
+        """
+
+
+class MemorySessionStore(SessionStore):
+    """A session store keeping sessions in process memory.
+
+    Sessions are ordered by when they expire, so expired sessions are evicted
+    from the front whenever the store is used.
+
+    Attributes:
+        ttl: An int representing how many seconds an idle session is kept
+        sessions: An OrderedDict mapping a session id to a tuple of its
+            reversed deck and the time that it expires
+        lock: A threading.Lock object guarding sessions
+    """
+
+    def __init__(self, ttl=SESSION_TTL):
+        """Set-up for MemorySessionStore object."""
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def evict(self, now):
+        """Removes every expired session.
+
+        Args:
+            now: A float representing the current time
+        """
+        while self.sessions:
+            session_id, (_, expires_at) = next(iter(self.sessions.items()))
+            if expires_at > now:
+                break
+            del self.sessions[session_id]
+
+    def create(self, deck):
+        """Creates a new session.
+
+        Args:
+            deck: A list of ints representing the question ids of the session
+                in the order they should be asked
+
+        Returns:
+            session_id: A str representing the id of the session
+        """
+        session_id = secrets.token_urlsafe(16)
+        now = time.monotonic()
+
+        with self.lock:
+            self.evict(now)
+            self.sessions[session_id] = (deck[::-1], now + self.ttl)
+
+        return session_id
+
+    def pop(self, session_id):
+        """Removes the next question id from the deck of a session.
+
+        Args:
+            session_id: A str representing the id of the session
+
+        Returns:
+            An int representing the next question id, or None if the deck is
+            empty
+
+        Raises:
+            KeyError: The session does not exist or has expired
+        """
+        now = time.monotonic()
+
+        with self.lock:
+            self.evict(now)
+            deck, _ = self.sessions.pop(session_id)
+            self.sessions[session_id] = (deck, now + self.ttl)
+
+            if len(deck) == 0:
+                return None
+
+            return deck.pop()
+
+    def delete(self, session_id):
+        """Deletes a session.
+
+        Args:
+            session_id: A str representing the id of the session
+
+        Raises:
+            KeyError: The session does not exist or has expired
+        """
+        with self.lock:
+            self.evict(time.monotonic())
+            del self.sessions[session_id]
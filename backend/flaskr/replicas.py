@@ -0,0 +1,220 @@
+"""Routing of read-only requests to read replicas of the db.
+
+Read-only endpoints take turns between the replicas, so their SELECTs are
+spread over them, while every other request, and every write, goes to the
+primary db. Each replica is health checked with a SELECT 1 at most once per
+check interval, and a replica that fails its check or a request is skipped
+until it passes again. When no replica is healthy reads go to the primary.
+
+Replicas lag behind the primary, so a request that writes sets a cookie which
+keeps its client reading from the primary for a few seconds, long enough for
+its own writes to reach the replicas.
+
+Attributes:
+    CHECK_INTERVAL: An int representing the default number of seconds between
+        health checks of a replica
+    STICKY_SECONDS: An int representing the default number of seconds that a
+        client which wrote keeps reading from the primary
+    STICKY_COOKIE: A str representing the name of the cookie holding the time
+        until which a client reads from the primary
+
+Classes:
+    ReplicaSet()
+"""
+
+import functools
+import logging
+import threading
+import time
+
+from flask import current_app, g, request
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from models import db
+
+CHECK_INTERVAL = 5
+STICKY_SECONDS = 5
+STICKY_COOKIE = "db_primary_until"
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """The read replicas of an app, picked in turn while they are healthy.
+
+    Attributes:
+        app: A flask app whose binds hold the replicas
+        bind_keys: A list of strs representing the bind key of each replica
+        check_interval: A float representing how many seconds pass between
+            health checks of a replica
+        healthy: A dict mapping a bind key to a bool that is True if the
+            replica passed its last health check
+        checked_at: A dict mapping a bind key to the time that the replica
+            was last checked
+        position: An int representing the index of the next replica to use
+        lock: A threading.Lock object guarding position
+    """
+
+    def __init__(self, app, bind_keys, check_interval=CHECK_INTERVAL):
+        """Set-up for ReplicaSet object."""
+        self.app = app
+        self.bind_keys = list(bind_keys)
+        self.check_interval = check_interval
+        self.healthy = {}
+        self.checked_at = {}
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def check(self, bind_key):
+        """Checks that a replica answers queries.
+
+        Args:
+            bind_key: A str representing the bind key of the replica
+
+        Returns:
+            A bool that is True if the replica answered a SELECT 1
+        """
+        try:
+            engine = db.get_engine(self.app, bind=bind_key)
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except SQLAlchemyError as error:
+            logger.warning("Replica %s is unhealthy: %s", bind_key, error)
+            return False
+
+        return True
+
+    def is_healthy(self, bind_key):
+        """Tells whether a replica is healthy, checking it if it is due.
+
+        Args:
+            bind_key: A str representing the bind key of the replica
+
+        Returns:
+            A bool that is True if the replica may be read from
+        """
+        now = time.monotonic()
+
+        if now - self.checked_at.get(bind_key, -self.check_interval) >= (
+            self.check_interval
+        ):
+            self.checked_at[bind_key] = now
+            self.healthy[bind_key] = self.check(bind_key)
+
+        return self.healthy.get(bind_key, False)
+
+    def mark_unhealthy(self, bind_key):
+        """Skips a replica until its next health check passes.
+
+        Args:
+            bind_key: A str representing the bind key of the replica
+        """
+        self.healthy[bind_key] = False
+        self.checked_at[bind_key] = time.monotonic()
+
+    def choose(self):
+        """Picks the next healthy replica in turn.
+
+        Returns:
+            A str representing the bind key of the replica, or None if no
+            replica is healthy
+        """
+        with self.lock:
+            start = self.position
+            self.position = (self.position + 1) % max(len(self.bind_keys), 1)
+
+        for offset in range(len(self.bind_keys)):
+            bind_key = self.bind_keys[(start + offset) % len(self.bind_keys)]
+
+            if self.is_healthy(bind_key):
+                return bind_key
+
+        return None
+
+    def format(self):
+        """Formats the health of the replicas as a list.
+
+        Returns:
+            A list of dicts representing the bind key of each replica and
+            whether it is healthy
+        """
+        return [
+            {"bind_key": bind_key, "healthy": self.healthy.get(bind_key)}
+            for bind_key in self.bind_keys
+        ]
+
+
+def reads_from_primary():
+    """Tells whether the client of the current request wrote recently.
+
+    Returns:
+        A bool that is True if the client should read its own writes from
+        the primary
+    """
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_only(view):
+    """Makes a read-only endpoint read from a replica.
+
+    If the replica fails the request with an OperationalError, it is marked
+    unhealthy and the request is retried once on the primary.
+
+    Args:
+        view: A function representing the route handler
+
+    Returns:
+        wrapper: A function wrapping the route handler
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.config["REPLICA_SET"]
+
+        if replicas is None or reads_from_primary():
+            return view(*args, **kwargs)
+
+        g.db_replica = replicas.choose()
+
+        if g.db_replica is None:
+            return view(*args, **kwargs)
+
+        try:
+            return view(*args, **kwargs)
+        except OperationalError as error:
+            logger.warning("Replica %s failed: %s", g.db_replica, error)
+            replicas.mark_unhealthy(g.db_replica)
+            db.session.rollback()
+            g.db_replica = None
+
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def stick_to_primary(response):
+    """Keeps the client of a request that wrote reading from the primary.
+
+    Args:
+        response: A flask Response object for the current request
+
+    Returns:
+        response: The response, with the sticky cookie set if the request
+            wrote to the db
+    """
+    if g.get("db_wrote") and current_app.config["REPLICA_SET"] is not None:
+        seconds = current_app.config.get(
+            "REPLICA_STICKY_SECONDS", STICKY_SECONDS
+        )
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(time.time() + seconds),
+            max_age=seconds,
+            httponly=True,
+        )
+
+    return response
@@ -0,0 +1,518 @@
+"""A server-side cache of paginated question listings.
+
+Rendered pages of GET /questions and GET /categories/<id>/questions are kept
+with their validators, so a cached page is served, or answered with a 304,
+without touching the db at all. Each page is filed under the category it
+lists, with 0 standing for the listing of every category, and the write
+endpoints evict only the pages of the category they changed along with the
+pages listing every category.
+
+The cache is pluggable through the RESPONSE_CACHE app config value. The
+default keeps a size bounded LRU in process memory, while a shared cache
+keeps pages in a key-value store such as redis so that every worker sees the
+same pages and evictions.
+
+Pages read from a replica are not cached, as they may lag behind the
+primary, and clients kept on the primary after a write always skip the
+cache so that they read their own writes.
+
+Attributes:
+    ALL_CATEGORIES: An int representing the scope of listings that span
+        every category
+    RESPONSE_CACHE_TTL: An int representing how many seconds a page is
+        considered fresh, which bounds how long writes made through other
+        workers go unnoticed by an in-process cache
+    MAX_ENTRIES: An int representing the default number of pages kept in
+        process memory
+    MAX_SIZE: An int representing the default number of characters of page
+        bodies kept in process memory
+
+Classes:
+    ResponseCache()
+    LruResponseCache()
+    SharedResponseCache()
+    LocalStore()
+"""
+
+import abc
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import current_app, g, request
+from werkzeug.http import parse_date
+
+from flaskr.http_cache import is_not_modified, set_cache_headers
+from flaskr.replicas import reads_from_primary
+
+ALL_CATEGORIES = 0
+RESPONSE_CACHE_TTL = 60
+MAX_ENTRIES = 1024
+MAX_SIZE = 16 * 1024 * 1024
+
+
+class ResponseCache(abc.ABC):
+    """The interface a response cache is expected to implement.
+
+    Pages are dicts holding the body of a response and its validators, and
+    are stored together with the scope, i.e. the category, they list.
+
+    Attributes:
+        hits: An int representing how many lookups found a page
+        misses: An int representing how many lookups found nothing
+        evictions: An int representing how many pages were dropped to make
+            room or because they expired
+        invalidations: An int representing how many pages, or scopes for a
+            shared cache, were dropped because of a write
+        lock: A threading.Lock object guarding the counters
+    """
+
+    def __init__(self):
+        """Set-up for ResponseCache object."""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    @abc.abstractmethod
+    def get(self, key, scope):
+        """Looks up a cached page.
+
+        Args:
+            key: A str identifying the page
+            scope: An int representing the category the page lists
+
+        Returns:
+            page: A dict representing the cached page, or None on a miss
+            token: An object to pass to set when filling a miss, so that a
+                page rendered before an eviction is not stored after it
+        """
+
+    @abc.abstractmethod
+    def set(self, key, scope, page, token):
+        """Stores a rendered page.
+
+        Args:
+            key: A str identifying the page
+            scope: An int representing the category the page lists
+            page: A dict representing the rendered page
+            token: The token returned by the get that missed
+        """
+
+    @abc.abstractmethod
+    def evict(self, category_id):
+        """Drops the pages of a category and the pages of every category.
+
+        Args:
+            category_id: An int representing the category that was written
+        """
+
+    @abc.abstractmethod
+    def clear(self):
+        """Drops every page."""
+
+    def format(self):
+        """Formats the counters of the cache as a dict.
+
+        Returns:
+            A dict representing the hits, misses and evictions of the cache
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class LruResponseCache(ResponseCache):
+    """A response cache keeping pages in process memory.
+
+    Attributes:
+        max_entries: An int representing the most pages kept
+        max_size: An int representing the most characters of page bodies kept
+        ttl: An int representing how many seconds a page is considered fresh
+        pages: An OrderedDict mapping a key to a tuple of the page's scope,
+            the page, its size and when it expires, least recently used first
+        scopes: A dict mapping a scope to a set of the keys filed under it
+        generations: A dict mapping a scope to how many times it was evicted
+        epoch: An int representing how many times the cache was cleared
+        size: An int representing the characters of page bodies kept
+    """
+
+    def __init__(
+        self,
+        max_entries=MAX_ENTRIES,
+        max_size=MAX_SIZE,
+        ttl=RESPONSE_CACHE_TTL,
+    ):
+        """Set-up for LruResponseCache object."""
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self.pages = OrderedDict()
+        self.scopes = {}
+        self.generations = {}
+        self.epoch = 0
+        self.size = 0
+
+    def discard(self, key):
+        """Removes a page without locking.
+
+        Args:
+            key: A str identifying the page
+        """
+        scope, _, size, _ = self.pages.pop(key)
+        self.size -= size
+        keys = self.scopes[scope]
+        keys.discard(key)
+
+        if len(keys) == 0:
+            del self.scopes[scope]
+
+    def get(self, key, scope):
+        """Looks up a cached page, marking it as recently used.
+
+        Args:
+            key: A str identifying the page
+            scope: An int representing the category the page lists
+
+        Returns:
+            page: A dict representing the cached page, or None on a miss
+            token: A tuple of the epoch and the generation of the scope
+        """
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.pages.get(key)
+
+            if entry is not None and entry[3] <= now:
+                self.discard(key)
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None, (self.epoch, self.generations.get(scope, 0))
+
+            self.pages.move_to_end(key)
+            self.hits += 1
+
+            return entry[1], None
+
+    def set(self, key, scope, page, token):
+        """Stores a rendered page, evicting the least recently used pages.
+
+        Args:
+            key: A str identifying the page
+            scope: An int representing the category the page lists
+            page: A dict representing the rendered page
+            token: The token returned by the get that missed
+        """
+        size = len(page["body"])
+
+        if size > self.max_size:
+            return
+
+        with self.lock:
+            if token != (self.epoch, self.generations.get(scope, 0)):
+                return
+
+            if key in self.pages:
+                self.discard(key)
+
+            self.pages[key] = (scope, page, size, time.monotonic() + self.ttl)
+            self.scopes.setdefault(scope, set()).add(key)
+            self.size += size
+
+            while (
+                len(self.pages) > self.max_entries or self.size > self.max_size
+            ):
+                self.discard(next(iter(self.pages)))
+                self.evictions += 1
+
+    def evict(self, category_id):
+        """Drops the pages of a category and the pages of every category.
+
+        Args:
+            category_id: An int representing the category that was written
+        """
+        with self.lock:
+            for scope in {ALL_CATEGORIES, category_id}:
+                self.generations[scope] = self.generations.get(scope, 0) + 1
+
+                for key in list(self.scopes.get(scope, ())):
+                    self.discard(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drops every page."""
+        with self.lock:
+            self.epoch += 1
+            self.invalidations += len(self.pages)
+            self.pages.clear()
+            self.scopes.clear()
+            self.size = 0
+
+    def format(self):
+        """Formats the counters and usage of the cache as a dict.
+
+        Returns:
+            stats: A dict representing the state of the cache
+        """
+        stats = super().format()
+
+        with self.lock:
+            stats.update({"entries": len(self.pages), "size": self.size})
+
+        return stats
+
+
+class SharedResponseCache(ResponseCache):
+    """A response cache keeping pages in a key-value store.
+
+    Pages are stored under keys containing a counter of the cache and a
+    counter of the page's scope, so evicting a scope is a single increment
+    that leaves its pages unreachable until the store expires them. Size
+    bounds are left to the store, e.g. redis with an allkeys-lru policy.
+
+    Attributes:
+        store: An object with get(key), mget(keys), set(key, value, ex) and
+            incr(key) methods, such as a redis client or a LocalStore
+        ttl: An int representing how many seconds a page is kept
+        prefix: A str prepended to every key in the store
+    """
+
+    def __init__(self, store, ttl=RESPONSE_CACHE_TTL, prefix="trivia:pages:"):
+        """Set-up for SharedResponseCache object."""
+        super().__init__()
+        self.store = store
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key, scope):
+        """Looks up a cached page.
+
+        Args:
+            key: A str identifying the page
+            scope: An int representing the category the page lists
+
+        Returns:
+            page: A dict representing the cached page, or None on a miss
+            token: A str representing the key the page would be stored under
+        """
+        epoch, generation = self.store.mget(
+            [f"{self.prefix}epoch", f"{self.prefix}scope:{scope}"]
+        )
+        versioned_key = (
+            f"{self.prefix}{int(epoch or 0)}:{scope}:{int(generation or 0)}:"
+            f"{key}"
+        )
+        value = self.store.get(versioned_key)
+
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None, versioned_key
+
+            self.hits += 1
+
+        return json.loads(value), None
+
+    def set(self, key, scope, page, token):
+        """Stores a rendered page.
+
+        Args:
+            key: A str identifying the page
+            scope: An int representing the category the page lists
+            page: A dict representing the rendered page
+            token: The token returned by the get that missed
+        """
+        self.store.set(token, json.dumps(page), ex=self.ttl)
+
+    def evict(self, category_id):
+        """Drops the pages of a category and the pages of every category.
+
+        Args:
+            category_id: An int representing the category that was written
+        """
+        for scope in {ALL_CATEGORIES, category_id}:
+            self.store.incr(f"{self.prefix}scope:{scope}")
+
+            with self.lock:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drops every page."""
+        self.store.incr(f"{self.prefix}epoch")
+
+        with self.lock:
+            self.invalidations += 1
+
+
+class LocalStore:
+    """An in-process stand-in for a shared key-value store such as redis.
+
+    Attributes:
+        values: A dict mapping a key to a tuple of its value and when it
+            expires, or None if it does not expire
+        lock: A threading.Lock object guarding values
+    """
+
+    def __init__(self):
+        """Set-up for LocalStore object."""
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def lookup(self, key):
+        """Retrieves the value of a key without locking.
+
+        Args:
+            key: A str representing the key
+
+        Returns:
+            The value of the key, or None if it is missing or has expired
+        """
+        value, expires_at = self.values.get(key, (None, None))
+
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+
+        return value
+
+    def get(self, key):
+        """Retrieves the value of a key.
+
+        Args:
+            key: A str representing the key
+
+        Returns:
+            The value of the key, or None if it is missing or has expired
+        """
+        with self.lock:
+            return self.lookup(key)
+
+    def mget(self, keys):
+        """Retrieves the values of several keys.
+
+        Args:
+            keys: A list of strs representing the keys
+
+        Returns:
+            A list of the values of the keys, with None for missing keys
+        """
+        with self.lock:
+            return [self.lookup(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        """Sets the value of a key.
+
+        Args:
+            key: A str representing the key
+            value: The value to store
+            ex: An int representing how many seconds the key is kept, or None
+                to keep it until it is overwritten
+        """
+        expires_at = None if ex is None else time.monotonic() + ex
+
+        with self.lock:
+            self.values[key] = (value, expires_at)
+
+    def incr(self, key):
+        """Atomically increments the integer value of a key.
+
+        Args:
+            key: A str representing the key
+
+        Returns:
+            An int representing the incremented value
+        """
+        with self.lock:
+            value = int(self.lookup(key) or 0) + 1
+            self.values[key] = (value, None)
+
+            return value
+
+
+def evict_category(category_id):
+    """Evicts the cached pages affected by a write to a category.
+
+    Args:
+        category_id: An int representing the category that was written
+    """
+    cache = current_app.config["RESPONSE_CACHE"]
+
+    if cache is not None:
+        cache.evict(category_id)
+
+
+def clear_pages():
+    """Evicts every cached page."""
+    cache = current_app.config["RESPONSE_CACHE"]
+
+    if cache is not None:
+        cache.clear()
+
+
+def cached_listing(view):
+    """Serves a paginated listing from the response cache.
+
+    The category a page lists is taken from the route's category_id, and
+    pages without one list every category.
+
+    Args:
+        view: A route handler rendering the listing
+
+    Returns:
+        wrapper: A function wrapping the route handler
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.config["RESPONSE_CACHE"]
+
+        if cache is None or reads_from_primary():
+            return view(*args, **kwargs)
+
+        query_string = urlencode(sorted(request.args.items(multi=True)))
+        key = f"{request.path}?{query_string}"
+        scope = kwargs.get("category_id", ALL_CATEGORIES)
+        page, token = cache.get(key, scope)
+
+        if page is None:
+            response = current_app.make_response(view(*args, **kwargs))
+
+            if (
+                response.status_code == 200
+                and not response.is_streamed
+                and g.get("db_replica") is None
+            ):
+                etag, _ = response.get_etag()
+                page = {
+                    "body": response.get_data(as_text=True),
+                    "etag": etag,
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                cache.set(key, scope, page, token)
+
+            return response
+
+        last_modified = parse_date(page["last_modified"])
+
+        if is_not_modified(page["etag"], last_modified):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(
+                page["body"], mimetype="application/json"
+            )
+
+        return set_cache_headers(response, page["etag"], last_modified)
+
+    return wrapper
@@ -0,0 +1,167 @@
+"""Write-behind aggregation of user score increments.
+
+Very hot users can receive many score increments at once. Rather than each
+one updating the user's row, deltas are summed per user in memory and flushed
+to the db periodically in a single transaction. Deltas that have not been
+flushed are lost if the process dies, so this is opt-in through the
+SCORE_WRITE_BEHIND environment variable and app config value, and the running
+aggregator is kept in the SCORE_AGGREGATOR app config value.
+
+A score is the stored score plus the pending delta. Flushes are held off
+while a score is read, so a delta is never counted both in the db and as
+pending, nor missed while it is being written.
+
+Attributes:
+    FLUSH_INTERVAL: A float representing how many seconds pass between
+        flushes
+
+Classes:
+    ScoreAggregator()
+"""
+
+import atexit
+import logging
+import threading
+
+from models import User, db
+
+FLUSH_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreAggregator:
+    """Sums score deltas per user and flushes them to the db in batches.
+
+    Attributes:
+        flush_interval: A float representing how many seconds pass between
+            flushes
+        pending: A dict mapping a user id to the delta not yet flushed
+        lock: A threading.Lock object guarding pending
+        flush_lock: A threading.Lock object held while deltas are written,
+            and while scores are read, so reads never see a flush midway
+        stopped: A threading.Event object set when flushing should stop
+        thread: A threading.Thread object flushing in the background, or None
+            if it has not been started
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        """Set-up for ScoreAggregator object."""
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add(self, user_id, delta):
+        """Records a score delta for a user.
+
+        Args:
+            user_id: An int representing the id of the user
+            delta: An int representing the amount to add to the score
+
+        Returns:
+            An int representing the total delta pending for the user
+        """
+        with self.lock:
+            self.pending[user_id] = self.pending.get(user_id, 0) + delta
+            return self.pending[user_id]
+
+    def get(self, user_id):
+        """Retrieve the delta pending for a user.
+
+        Args:
+            user_id: An int representing the id of the user
+
+        Returns:
+            An int representing the total delta pending for the user
+        """
+        with self.lock:
+            return self.pending.get(user_id, 0)
+
+    def read(self, query):
+        """Runs a db read alongside the deltas it does not include yet.
+
+        Args:
+            query: A function taking a dict mapping a user id to the delta
+                not yet flushed and reading from the db
+
+        Returns:
+            The result of query
+        """
+        with self.flush_lock:
+            with self.lock:
+                pending = dict(self.pending)
+
+            return query(pending)
+
+    def add_score(self, user_id, delta):
+        """Records a score delta for a user and reads their new score.
+
+        Args:
+            user_id: An int representing the id of the user
+            delta: An int representing the amount to add to the score
+
+        Returns:
+            new_score: An int representing the score including every pending
+                delta, or None if the user does not exist
+        """
+        with self.flush_lock:
+            user = db.session.query(User.score).filter(User.id == user_id)
+            user = user.first()
+
+            if user is None:
+                return None
+
+            return (user.score or 0) + self.add(user_id, delta)
+
+    def flush(self):
+        """Writes every pending delta to the db in one transaction.
+
+        Deltas are put back to be retried if the write fails.
+        """
+        with self.flush_lock:
+            with self.lock:
+                deltas, self.pending = self.pending, {}
+
+            deltas = {
+                user_id: delta for user_id, delta in deltas.items() if delta
+            }
+
+            if len(deltas) == 0:
+                return
+
+            try:
+                User.add_scores(deltas)
+            except Exception:  # pylint: disable=broad-except
+                db.session.rollback()
+                logger.exception(
+                    "Failed to flush %d score deltas", len(deltas)
+                )
+                with self.lock:
+                    for user_id, delta in deltas.items():
+                        self.pending[user_id] = (
+                            self.pending.get(user_id, 0) + delta
+                        )
+
+    def start(self, app):
+        """Starts flushing in a background thread.
+
+        Args:
+            app: A flask app providing the app context for db access
+        """
+
+        def run():
+            while not self.stopped.wait(self.flush_interval):
+                with app.app_context():
+                    self.flush()
+
+        def stop():
+            self.stopped.set()
+            with app.app_context():
+                self.flush()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        atexit.register(stop)
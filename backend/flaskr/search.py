@@ -0,0 +1,251 @@
+"""Question search.
+
+On postgresql searches are served by a trigram GIN index over the question
+text, which answers the case-insensitive substring match directly instead of
+scanning the table, and results are ranked by trigram similarity. Other dbs,
+such as sqlite in test set-ups, fall back to an in-memory trigram inverted
+index that is kept in step with created and deleted questions.
+
+Attributes:
+    INDEX_TTL: An int representing how many seconds the in-memory index is
+        considered fresh before it is reloaded from the db
+
+Classes:
+    InvertedIndex()
+"""
+
+import re
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func
+
+from flaskr.pagination import (
+    QUESTIONS_PER_PAGE,
+    format_rows,
+    paginate_questions,
+    select_columns,
+)
+from models import Question, db
+
+INDEX_TTL = 300
+
+
+def substring_trigrams(text):
+    """Splits text into every run of three characters.
+
+    Any text containing a search term contains all of the term's substring
+    trigrams, so these are used to narrow down candidate matches.
+
+    Args:
+        text: A lowercase str to split
+
+    Returns:
+        A set of strs representing the trigrams of the text
+    """
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(text):
+    """Splits text into trigrams the same way as postgresql's pg_trgm.
+
+    Args:
+        text: A str to split
+
+    Returns:
+        A set of strs representing the trigrams of each padded word
+    """
+    trigrams = set()
+
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        trigrams.update(substring_trigrams(padded))
+
+    return trigrams
+
+
+def similarity(term_trigrams, text):
+    """Scores how similar a text is to a search term.
+
+    Args:
+        term_trigrams: A set of strs representing the word trigrams of the
+            search term
+        text: A str representing the text to score
+
+    Returns:
+        A float between 0 and 1 where higher is more similar
+    """
+    text_trigrams = word_trigrams(text)
+    union = term_trigrams | text_trigrams
+
+    if len(union) == 0:
+        return 0
+
+    return len(term_trigrams & text_trigrams) / len(union)
+
+
+class InvertedIndex:
+    """An in-memory index mapping trigrams to the questions containing them.
+
+    Attributes:
+        ttl: An int representing how many seconds the index is considered
+            fresh before it is reloaded
+        texts: A dict mapping a question id to its lowercase question text
+        postings: A dict mapping a trigram to a set of question ids
+        loaded_at: A float representing when the index was loaded, or None if
+            it has not been loaded
+        lock: A threading.Lock object guarding the index
+    """
+
+    def __init__(self, ttl=INDEX_TTL):
+        """Set-up for InvertedIndex object."""
+        self.ttl = ttl
+        self.texts = {}
+        self.postings = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def index(self, question_id, text):
+        """Adds a question to the index without locking.
+
+        Args:
+            question_id: An int representing the id of the question
+            text: A str representing the question text
+        """
+        text = (text or "").lower()
+        self.texts[question_id] = text
+
+        for trigram in substring_trigrams(text):
+            self.postings.setdefault(trigram, set()).add(question_id)
+
+    def load(self):
+        """Rebuilds the index from every question in the db."""
+        questions = db.session.query(Question.id, Question.question)
+
+        with self.lock:
+            self.texts = {}
+            self.postings = {}
+
+            for question_id, text in questions:
+                self.index(question_id, text)
+
+            self.loaded_at = time.monotonic()
+
+    def add(self, question_id, text):
+        """Adds a newly created question if the index is loaded.
+
+        Args:
+            question_id: An int representing the id of the question
+            text: A str representing the question text
+        """
+        with self.lock:
+            if self.loaded_at is not None:
+                self.index(question_id, text)
+
+    def remove(self, question_id):
+        """Removes a deleted question if it is in the index.
+
+        Args:
+            question_id: An int representing the id of the question
+        """
+        with self.lock:
+            text = self.texts.pop(question_id, None)
+
+            if text is None:
+                return
+
+            for trigram in substring_trigrams(text):
+                self.postings.get(trigram, set()).discard(question_id)
+
+    def clear(self):
+        """Discards the index so it is reloaded on the next search."""
+        with self.lock:
+            self.texts = {}
+            self.postings = {}
+            self.loaded_at = None
+
+    def search(self, search_term):
+        """Finds every question containing a search term.
+
+        Args:
+            search_term: A str to search question text for, ignoring case
+
+        Returns:
+            A list of ints representing the ids of matching questions, the
+            most similar first
+        """
+        if (
+            self.loaded_at is None
+            or time.monotonic() - self.loaded_at > self.ttl
+        ):
+            self.load()
+
+        term = search_term.lower()
+        term_trigrams = word_trigrams(term)
+
+        with self.lock:
+            postings = [
+                self.postings.get(trigram, set())
+                for trigram in substring_trigrams(term)
+            ]
+
+            if len(postings) > 0:
+                postings.sort(key=len)
+                candidates = set.intersection(*postings)
+            else:
+                candidates = self.texts.keys()
+
+            matches = [
+                (
+                    similarity(term_trigrams, self.texts[question_id]),
+                    question_id,
+                )
+                for question_id in candidates
+                if term in self.texts[question_id]
+            ]
+
+        matches.sort(key=lambda match: (-match[0], match[1]))
+
+        return [question_id for _, question_id in matches]
+
+
+def search_questions(search_term, page):
+    """Retrieve a page of questions containing a search term.
+
+    Args:
+        search_term: A str to search question text for, ignoring case
+        page: An int representing the page number to retrieve questions for
+
+    Returns:
+        current_questions: A list of dicts representing matching questions
+            for the given page, the most similar first
+        total_questions: An int representing the number of matches
+    """
+    if db.engine.dialect.name == "postgresql":
+        questions = Question.query.filter(
+            Question.question.ilike(f"%{search_term}%")
+        ).order_by(
+            func.similarity(Question.question, search_term).desc(),
+            Question.id,
+        )
+        current_questions, _ = paginate_questions(questions, page)
+        total_questions = questions.order_by(None).count()
+
+        return current_questions, total_questions
+
+    question_ids = current_app.config["SEARCH_INDEX"].search(search_term)
+    page_ids = []
+
+    if page > 0:
+        start = (page - 1) * QUESTIONS_PER_PAGE
+        page_ids = question_ids[start : start + QUESTIONS_PER_PAGE]
+
+    positions = {question_id: i for i, question_id in enumerate(page_ids)}
+    rows = select_columns(
+        Question.query.filter(Question.id.in_(page_ids))
+    ).all()
+    rows.sort(key=lambda row: positions[row[0]])
+    current_questions = format_rows(rows)
+
+    return current_questions, len(question_ids)
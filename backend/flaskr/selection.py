@@ -0,0 +1,467 @@
+"""Random question selection for quizzes.
+
+Questions are loaded once per category into in-memory arrays of ids, and a
+random question is picked by rejection sampling against the ids that have
+already been asked, so each quiz turn costs a single primary key lookup no
+matter how many questions are in the category. Before a category is loaded,
+its question count is looked up in the category statistics, so categories
+without questions are answered without loading their ids.
+
+Quizzes may also be limited to a range of difficulties and biased towards
+highly (or poorly) rated questions, in which case each question is weighted
+by its rating raised to the power of the bias. Ratings and difficulties only
+take a handful of values, so the ids of a category are bucketed by both and a
+weighted pick first draws a bucket from a table of cumulative weights, whose
+size does not depend on the number of questions, and then an id from the
+bucket. Changing a rating moves its id to another bucket.
+
+Attributes:
+    POOL_TTL: An int representing how many seconds a loaded category is
+        considered fresh before its ids are reloaded from the db
+    MAX_REJECTIONS: An int representing how many random picks are tried
+        before falling back to filtering the remaining ids
+    UNRATED_RATING: An int representing the rating that unrated questions are
+        weighted as
+    MAX_RATING_BIAS: A float representing the largest rating bias, either
+        way, that a quiz may use
+
+Classes:
+    IdArray()
+    QuestionBuckets()
+    QuestionPool()
+"""
+
+import random
+import threading
+import time
+
+from flask import current_app
+
+from models import CategoryStats, Question, db
+
+POOL_TTL = 300
+MAX_REJECTIONS = 16
+UNRATED_RATING = 3
+MAX_RATING_BIAS = 4.0
+
+
+def load_questions(category_id):
+    """Retrieve the id, difficulty and rating of all questions in a category.
+
+    Args:
+        category_id: An int representing the category to load questions for
+            (0 represents all categories)
+
+    Returns:
+        A list of tuples of ints representing the id, difficulty and rating
+            of each question
+    """
+    query = db.session.query(Question.id, Question.difficulty, Question.rating)
+
+    if category_id != 0:
+        query = query.filter(Question.category_id == category_id)
+
+    return [tuple(row) for row in query]
+
+
+def rating_weight(rating, rating_bias):
+    """Weighs a question by its rating for a biased quiz.
+
+    Args:
+        rating: An int representing the rating of the question, or None if
+            it is unrated
+        rating_bias: A float representing the power the rating is raised to
+            (0 weighs every question the same)
+
+    Returns:
+        A float representing the relative chance of picking the question
+    """
+    if rating is None:
+        rating = UNRATED_RATING
+
+    return max(rating, 1) ** rating_bias
+
+
+class IdArray:
+    """An array of ids supporting O(1) insertion, removal and random picks.
+
+    Attributes:
+        ids: A list of ints representing the ids in the array
+        positions: A dict mapping an id to its index in ids
+        loaded_at: A float representing the time that the array was loaded
+    """
+
+    def __init__(self, ids):
+        """Set-up for IdArray object."""
+        self.ids = list(ids)
+        self.positions = {id_: index for index, id_ in enumerate(self.ids)}
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        """Returns the number of ids in the array."""
+        return len(self.ids)
+
+    def add(self, id_):
+        """Adds an id to the array if it is not already present.
+
+        Args:
+            id_: An int representing the id to add
+        """
+        if id_ not in self.positions:
+            self.positions[id_] = len(self.ids)
+            self.ids.append(id_)
+
+    def remove(self, id_):
+        """Removes an id from the array by swapping it with the last id.
+
+        Args:
+            id_: An int representing the id to remove
+        """
+        index = self.positions.pop(id_, None)
+
+        if index is None:
+            return
+
+        last = self.ids.pop()
+
+        if index < len(self.ids):
+            self.ids[index] = last
+            self.positions[last] = index
+
+    def choose(self, exclude):
+        """Picks a random id that is not excluded.
+
+        Args:
+            exclude: A set of ints representing ids that may not be picked
+
+        Returns:
+            An int representing a random id, or None if every id is excluded
+        """
+        excluded = sum(1 for id_ in exclude if id_ in self.positions)
+        remaining = len(self.ids) - excluded
+
+        if remaining <= 0:
+            return None
+
+        if remaining * 2 > len(self.ids):
+            for _ in range(MAX_REJECTIONS):
+                id_ = random.choice(self.ids)
+                if id_ not in exclude:
+                    return id_
+
+        return random.choice([id_ for id_ in self.ids if id_ not in exclude])
+
+    def sample(self, k):
+        """Picks up to k distinct ids in a random order.
+
+        Args:
+            k: An int representing the number of ids to pick
+
+        Returns:
+            A list of ints representing the picked ids
+        """
+        return random.sample(self.ids, min(k, len(self.ids)))
+
+
+class QuestionBuckets:
+    """The question ids of a category, bucketed by difficulty and rating.
+
+    Attributes:
+        ids: An IdArray object holding every id of the category
+        buckets: A dict mapping a tuple of a difficulty and a rating to an
+            IdArray object holding the ids of the questions that have them
+        keys: A dict mapping an id to the key of its bucket
+        loaded_at: A float representing the time that the ids were loaded
+    """
+
+    def __init__(self, questions):
+        """Set-up for QuestionBuckets object."""
+        self.keys = {
+            id_: (difficulty, rating) for id_, difficulty, rating in questions
+        }
+        self.ids = IdArray(self.keys)
+        self.loaded_at = self.ids.loaded_at
+        grouped = {}
+
+        for id_, key in self.keys.items():
+            grouped.setdefault(key, []).append(id_)
+
+        self.buckets = {key: IdArray(ids) for key, ids in grouped.items()}
+
+    def __len__(self):
+        """Returns the number of ids in the category."""
+        return len(self.ids)
+
+    def add(self, id_, difficulty, rating):
+        """Adds an id to the category if it is not already present.
+
+        Args:
+            id_: An int representing the id to add
+            difficulty: An int representing the difficulty of the question
+            rating: An int representing the rating of the question
+        """
+        if id_ in self.keys:
+            return
+
+        key = (difficulty, rating)
+        self.ids.add(id_)
+        self.keys[id_] = key
+
+        if key not in self.buckets:
+            self.buckets[key] = IdArray([])
+
+        self.buckets[key].add(id_)
+
+    def remove(self, id_):
+        """Removes an id from the category and from its bucket.
+
+        Args:
+            id_: An int representing the id to remove
+        """
+        key = self.keys.pop(id_, None)
+
+        if key is None:
+            return
+
+        self.ids.remove(id_)
+        bucket = self.buckets[key]
+        bucket.remove(id_)
+
+        if len(bucket) == 0:
+            del self.buckets[key]
+
+    def update_rating(self, id_, rating):
+        """Moves an id to the bucket of its new rating.
+
+        Args:
+            id_: An int representing the id whose rating changed
+            rating: An int representing the new rating of the question
+        """
+        key = self.keys.get(id_)
+
+        if key is not None and key[1] != rating:
+            self.remove(id_)
+            self.add(id_, key[0], rating)
+
+    def choose(self, exclude, difficulties=None, rating_bias=0):
+        """Picks a random id that is not excluded.
+
+        Args:
+            exclude: A set of ints representing ids that may not be picked
+            difficulties: A range of ints representing the difficulties that
+                may be picked, or None if any may be
+            rating_bias: A float representing the power that ratings are
+                raised to in order to weigh ids (0 weighs every id the same)
+
+        Returns:
+            An int representing a random id, or None if no id is left
+        """
+        if difficulties is None and rating_bias == 0:
+            return self.ids.choose(exclude)
+
+        counts = {
+            key: len(bucket)
+            for key, bucket in self.buckets.items()
+            if difficulties is None or key[0] in difficulties
+        }
+
+        for id_ in exclude:
+            key = self.keys.get(id_)
+            if key in counts:
+                counts[key] -= 1
+
+        keys = [key for key, count in counts.items() if count > 0]
+
+        if len(keys) == 0:
+            return None
+
+        weights = [
+            counts[key] * rating_weight(key[1], rating_bias) for key in keys
+        ]
+        key = random.choices(keys, weights)[0]
+
+        return self.buckets[key].choose(exclude)
+
+    def sample(self, k):
+        """Picks up to k distinct ids in a random order.
+
+        Args:
+            k: An int representing the number of ids to pick
+
+        Returns:
+            A list of ints representing the picked ids
+        """
+        return self.ids.sample(k)
+
+
+class QuestionPool:
+    """Question ids grouped by category for quiz selection.
+
+    Attributes:
+        ttl: An int representing how many seconds a category is considered
+            fresh before its ids are reloaded
+        loader: A function taking a category id and returning a list of
+            tuples of the id, difficulty and rating of each question in that
+            category
+        arrays: A dict mapping a category id to a QuestionBuckets object
+        lock: A threading.Lock object guarding arrays
+    """
+
+    def __init__(self, ttl=POOL_TTL, loader=load_questions):
+        """Set-up for QuestionPool object."""
+        self.ttl = ttl
+        self.loader = loader
+        self.arrays = {}
+        self.lock = threading.Lock()
+
+    def get(self, category_id):
+        """Retrieve the ids of a category, loading them if needed.
+
+        Args:
+            category_id: An int representing the category (0 represents all
+                categories)
+
+        Returns:
+            A QuestionBuckets object holding the question ids of the category
+        """
+        array = self.arrays.get(category_id)
+
+        if array is None or time.monotonic() - array.loaded_at > self.ttl:
+            array = QuestionBuckets(self.loader(category_id))
+            with self.lock:
+                self.arrays[category_id] = array
+
+        return array
+
+    def is_loaded(self, category_id):
+        """Checks whether the ids of a category have been loaded.
+
+        Args:
+            category_id: An int representing the category (0 represents all
+                categories)
+
+        Returns:
+            A bool that is True if the category's ids are held in memory
+        """
+        return category_id in self.arrays
+
+    def choose(self, category_id, exclude, difficulties=None, rating_bias=0):
+        """Picks a random question id from a category.
+
+        Args:
+            category_id: An int representing the category to pick from (0
+                represents all categories)
+            exclude: A set of ints representing question ids already asked
+            difficulties: A range of ints representing the difficulties that
+                may be picked, or None if any may be
+            rating_bias: A float representing the power that ratings are
+                raised to in order to weigh questions (0 weighs them the same)
+
+        Returns:
+            An int representing a question id, or None if there are no
+            questions left in the category
+        """
+        array = self.get(category_id)
+
+        with self.lock:
+            return array.choose(exclude, difficulties, rating_bias)
+
+    def sample(self, category_id, k):
+        """Deals a shuffled deck of question ids from a category.
+
+        Args:
+            category_id: An int representing the category to deal from (0
+                represents all categories)
+            k: An int representing the number of question ids to deal
+
+        Returns:
+            A list of ints representing question ids in a random order
+        """
+        array = self.get(category_id)
+
+        with self.lock:
+            return array.sample(k)
+
+    def add(self, question_id, category_id, difficulty, rating):
+        """Adds a newly created question to the loaded categories.
+
+        Args:
+            question_id: An int representing the id of the question
+            category_id: An int representing the category of the question
+            difficulty: An int representing the difficulty of the question
+            rating: An int representing the rating of the question
+        """
+        with self.lock:
+            for key in (0, category_id):
+                array = self.arrays.get(key)
+                if array is not None:
+                    array.add(question_id, difficulty, rating)
+
+    def remove(self, question_id, category_id):
+        """Removes a deleted question from the loaded categories.
+
+        Args:
+            question_id: An int representing the id of the question
+            category_id: An int representing the category of the question
+        """
+        with self.lock:
+            for key in (0, category_id):
+                array = self.arrays.get(key)
+                if array is not None:
+                    array.remove(question_id)
+
+    def update_rating(self, question_id, category_id, rating):
+        """Re-weighs a question whose rating changed in the loaded categories.
+
+        Args:
+            question_id: An int representing the id of the question
+            category_id: An int representing the category of the question
+            rating: An int representing the new rating of the question
+        """
+        with self.lock:
+            for key in (0, category_id):
+                array = self.arrays.get(key)
+                if array is not None:
+                    array.update_rating(question_id, rating)
+
+    def clear(self):
+        """Discards all loaded categories."""
+        with self.lock:
+            self.arrays.clear()
+
+
+def choose_question(category_id, exclude, difficulties=None, rating_bias=0):
+    """Retrieve a random question from a category.
+
+    Args:
+        category_id: An int representing the category to pick from (0
+            represents all categories)
+        exclude: A set of ints representing question ids already asked
+        difficulties: A range of ints representing the difficulties that may
+            be picked, or None if any may be
+        rating_bias: A float representing the power that ratings are raised
+            to in order to weigh questions (0 weighs them the same)
+
+    Returns:
+        A Question object, or None if there are no questions left
+    """
+    question_pool = current_app.config["QUESTION_POOL"]
+
+    if not question_pool.is_loaded(category_id):
+        if CategoryStats.total_questions(category_id or None) == 0:
+            return None
+
+    while True:
+        question_id = question_pool.choose(
+            category_id, exclude, difficulties, rating_bias
+        )
+
+        if question_id is None:
+            return None
+
+        question = Question.query.get(question_id)
+
+        if question is not None:
+            return question
+
+        question_pool.remove(question_id, category_id)
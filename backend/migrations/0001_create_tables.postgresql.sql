@@ -0,0 +1,27 @@
+-- Creates the tables of the trivia db if they do not already exist.
+
+CREATE TABLE IF NOT EXISTS categories (
+    id SERIAL PRIMARY KEY,
+    name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS questions (
+    id SERIAL PRIMARY KEY,
+    question TEXT,
+    answer TEXT,
+    difficulty INTEGER,
+    rating INTEGER,
+    category_id INTEGER REFERENCES categories (id)
+        ON UPDATE CASCADE ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username TEXT,
+    score INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS generations (
+    name TEXT PRIMARY KEY,
+    value INTEGER DEFAULT 0
+);
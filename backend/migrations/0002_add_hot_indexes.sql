@@ -0,0 +1,9 @@
+-- Indexes the columns that listings, quizzes and the leaderboard filter on.
+
+CREATE INDEX IF NOT EXISTS ix_questions_category_id
+    ON questions (category_id);
+
+CREATE INDEX IF NOT EXISTS ix_questions_category_id_id
+    ON questions (category_id, id);
+
+CREATE INDEX IF NOT EXISTS ix_users_score ON users (score);
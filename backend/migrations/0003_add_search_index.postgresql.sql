@@ -0,0 +1,6 @@
+-- Indexes question text with trigrams so substring searches avoid a scan.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_questions_question_trgm
+    ON questions USING GIN (question gin_trgm_ops);
@@ -0,0 +1,4 @@
+-- Records when each generation counter was last bumped, which is served as
+-- the Last-Modified time of the listings derived from its table.
+
+ALTER TABLE generations ADD COLUMN updated_at TIMESTAMP;
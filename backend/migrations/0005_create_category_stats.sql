@@ -0,0 +1,37 @@
+-- Creates the per-category question statistics and fills them from the
+-- existing questions. They are kept up to date by every question write.
+
+CREATE TABLE IF NOT EXISTS category_stats (
+    category_id INTEGER PRIMARY KEY REFERENCES categories (id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    question_count INTEGER NOT NULL DEFAULT 0,
+    rating_total INTEGER NOT NULL DEFAULT 0,
+    difficulty_1 INTEGER NOT NULL DEFAULT 0,
+    difficulty_2 INTEGER NOT NULL DEFAULT 0,
+    difficulty_3 INTEGER NOT NULL DEFAULT 0,
+    difficulty_4 INTEGER NOT NULL DEFAULT 0,
+    difficulty_5 INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO category_stats (
+    category_id,
+    question_count,
+    rating_total,
+    difficulty_1,
+    difficulty_2,
+    difficulty_3,
+    difficulty_4,
+    difficulty_5
+)
+SELECT
+    categories.id,
+    COUNT(questions.id),
+    COALESCE(SUM(questions.rating), 0),
+    SUM(CASE WHEN questions.difficulty = 1 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN questions.difficulty = 2 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN questions.difficulty = 3 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN questions.difficulty = 4 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN questions.difficulty = 5 THEN 1 ELSE 0 END)
+FROM categories
+LEFT JOIN questions ON questions.category_id = categories.id
+GROUP BY categories.id;
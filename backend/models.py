@@ -5,41 +5,374 @@ Attributes:
     DB_HOST: A str representing the host of the db
     DB_PORT: An int representing the port the db is running on
     DB_NAME: A str representing the db in which to connect to
-    DB_PATH: A str representing the location of the db
+    DIFFICULTIES: A range representing the difficulties that category
+        statistics count questions by
+    DB_PATH: A str representing the location of the db, which may be
+        overridden by the DATABASE_URL environment variable
+    REPLICA_PATHS: A list of strs representing the locations of read
+        replicas of the db, taken from the comma separated
+        DATABASE_REPLICA_URLS environment variable
+    ENGINE_SETTINGS: A dict mapping an environment variable to the engine
+        setting it configures and a function parsing its value
     db: A SQLAlchemy service
 
 Classes:
+    RoutingSession()
+    RoutingSQLAlchemy()
+    PoolStats()
+    InstrumentedQueuePool()
     Question()
     Category()
+    CategoryStats()
+    User()
+    Generation()
 """
 
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app, g, has_app_context, has_request_context
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    bindparam,
+    case,
+    event,
+    func,
+    inspect,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import Select, UpdateBase
 
 DB_DIALECT = "postgresql"
 DB_HOST = "localhost"
 DB_PORT = 5432
 DB_NAME = "trivia"
+DIFFICULTIES = range(1, 6)
 
-DB_PATH = f"{DB_DIALECT}://{DB_HOST}:{DB_PORT}/{DB_NAME}"
+DB_PATH = os.environ.get(
+    "DATABASE_URL", f"{DB_DIALECT}://{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+REPLICA_PATHS = [
+    path.strip()
+    for path in os.environ.get("DATABASE_REPLICA_URLS", "").split(",")
+    if path.strip()
+]
 
-db = SQLAlchemy()
 
+def parse_bool(value):
+    """Parses a bool from an environment variable.
 
-def setup_db(app, database_path=DB_PATH):
+    Args:
+        value: A str representing the value of the variable
+
+    Returns:
+        A bool that is True for values such as "1", "true" or "yes"
+    """
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+ENGINE_SETTINGS = {
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+    "DB_POOL_PRE_PING": ("pool_pre_ping", parse_bool),
+    "DB_CONNECT_TIMEOUT": ("connect_timeout", int),
+    "DB_STATEMENT_TIMEOUT": ("statement_timeout", int),
+    "DB_PGBOUNCER": ("pgbouncer", parse_bool),
+}
+
+
+class RoutingSession(SignallingSession):
+    """A session sending the reads of read-only requests to a replica.
+
+    A read-only request picks a replica and stores its bind key in
+    g.db_replica. Its plain SELECTs then go to that replica, while anything
+    else, such as flushes, INSERTs, UPDATEs, DELETEs, locking SELECTs and
+    textual statements, goes to the primary db. Requests that write set
+    g.db_wrote so that their client can be kept on the primary for a while.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        """Returns the engine that a statement should be executed on.
+
+        Args:
+            mapper: A Mapper object of the model being queried, if any
+            clause: A sqlalchemy ClauseElement representing the statement, if
+                any
+
+        Returns:
+            A sqlalchemy Engine object representing the db to execute on
+        """
+        if has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_wrote = True
+            elif (
+                g.get("db_replica") is not None
+                and isinstance(clause, Select)
+                and getattr(clause, "_for_update_arg", None) is None
+            ):
+                return db.get_engine(self.app, bind=g.db_replica)
+
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """A SQLAlchemy service whose sessions route reads to replicas."""
+
+    def create_session(self, options):
+        """Creates the factory of the service's sessions.
+
+        Args:
+            options: A dict of keyword arguments for the sessions
+
+        Returns:
+            A sqlalchemy sessionmaker making RoutingSession objects
+        """
+        return sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+db = RoutingSQLAlchemy()
+
+
+class PoolStats:
+    """Counters describing how long requests wait for a db connection.
+
+    Each app keeps its own in its POOL_STATS app config value.
+
+    Attributes:
+        checkouts: An int representing how many connections were checked out
+        wait_total: A float representing the total seconds spent waiting
+        wait_max: A float representing the longest wait in seconds
+        timeouts: An int representing how many checkouts timed out
+        lock: A threading.Lock object guarding the counters
+    """
+
+    def __init__(self):
+        """Set-up for PoolStats object."""
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.lock = threading.Lock()
+
+    def record(self, wait, timed_out=False):
+        """Records a single checkout.
+
+        Args:
+            wait: A float representing the seconds spent waiting
+            timed_out: A bool representing whether the checkout timed out
+        """
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+    def format(self, pool=None):
+        """Formats the counters and the pool's current usage as a dict.
+
+        Args:
+            pool: A sqlalchemy Pool object to report the usage of
+
+        Returns:
+            stats: A dict representing the state of the pool
+        """
+        with self.lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_avg_ms": (
+                    self.wait_total / self.checkouts * 1000
+                    if self.checkouts
+                    else 0
+                ),
+                "checkout_wait_max_ms": self.wait_max * 1000,
+            }
+
+        if isinstance(pool, QueuePool):
+            stats.update(
+                {
+                    "size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": pool.overflow(),
+                }
+            )
+
+        return stats
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that records how long each checkout waits.
+
+    Waits are recorded in the PoolStats of the current app, and checkouts
+    made outside an app context are not recorded.
+    """
+
+    def _do_get(self):
+        """Checks a connection out of the pool, timing the wait."""
+        start = time.perf_counter()
+        pool_stats = None
+
+        if has_app_context():
+            pool_stats = current_app.config.get("POOL_STATS")
+
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if pool_stats is not None:
+                pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+
+        if pool_stats is not None:
+            pool_stats.record(time.perf_counter() - start)
+
+        return connection
+
+
+def load_engine_settings(environ=None):
+    """Loads engine settings from a json file and environment variables.
+
+    The file is read from the path in DB_CONFIG_FILE, if set, and uses the
+    setting names in ENGINE_SETTINGS as keys. Environment variables take
+    precedence over the file.
+
+    Args:
+        environ: A dict representing the environment, defaults to os.environ
+
+    Returns:
+        settings: A dict mapping a setting name to its value
+    """
+    environ = os.environ if environ is None else environ
+    settings = {}
+
+    if environ.get("DB_CONFIG_FILE"):
+        with open(environ["DB_CONFIG_FILE"]) as config_file:
+            settings.update(json.load(config_file))
+
+    for variable, (name, parse) in ENGINE_SETTINGS.items():
+        if variable in environ:
+            settings[name] = parse(environ[variable])
+
+    return settings
+
+
+def build_engine_options(database_path, settings):
+    """Translates engine settings into SQLAlchemy engine options.
+
+    Args:
+        database_path: A str representing the location of the db
+        settings: A dict of engine settings from load_engine_settings
+
+    Returns:
+        options: A dict of keyword arguments for create_engine
+    """
+    options = {}
+    connect_args = {}
+    postgresql = database_path.startswith("postgres")
+
+    if not database_path.startswith("sqlite"):
+        options["poolclass"] = InstrumentedQueuePool
+
+        for name in (
+            "pool_size",
+            "max_overflow",
+            "pool_timeout",
+            "pool_recycle",
+            "pool_pre_ping",
+        ):
+            if name in settings:
+                options[name] = settings[name]
+
+    if postgresql and settings.get("pgbouncer"):
+        # PgBouncer hands out a different server connection per transaction,
+        # so stale connections are pinged and the statement timeout is set
+        # per transaction instead of as an unsupported startup parameter.
+        options.setdefault("pool_pre_ping", True)
+    elif postgresql and settings.get("statement_timeout"):
+        connect_args["options"] = (
+            f"-c statement_timeout={settings['statement_timeout']}"
+        )
+
+    if postgresql and settings.get("connect_timeout"):
+        connect_args["connect_timeout"] = settings["connect_timeout"]
+
+    if connect_args:
+        options["connect_args"] = connect_args
+
+    return options
+
+
+def replica_bind_key(index):
+    """Names the bind of a read replica.
+
+    Args:
+        index: An int representing the position of the replica
+
+    Returns:
+        A str representing the bind key of the replica
+    """
+    return f"replica_{index}"
+
+
+def setup_db(
+    app, database_path=DB_PATH, engine_settings=None, replica_paths=()
+):
     """Binds a flask application and a SQLAlchemy service.
 
+    The schema is not created here, it is managed by the versioned migrations
+    applied with `flask migrate`. Read replicas are registered as binds, named
+    by replica_bind_key, which share the engine settings of the primary db.
+
     Args:
         app: A flask app
         database_path: A str representing the location of the db
+        engine_settings: A dict of engine settings such as pool_size,
+            defaults to the settings from load_engine_settings
+        replica_paths: A list of strs representing the locations of read
+            replicas of the db
     """
+    if engine_settings is None:
+        engine_settings = load_engine_settings()
+
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
+    app.config["SQLALCHEMY_BINDS"] = {
+        replica_bind_key(index): path
+        for index, path in enumerate(replica_paths)
+    }
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = build_engine_options(
+        database_path, engine_settings
+    )
     app.config["UPLOAD_FOLDER"] = "../frontend/public"
-    db.app = app
+    app.config["POOL_STATS"] = PoolStats()
     db.init_app(app)
-    db.create_all()
+
+    statement_timeout = engine_settings.get("statement_timeout")
+
+    if engine_settings.get("pgbouncer") and statement_timeout:
+        with app.app_context():
+
+            @event.listens_for(db.get_engine(app), "begin")
+            def set_statement_timeout(connection):
+                connection.execute(
+                    f"SET LOCAL statement_timeout = {int(statement_timeout)}"
+                )
 
 
 class Question(db.Model):
@@ -55,11 +388,14 @@ class Question(db.Model):
     """
 
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_category_id_id", "category_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     question = Column(String)
     answer = Column(String)
-    category_id = Column(Integer, ForeignKey("categories.id"))
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
     rating = Column(Integer)
     difficulty = Column(Integer)
 
@@ -74,17 +410,153 @@ class Question(db.Model):
     def insert(self):
         """Inserts a new question object into the db."""
         db.session.add(self)
+        CategoryStats.apply(
+            CategoryStats.tally(
+                added=[(self.category_id, self.rating, self.difficulty)]
+            )
+        )
         db.session.commit()
+        Generation.bump("questions")
 
     @staticmethod
     def update():
-        """Updates an existing question object in the db."""
+        """Updates existing question objects in the db.
+
+        The statistics of the categories of every changed question are
+        updated in the same transaction.
+        """
+        added = []
+        removed = []
+
+        for question in db.session.dirty:
+            if not isinstance(question, Question):
+                continue
+
+            attrs = inspect(question).attrs
+            new = []
+            old = []
+
+            for name in ("category_id", "rating", "difficulty"):
+                history = attrs[name].history
+                value = getattr(question, name)
+                new.append(value)
+                old.append(history.deleted[0] if history.deleted else value)
+
+            added.append(tuple(new))
+            removed.append(tuple(old))
+
+        CategoryStats.apply(CategoryStats.tally(added, removed))
         db.session.commit()
+        Generation.bump("questions")
 
     def delete(self):
         """Deletes an existing question object from the db."""
         db.session.delete(self)
+        CategoryStats.apply(
+            CategoryStats.tally(
+                removed=[(self.category_id, self.rating, self.difficulty)]
+            )
+        )
         db.session.commit()
+        Generation.bump("questions")
+
+    @staticmethod
+    def update_ratings(ratings):
+        """Updates the ratings of several questions in one transaction.
+
+        The rows are locked while their old ratings are read, and every
+        rating is then set by a single UPDATE statement.
+
+        Args:
+            ratings: A dict mapping a question id to its new rating
+
+        Returns:
+            updated: A dict mapping the id of each question that exists to a
+                tuple of its category id and its old rating
+        """
+        rows = (
+            db.session.query(
+                Question.id, Question.category_id, Question.rating
+            )
+            .filter(Question.id.in_(list(ratings)))
+            .with_for_update()
+        )
+        updated = {
+            question_id: (category_id, rating)
+            for question_id, category_id, rating in rows
+        }
+
+        if updated:
+            deltas = {}
+
+            for question_id, (category_id, rating) in updated.items():
+                changes = deltas.setdefault(category_id, {"rating_total": 0})
+                changes["rating_total"] += ratings[question_id] - (rating or 0)
+
+            CategoryStats.apply(deltas)
+            db.session.execute(
+                Question.__table__.update()
+                .where(Question.id.in_(list(updated)))
+                .values(
+                    rating=case(
+                        {
+                            question_id: ratings[question_id]
+                            for question_id in updated
+                        },
+                        value=Question.id,
+                    )
+                )
+            )
+
+        db.session.commit()
+
+        if updated:
+            Generation.bump("questions")
+
+        return updated
+
+    @staticmethod
+    def delete_many(question_ids):
+        """Deletes several questions with a single statement.
+
+        Args:
+            question_ids: A list of ints representing the questions to delete
+
+        Returns:
+            deleted: A dict mapping the id of each question that existed to
+                its category id
+        """
+        rows = (
+            db.session.query(
+                Question.id,
+                Question.category_id,
+                Question.rating,
+                Question.difficulty,
+            )
+            .filter(Question.id.in_(question_ids))
+            .with_for_update()
+            .all()
+        )
+        deleted = {
+            question_id: category_id for question_id, category_id, *_ in rows
+        }
+
+        if deleted:
+            CategoryStats.apply(
+                CategoryStats.tally(removed=[row[1:] for row in rows])
+            )
+            db.session.execute(
+                Question.__table__.delete().where(
+                    Question.id.in_(list(deleted))
+                )
+            )
+
+        db.session.commit()
+
+        if deleted:
+            Generation.bump("questions")
+
+        return deleted
 
     def format(self):
         """Formats the question object as a dict.
@@ -122,9 +594,12 @@ class Category(db.Model):
         self.name = name
 
     def insert(self):
-        """Inserts a new category object into the db."""
+        """Inserts a new category object into the db, with empty statistics."""
         db.session.add(self)
+        db.session.flush()
+        db.session.add(CategoryStats(category_id=self.id))
         db.session.commit()
+        Generation.bump("categories")
 
     def format(self):
         """Formats the category object as a dict.
@@ -139,6 +614,182 @@ class Category(db.Model):
         return category
 
 
+class CategoryStats(db.Model):
+    """A model representing the statistics of the questions in a category.
+
+    The statistics are changed in the same transaction as every write to the
+    questions of the category, so totals are read with a single lookup rather
+    than by counting questions.
+
+    Attributes:
+        category_id: The id of the category that the statistics describe
+        question_count: An int representing how many questions it holds
+        rating_total: An int representing the sum of their ratings
+        difficulty_1: An int representing how many questions have a
+            difficulty of 1, and likewise up to difficulty_5
+    """
+
+    __tablename__ = "category_stats"
+
+    category_id = Column(
+        Integer, ForeignKey("categories.id"), primary_key=True
+    )
+    question_count = Column(Integer, nullable=False, default=0)
+    rating_total = Column(Integer, nullable=False, default=0)
+    difficulty_1 = Column(Integer, nullable=False, default=0)
+    difficulty_2 = Column(Integer, nullable=False, default=0)
+    difficulty_3 = Column(Integer, nullable=False, default=0)
+    difficulty_4 = Column(Integer, nullable=False, default=0)
+    difficulty_5 = Column(Integer, nullable=False, default=0)
+
+    def __init__(self, category_id):
+        """Set-up for CategoryStats object."""
+        self.category_id = category_id
+        self.question_count = 0
+        self.rating_total = 0
+
+        for difficulty in DIFFICULTIES:
+            setattr(self, f"difficulty_{difficulty}", 0)
+
+    @staticmethod
+    def tally(added=(), removed=()):
+        """Sums how adding and removing questions changes the statistics.
+
+        Args:
+            added: An iterable of tuples of the category id, rating and
+                difficulty of each question added
+            removed: An iterable of tuples of the category id, rating and
+                difficulty of each question removed
+
+        Returns:
+            deltas: A dict mapping a category id to a dict mapping a column
+                to the amount it changes by
+        """
+        deltas = {}
+
+        for questions, sign in ((added, 1), (removed, -1)):
+            for category_id, rating, difficulty in questions:
+                changes = deltas.setdefault(category_id, {})
+                columns = {
+                    "question_count": 1,
+                    "rating_total": int(rating or 0),
+                }
+
+                if difficulty is not None and int(difficulty) in DIFFICULTIES:
+                    columns[f"difficulty_{int(difficulty)}"] = 1
+
+                for column, amount in columns.items():
+                    changes[column] = changes.get(column, 0) + sign * amount
+
+        return deltas
+
+    @staticmethod
+    def apply(deltas):
+        """Changes the statistics in the current transaction.
+
+        A category without statistics yet, such as one inserted directly
+        into the db, has them created.
+
+        Args:
+            deltas: A dict mapping a category id to a dict mapping a column
+                to the amount it changes by
+        """
+        table = CategoryStats.__table__
+
+        for category_id, changes in deltas.items():
+            changes = {
+                column: amount for column, amount in changes.items() if amount
+            }
+
+            if category_id is None or not changes:
+                continue
+
+            updated = db.session.execute(
+                table.update()
+                .where(table.c.category_id == category_id)
+                .values(
+                    {
+                        table.c[column]: table.c[column] + amount
+                        for column, amount in changes.items()
+                    }
+                )
+            ).rowcount
+
+            if updated == 0:
+                db.session.execute(
+                    table.insert().values(category_id=category_id, **changes)
+                )
+
+    @staticmethod
+    def total_questions(category_id=None):
+        """Retrieves how many questions a category holds.
+
+        Args:
+            category_id: An int representing the category, or None for every
+                category
+
+        Returns:
+            An int representing the number of questions
+        """
+        if category_id is None:
+            query = db.session.query(
+                func.coalesce(func.sum(CategoryStats.question_count), 0)
+            )
+        else:
+            query = db.session.query(CategoryStats.question_count).filter(
+                CategoryStats.category_id == category_id
+            )
+
+        return query.scalar() or 0
+
+    @staticmethod
+    def combine(all_stats):
+        """Adds up the statistics of several categories.
+
+        Args:
+            all_stats: An iterable of CategoryStats objects
+
+        Returns:
+            combined: A CategoryStats object without a category holding the
+                sum of the statistics
+        """
+        combined = CategoryStats(category_id=None)
+        columns = ["question_count", "rating_total"] + [
+            f"difficulty_{difficulty}" for difficulty in DIFFICULTIES
+        ]
+
+        for stats in all_stats:
+            for column in columns:
+                setattr(
+                    combined,
+                    column,
+                    getattr(combined, column) + getattr(stats, column),
+                )
+
+        return combined
+
+    def format(self):
+        """Formats the statistics object as a dict.
+
+        Returns:
+            stats: A dict representing the statistics object
+        """
+        stats = {
+            "category_id": self.category_id,
+            "total_questions": self.question_count,
+            "average_rating": (
+                round(self.rating_total / self.question_count, 2)
+                if self.question_count
+                else None
+            ),
+            "difficulties": {
+                str(difficulty): getattr(self, f"difficulty_{difficulty}")
+                for difficulty in DIFFICULTIES
+            },
+        }
+        return stats
+
+
 class User(db.Model):
     """A model representing a user.
 
@@ -152,7 +803,7 @@ class User(db.Model):
 
     id = Column(Integer, primary_key=True)
     username = Column(String)
-    score = Column(Integer, default=0)
+    score = Column(Integer, default=0, index=True)
 
     def __init__(self, username, score):
         """Set-up for User object."""
@@ -169,6 +820,63 @@ class User(db.Model):
         """Updates an existing user object in the db."""
         db.session.commit()
 
+    @staticmethod
+    def add_score(user_id, delta):
+        """Atomically adds to the score of a user in a single statement.
+
+        Args:
+            user_id: An int representing the id of the user
+            delta: An int representing the amount to add to the score
+
+        Returns:
+            new_score: An int representing the updated score, or None if the
+                user does not exist
+        """
+        statement = (
+            User.__table__.update()
+            .where(User.id == user_id)
+            .values(score=func.coalesce(User.score, 0) + delta)
+        )
+
+        if db.engine.dialect.name == "postgresql":
+            new_score = db.session.execute(
+                statement.returning(User.score)
+            ).scalar()
+        else:
+            new_score = None
+            if db.session.execute(statement).rowcount > 0:
+                new_score = (
+                    db.session.query(User.score)
+                    .filter(User.id == user_id)
+                    .scalar()
+                )
+
+        db.session.commit()
+
+        return new_score
+
+    @staticmethod
+    def add_scores(deltas):
+        """Atomically adds to the scores of several users in one transaction.
+
+        Args:
+            deltas: A dict mapping a user id to the amount to add to the
+                user's score
+        """
+        statement = (
+            User.__table__.update()
+            .where(User.id == bindparam("user_id"))
+            .values(score=func.coalesce(User.score, 0) + bindparam("delta"))
+        )
+        db.session.execute(
+            statement,
+            [
+                {"user_id": user_id, "delta": delta}
+                for user_id, delta in deltas.items()
+            ],
+        )
+        db.session.commit()
+
     def format(self):
         """Formats the user object as a dict.
 
@@ -181,3 +889,94 @@ class User(db.Model):
             "score": self.score,
         }
         return user
+
+
+class Generation(db.Model):
+    """A model representing a counter that is bumped whenever data changes.
+
+    Caches compare the counter against the value they were filled at to
+    notice writes made by other workers. The questions and categories
+    counters are bumped by every write to their table.
+
+    Attributes:
+        name: A str that serves as the unique identifier for a counter
+        value: An int representing the current generation of the data
+        updated_at: A naive datetime in utc representing when the counter was
+            last bumped
+    """
+
+    __tablename__ = "generations"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, default=0)
+    updated_at = Column(DateTime)
+
+    def __init__(self, name, value, updated_at=None):
+        """Set-up for Generation object."""
+        self.name = name
+        self.value = value
+        self.updated_at = updated_at
+
+    @staticmethod
+    def current(name):
+        """Retrieves the current value of a counter.
+
+        Args:
+            name: A str representing the name of the counter
+
+        Returns:
+            An int representing the current generation
+        """
+        value = (
+            db.session.query(Generation.value)
+            .filter(Generation.name == name)
+            .scalar()
+        )
+        return value or 0
+
+    @staticmethod
+    def versions(names):
+        """Retrieves the value and bump time of several counters at once.
+
+        Args:
+            names: A list of strs representing the names of the counters
+
+        Returns:
+            versions: A dict mapping each name to a tuple of its value and
+                when it was last bumped, which is None if it never was
+        """
+        versions = {name: (0, None) for name in names}
+        rows = db.session.query(
+            Generation.name, Generation.value, Generation.updated_at
+        ).filter(Generation.name.in_(names))
+
+        for name, value, updated_at in rows:
+            versions[name] = (value or 0, updated_at)
+
+        return versions
+
+    @staticmethod
+    def bump(name):
+        """Atomically increments a counter, creating it if needed.
+
+        Args:
+            name: A str representing the name of the counter
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        updated = Generation.query.filter(Generation.name == name).update(
+            {
+                Generation.value: Generation.value + 1,
+                Generation.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+
+        if updated == 0:
+            try:
+                db.session.add(Generation(name=name, value=1, updated_at=now))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                Generation.bump(name)
+        else:
+            db.session.commit()
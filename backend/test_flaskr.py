@@ -7,19 +7,45 @@ Classes:
     CategoryTestCase()
     QuizTestCase()
     UserTestCase()
+    DbTestCase()
 """
 
+import csv
+import gzip
+import json
+import os
+import tempfile
 import unittest
-
-from flaskr import QUESTIONS_PER_PAGE, app
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2 import extensions, extras
+
+from flaskr import MAX_BATCH_SIZE, create_app
+from flaskr.compression import brotli
+from flaskr.migrations import check_indexes, upgrade_db
+from flaskr.pagination import QUESTIONS_PER_PAGE
+from flaskr.quiz_sessions import SessionStore
+from flaskr.replicas import STICKY_COOKIE
+from flaskr.response_cache import (
+    LocalStore,
+    LruResponseCache,
+    ResponseCache,
+    SharedResponseCache,
+)
+from flaskr.scores import ScoreAggregator
+from flaskr.selection import QuestionPool
 from models import (
     DB_DIALECT,
     DB_HOST,
     DB_PORT,
     Category,
+    CategoryStats,
     Question,
     User,
-    setup_db,
+    build_engine_options,
+    db,
+    load_engine_settings,
+    replica_bind_key,
 )
 
 
@@ -27,7 +53,7 @@ class QuestionTestCase(unittest.TestCase):
     """This class represents the test cases for the question endpoints.
 
     Attributes:
-        app: A flask app from the flaskr app
+        app: A flask app created by the flaskr app factory
         client: A test client for the flask app to while testing
         db_name: A str representing the name of the test database
         db_path: A str representing the location of the test database
@@ -35,11 +61,12 @@ class QuestionTestCase(unittest.TestCase):
 
     def setUp(self):
         """Set-up for the QuestionTestCase."""
-        self.app = app
-        self.client = self.app.test_client
         self.db_name = "trivia_test"
         self.db_path = f"{DB_DIALECT}://{DB_HOST}:{DB_PORT}/{self.db_name}"
-        setup_db(self.app, self.db_path)
+        self.app = create_app({"DATABASE_PATH": self.db_path})
+        self.client = self.app.test_client
+        db.app = self.app
+        upgrade_db()
 
     def tearDown(self):
         """Executed after each test."""
@@ -55,6 +82,71 @@ class QuestionTestCase(unittest.TestCase):
         self.assertIsNone(response.json.get("current_category_id"))
         self.assertTrue(response.json.get("categories"))
 
+    def test_get_questions_page_success(self):
+        """Test that a page of questions is limited to a single page."""
+        total_questions = Question.query.count()
+
+        response = self.client().get("/questions?page=1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertLessEqual(
+            len(response.json.get("questions")), QUESTIONS_PER_PAGE
+        )
+        self.assertEqual(response.json.get("total_questions"), total_questions)
+
+    def test_get_questions_format_success(self):
+        """Test that listed questions match their formatted models."""
+        questions = Question.query.order_by(Question.id)
+        formatted = [
+            question.format()
+            for question in questions.limit(QUESTIONS_PER_PAGE)
+        ]
+
+        response = self.client().get("/questions")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("questions"), formatted)
+
+    def test_get_questions_compact_json_success(self):
+        """Test that compact json responses are neither indented nor sorted."""
+        app = create_app({"DATABASE_PATH": self.db_path, "JSON_COMPACT": True})
+        app.debug = True
+
+        response = app.test_client().get("/questions")
+        error_response = app.test_client().get("/questions?page=0")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.startswith(b'{"success":true,'))
+        self.assertEqual(error_response.status_code, 404)
+        self.assertEqual(
+            error_response.data,
+            b'{"success":false,"error_code":404,"message":"Not Found"}\n',
+        )
+
+    def test_get_questions_cursor_success(self):
+        """Test successful retrieval of the page following a cursor."""
+        response = self.client().get("/questions")
+        next_cursor = response.json.get("next_cursor")
+        last_question_id = response.json.get("questions")[-1]["id"]
+
+        response = self.client().get(f"/questions?cursor={next_cursor}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertTrue(response.json.get("questions"))
+        self.assertGreater(
+            response.json.get("questions")[0]["id"], last_question_id
+        )
+
+    def test_get_questions_invalid_cursor_fail(self):
+        """Test failed question retrieval when the cursor is malformed."""
+        response = self.client().get("/questions?cursor=M155P311ED")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
     def test_get_questions_out_of_range_fail(self):
         """Test failed question retrieval when page number is out of range."""
         total_pages = -(-Question.query.count() // QUESTIONS_PER_PAGE)
@@ -95,6 +187,124 @@ class QuestionTestCase(unittest.TestCase):
         self.assertIsNone(response.json.get("current_category_id"))
         self.assertTrue(response.json.get("categories"))
 
+    def test_search_questions_case_insensitive_success(self):
+        """Test that a search ignores the case of the search term."""
+        search = {"search_term": "WHAT"}
+
+        response = self.client().post("/questions", json=search)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertTrue(response.json.get("questions"))
+        for question in response.json.get("questions"):
+            self.assertIn("what", question["question"].lower())
+
+    def test_search_created_question_success(self):
+        """Test that a created question can be searched for straight away."""
+        new_question = {
+            "question": "What is the airspeed of an unladen swallow?",
+            "answer": "African or European?",
+            "category_id": 1,
+            "rating": 1,
+            "difficulty": 1,
+        }
+        self.client().post("/questions", json=new_question)
+
+        search = {"search_term": "unladen swallow"}
+
+        response = self.client().post("/questions", json=search)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertGreaterEqual(response.json.get("total_questions"), 1)
+        self.assertEqual(
+            response.json.get("questions")[0]["question"],
+            new_question["question"],
+        )
+
+    def test_get_questions_not_modified_success(self):
+        """Test that an unchanged page of questions is answered with a 304."""
+        response = self.client().get("/questions")
+        etag = response.headers.get("ETag")
+
+        response = self.client().get(
+            "/questions", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers.get("ETag"), etag)
+        self.assertIn("s-maxage", response.headers.get("Cache-Control"))
+
+    def test_get_questions_modified_after_create_success(self):
+        """Test that creating a question changes the etag of listings."""
+        new_question = {
+            "question": "What is the airspeed velocity of a swallow?",
+            "answer": "African or European?",
+            "category_id": 1,
+            "rating": 1,
+            "difficulty": 1,
+        }
+        response = self.client().get("/categories/1/questions")
+        etag = response.headers.get("ETag")
+
+        self.client().post("/questions", json=new_question)
+        response = self.client().get(
+            "/categories/1/questions", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get("ETag"), etag)
+
+    def test_get_questions_cached_success(self):
+        """Test that a repeated page of questions is served from the cache."""
+        cache = self.app.config["RESPONSE_CACHE"]
+
+        first_response = self.client().get("/questions?page=1")
+        response = self.client().get("/questions?page=1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, first_response.json)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_get_category_questions_evicted_after_create_success(self):
+        """Test that creating a question evicts the pages of its category."""
+        new_question = {
+            "question": "Who painted the Mona Lisa?",
+            "answer": "Leonardo da Vinci",
+            "category_id": 2,
+            "rating": 1,
+            "difficulty": 1,
+        }
+        response = self.client().get("/categories/2/questions")
+        total_questions = response.json.get("total_questions")
+        self.client().get("/categories/1/questions")
+
+        self.client().post("/questions", json=new_question)
+        response = self.client().get("/categories/2/questions")
+        self.client().get("/categories/1/questions")
+
+        self.assertEqual(
+            response.json.get("total_questions"), total_questions + 1
+        )
+        self.assertEqual(self.app.config["RESPONSE_CACHE"].hits, 1)
+
+    def test_get_questions_shared_cache_success(self):
+        """Test that pages are cached and evicted in a shared store."""
+        cache = SharedResponseCache(LocalStore())
+        self.app.config["RESPONSE_CACHE"] = cache
+        question = Question.query.filter(Question.category_id == 3).first()
+
+        self.client().get("/questions")
+        self.client().get("/questions")
+        self.client().patch(f"/questions/{question.id}", json={"rating": 2})
+        response = self.client().get("/questions")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 2)
+
     def test_create_question_success(self):
         """Test successful creation of question."""
         new_question = {
@@ -123,6 +333,342 @@ class QuestionTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("success"), False)
         self.assertEqual(response.json.get("message"), "Bad Request")
 
+    def test_import_questions_ndjson_success(self):
+        """Test bulk import of questions from NDJSON."""
+        rows = [
+            {
+                "question": "Which planet is known as the red planet?",
+                "answer": "Mars",
+                "category_id": 1,
+                "rating": 4,
+                "difficulty": 1,
+            },
+            {
+                "question": "What is the chemical symbol for gold?",
+                "answer": "Au",
+                "category_id": 1,
+                "rating": 9,
+                "difficulty": 2,
+            },
+        ]
+        data = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+
+        response = self.client().post(
+            "/questions/import?batch_size=1",
+            data=data,
+            content_type="application/x-ndjson",
+        )
+        imported = Question.query.filter(
+            Question.question == rows[0]["question"]
+        ).count()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("imported"), 1)
+        self.assertEqual(response.json.get("rejected"), 2)
+        self.assertEqual(
+            [rejection["line"] for rejection in response.json["rejections"]],
+            [2, 3],
+        )
+        self.assertEqual(len(response.json.get("batches")), 1)
+        self.assertGreaterEqual(imported, 1)
+
+    def test_import_questions_csv_success(self):
+        """Test bulk import of questions from CSV."""
+        data = (
+            "question,answer,category_id,rating,difficulty\n"
+            "How many legs does a spider have?,8,1,3,1\n"
+            "How many legs does an ant have?,6,999,3,1\n"
+        )
+
+        response = self.client().post(
+            "/questions/import", data=data, content_type="text/csv"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("imported"), 1)
+        self.assertEqual(response.json.get("rejected"), 1)
+        self.assertEqual(
+            response.json.get("rejections")[0].get("error"),
+            "category 999 does not exist",
+        )
+
+    def test_import_questions_wait_callback_success(self):
+        """Test bulk import while psycopg2 waits through a callback."""
+        data = (
+            "question,answer,category_id,rating,difficulty\n"
+            "How many legs does a beetle have?,6,1,3,1\n"
+        )
+        extensions.set_wait_callback(extras.wait_select)
+
+        try:
+            response = self.client().post(
+                "/questions/import", data=data, content_type="text/csv"
+            )
+        finally:
+            extensions.set_wait_callback(None)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("imported"), 1)
+
+    def test_import_questions_invalid_utf8_success(self):
+        """Test that rows of invalid UTF-8 are rejected from an import."""
+        data = (
+            b'{"question": "\xff", "answer": "?", "category_id": 1, '
+            b'"rating": 3, "difficulty": 1}\n'
+            b'{"question": "What is 2 + 2?", "answer": "4", "category_id": 1, '
+            b'"rating": 3, "difficulty": 1}\n'
+        )
+
+        response = self.client().post(
+            "/questions/import",
+            data=data,
+            content_type="application/x-ndjson",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("imported"), 1)
+        self.assertEqual(
+            response.json.get("rejections"),
+            [{"line": 1, "error": "invalid utf-8"}],
+        )
+
+    def test_import_questions_invalid_csv_success(self):
+        """Test that malformed CSV rows are rejected from an import."""
+        data = (
+            b"question,answer,category_id,rating,difficulty\n"
+            b"Caf\xe9?,Coffee,1,3,1\n"
+            + b'"'
+            + b"x" * (csv.field_size_limit() + 1)
+            + b'",?,1,3,1\n'
+            + b"What is 3 + 3?,6,1,3,1\n"
+        )
+
+        response = self.client().post(
+            "/questions/import", data=data, content_type="text/csv"
+        )
+        errors = [
+            rejection["error"] for rejection in response.json["rejections"]
+        ]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("imported"), 1)
+        self.assertEqual(errors[0], "invalid utf-8")
+        self.assertTrue(errors[1].startswith("invalid csv"))
+
+    def test_import_questions_unknown_format_fail(self):
+        """Test failed bulk import when the format is not supported."""
+        response = self.client().post("/questions/import", json=[])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_export_questions_ndjson_success(self):
+        """Test streaming export of a category's questions as NDJSON."""
+        total_questions = Question.query.filter(
+            Question.category_id == 1
+        ).count()
+
+        response = self.client().get("/questions/export?category_id=1")
+        rows = [json.loads(line) for line in response.data.splitlines()]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(len(rows), total_questions)
+        self.assertTrue(all(row["category_id"] == 1 for row in rows))
+
+    def test_export_questions_csv_success(self):
+        """Test streaming export of questions of a difficulty as CSV."""
+        total_questions = Question.query.filter(
+            Question.difficulty == 2
+        ).count()
+
+        response = self.client().get(
+            "/questions/export?format=csv&difficulty=2"
+        )
+        lines = response.get_data(as_text=True).splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertEqual(
+            lines[0], "id,question,answer,category_id,rating,difficulty"
+        )
+        self.assertEqual(len(lines) - 1, total_questions)
+
+    def test_get_questions_gzip_success(self):
+        """Test that a large listing is gzipped when the client accepts it."""
+        app = create_app(
+            {"DATABASE_PATH": self.db_path, "COMPRESSION_MIN_SIZE": 1}
+        )
+
+        response = app.test_client().get(
+            "/questions", headers={"Accept-Encoding": "gzip"}
+        )
+        body = json.loads(gzip.decompress(response.data))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+        self.assertIn("Accept-Encoding", response.vary)
+        self.assertEqual(body.get("success"), True)
+        self.assertTrue(body.get("questions"))
+
+    def test_get_questions_small_not_compressed_success(self):
+        """Test that a response below the minimum size is not compressed."""
+        response = self.client().get(
+            "/questions?page=0", headers={"Accept-Encoding": "gzip"}
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(response.headers.get("Content-Encoding"))
+        self.assertEqual(response.json.get("success"), False)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_export_questions_brotli_success(self):
+        """Test that a streamed export is compressed as it is streamed."""
+        total_questions = Question.query.count()
+
+        response = self.client().get(
+            "/questions/export", headers={"Accept-Encoding": "gzip, br"}
+        )
+        lines = brotli.decompress(response.data).splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get("Content-Encoding"), "br")
+        self.assertEqual(len(lines), total_questions)
+
+    def test_export_questions_unknown_format_fail(self):
+        """Test failed export when the format is not supported."""
+        response = self.client().get("/questions/export?format=xml")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_patch_question_ratings_success(self):
+        """Test successful change of the ratings of many questions."""
+        question_ids = [
+            question.id
+            for question in Question.query.order_by(Question.id).limit(2)
+        ]
+        ratings = [
+            {"id": question_ids[0], "rating": 1},
+            {"id": question_ids[1], "rating": 5},
+            {"id": 99999, "rating": 2},
+        ]
+
+        response = self.client().patch(
+            "/questions/batch", json={"ratings": ratings}
+        )
+        results = response.json.get("results")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("updated"), 2)
+        self.assertEqual(
+            [result["success"] for result in results], [True, True, False]
+        )
+        self.assertEqual(results[1].get("new_rating"), 5)
+        self.assertEqual(Question.query.get(question_ids[0]).rating, 1)
+
+    def test_patch_question_ratings_no_ratings_fail(self):
+        """Test failed batch rating change when no ratings are given."""
+        response = self.client().patch(
+            "/questions/batch", json={"ratings": [{"id": 1}]}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_patch_question_ratings_out_of_range_fail(self):
+        """Test failed batch rating change when a rating is not 1 to 5."""
+        question = Question.query.order_by(Question.id).first()
+
+        response = self.client().patch(
+            "/questions/batch",
+            json={"ratings": [{"id": question.id, "rating": 99}]},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertNotEqual(Question.query.get(question.id).rating, 99)
+
+    def test_patch_question_ratings_not_objects_fail(self):
+        """Test failed batch rating change when ratings are not objects."""
+        response = self.client().patch(
+            "/questions/batch", json={"ratings": [[1, 3]]}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_delete_questions_success(self):
+        """Test successful deletion of many questions."""
+        question_ids = []
+        for answer in ("Paris", "Rome"):
+            question = Question(
+                question="What is the capital of this country?",
+                answer=answer,
+                category_id=3,
+                rating=1,
+                difficulty=1,
+            )
+            question.insert()
+            question_ids.append(question.id)
+
+        response = self.client().delete(
+            "/questions/batch", json={"question_ids": question_ids + [99999]}
+        )
+        remaining = Question.query.filter(Question.id.in_(question_ids))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("deleted"), 2)
+        self.assertEqual(
+            [result["success"] for result in response.json["results"]],
+            [True, True, False],
+        )
+        self.assertEqual(remaining.count(), 0)
+
+    def test_delete_questions_too_many_fail(self):
+        """Test failed batch deletion when too many questions are given."""
+        question_ids = list(range(1, MAX_BATCH_SIZE + 2))
+
+        response = self.client().delete(
+            "/questions/batch", json={"question_ids": question_ids}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_delete_questions_not_list_fail(self):
+        """Test failed batch deletion when the ids are not a list."""
+        total_questions = Question.query.count()
+
+        response = self.client().delete(
+            "/questions/batch", json={"question_ids": "123"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(Question.query.count(), total_questions)
+
+    def test_delete_questions_not_ints_fail(self):
+        """Test failed batch deletion when an id is not an int."""
+        total_questions = Question.query.count()
+        question = Question.query.order_by(Question.id).first()
+
+        response = self.client().delete(
+            "/questions/batch", json={"question_ids": [question.id, "x"]}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(Question.query.count(), total_questions)
+
     def test_questions_patch_not_allowed_fail(self):
         """Test that patch method is not allowed at /questions endpoint."""
         response = self.client().patch("/questions")
@@ -202,6 +748,79 @@ class QuestionTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("deleted_question_id"), question_id)
         self.assertIsNone(question)
 
+    def test_get_stats_success(self):
+        """Test that statistics match the questions they are kept for."""
+        total_questions = Question.query.count()
+        category_total = Question.query.filter(
+            Question.category_id == 1
+        ).count()
+
+        response = self.client().get("/stats")
+        categories = {
+            stats["category_id"]: stats
+            for stats in response.json.get("categories")
+        }
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("total_questions"), total_questions)
+        self.assertEqual(
+            sum(response.json.get("difficulties").values()), total_questions
+        )
+        self.assertEqual(categories[1]["total_questions"], category_total)
+
+    def test_get_stats_after_create_and_delete_success(self):
+        """Test that statistics follow created and deleted questions."""
+        new_question = {
+            "question": "How many sides does a hexagon have?",
+            "answer": "6",
+            "category_id": 1,
+            "rating": 2,
+            "difficulty": 4,
+        }
+        old_stats = self.client().get("/stats").json
+
+        response = self.client().post("/questions", json=new_question)
+        created_stats = self.client().get("/stats").json
+        self.client().delete(
+            f"/questions/{response.json.get('created_question_id')}"
+        )
+        deleted_stats = self.client().get("/stats").json
+
+        self.assertEqual(
+            created_stats["total_questions"],
+            old_stats["total_questions"] + 1,
+        )
+        self.assertEqual(
+            created_stats["difficulties"]["4"],
+            old_stats["difficulties"]["4"] + 1,
+        )
+        self.assertEqual(deleted_stats, old_stats)
+
+    def test_get_stats_after_rating_change_success(self):
+        """Test that the average rating follows a question rating change."""
+        question = Question.query.order_by(Question.id.desc()).first()
+        question_id = question.id
+        old_rating = question.rating
+        new_rating = (old_rating % 5) + 1
+        total_rating = sum(
+            rating or 0
+            for rating, in Question.query.with_entities(Question.rating)
+        )
+        expected_average = (
+            total_rating - old_rating + new_rating
+        ) / Question.query.count()
+
+        self.client().patch(
+            f"/questions/{question_id}", json={"rating": new_rating}
+        )
+        response = self.client().get("/stats")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(
+            response.json.get("average_rating"), expected_average, places=2
+        )
+
     def test_delete_question_out_of_range_fail(self):
         """Test failed questions deletion when question does not exist."""
         question_id = Question.query.order_by(Question.id.desc()).first().id
@@ -233,7 +852,7 @@ class CategoryTestCase(unittest.TestCase):
     """This class represents the test cases for the category endpoints.
 
     Attributes:
-        app: A flask app from the flaskr app
+        app: A flask app created by the flaskr app factory
         client: A test client for the flask app to while testing
         db_name: A str representing the name of the test database
         db_path: A str representing the location of the test database
@@ -241,11 +860,12 @@ class CategoryTestCase(unittest.TestCase):
 
     def setUp(self):
         """Set-up for the CategoryTestCase."""
-        self.app = app
-        self.client = self.app.test_client
         self.db_name = "trivia_test"
         self.db_path = f"{DB_DIALECT}://{DB_HOST}:{DB_PORT}/{self.db_name}"
-        setup_db(self.app, self.db_path)
+        self.app = create_app({"DATABASE_PATH": self.db_path})
+        self.client = self.app.test_client
+        db.app = self.app
+        upgrade_db()
 
     def tearDown(self):
         """Executed after each test."""
@@ -272,6 +892,33 @@ class CategoryTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("success"), True)
         self.assertEqual(category.format(), new_category)
 
+    def test_get_categories_after_create_success(self):
+        """Test that a created category is listed straight away."""
+        self.client().get("/categories")
+
+        response = self.client().post("/categories", data={"name": "test"})
+        created_category_id = response.json.get("created_category_id")
+
+        response = self.client().get("/categories")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json.get("categories").get(str(created_category_id)),
+            "test",
+        )
+
+    def test_get_categories_not_modified_success(self):
+        """Test that unchanged categories are answered with a 304."""
+        response = self.client().get("/categories")
+        etag = response.headers.get("ETag")
+
+        response = self.client().get(
+            "/categories", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
     def test_create_category_no_info_fail(self):
         """Test failed category creation when info is missing."""
         response = self.client().post("/categories")
@@ -307,15 +954,36 @@ class CategoryTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("current_category_id"), 1)
         self.assertTrue(response.json.get("categories"))
 
-    def test_get_category_questions_out_of_range_fail(self):
-        """Test failed category question retrieval if page is out of range."""
-        total_pages = -(
-            -Question.query.filter(Question.category_id == 1).count()
-            // QUESTIONS_PER_PAGE
+    def test_get_category_questions_after_id_success(self):
+        """Test successful retrieval of category questions after an id."""
+        question_id = (
+            Question.query.filter(Question.category_id == 1)
+            .order_by(Question.id)
+            .first()
+            .id
         )
 
         response = self.client().get(
-            f"/categories/1/questions?page={total_pages+1}"
+            f"/categories/1/questions?after_id={question_id}"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertNotIn(
+            question_id,
+            [question["id"] for question in response.json.get("questions")],
+        )
+        self.assertIsNone(response.json.get("next_cursor"))
+
+    def test_get_category_questions_out_of_range_fail(self):
+        """Test failed category question retrieval if page is out of range."""
+        total_pages = -(
+            -Question.query.filter(Question.category_id == 1).count()
+            // QUESTIONS_PER_PAGE
+        )
+
+        response = self.client().get(
+            f"/categories/1/questions?page={total_pages+1}"
         )
 
         self.assertEqual(response.status_code, 404)
@@ -351,7 +1019,7 @@ class QuizTestCase(unittest.TestCase):
     """This class represents the test cases for the quiz endpoints.
 
     Attributes:
-        app: A flask app from the flaskr app
+        app: A flask app created by the flaskr app factory
         client: A test client for the flask app to while testing
         db_name: A str representing the name of the test database
         db_path: A str representing the location of the test database
@@ -359,11 +1027,12 @@ class QuizTestCase(unittest.TestCase):
 
     def setUp(self):
         """Set-up for the QuizTestCase."""
-        self.app = app
-        self.client = self.app.test_client
         self.db_name = "trivia_test"
         self.db_path = f"{DB_DIALECT}://{DB_HOST}:{DB_PORT}/{self.db_name}"
-        setup_db(self.app, self.db_path)
+        self.app = create_app({"DATABASE_PATH": self.db_path})
+        self.client = self.app.test_client
+        db.app = self.app
+        upgrade_db()
 
     def tearDown(self):
         """Executed after each test."""
@@ -415,6 +1084,135 @@ class QuizTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("success"), True)
         self.assertIsNone(response.json.get("question"))
 
+    def test_create_quiz_excludes_previous_success(self):
+        """Test that a quiz never repeats a previous question."""
+        total_questions = Question.query.count()
+        previous_question_ids = []
+
+        for _ in range(total_questions):
+            quiz = {
+                "quiz_category_id": 0,
+                "previous_question_ids": previous_question_ids,
+            }
+            response = self.client().post("/quizzes", json=quiz)
+            question_id = response.json.get("question")["id"]
+
+            self.assertNotIn(question_id, previous_question_ids)
+            previous_question_ids.append(question_id)
+
+        response = self.client().post("/quizzes", json=quiz)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json.get("question"))
+
+    def test_create_quiz_excludes_other_categories_success(self):
+        """Test that questions asked in other categories don't end a quiz."""
+        total_questions = Question.query.filter(
+            Question.category_id == 1
+        ).count()
+        question_ids = [
+            question.id
+            for question in Question.query.filter(
+                Question.category_id != 1
+            ).limit(total_questions)
+        ]
+        app = create_app({"DATABASE_PATH": self.db_path})
+
+        quiz = {
+            "quiz_category_id": 1,
+            "previous_question_ids": question_ids,
+        }
+
+        response = app.test_client().post("/quizzes", json=quiz)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("question")["category_id"], 1)
+
+    def test_create_quiz_difficulty_range_success(self):
+        """Test that a quiz only picks questions of the given difficulties."""
+        question = Question.query.filter(Question.category_id == 1).first()
+        question_id = question.id
+        difficulty = question.difficulty
+        question_ids = [
+            question.id
+            for question in Question.query.filter(
+                Question.category_id == 1, Question.difficulty == difficulty
+            )
+            if question.id != question_id
+        ]
+
+        quiz = {
+            "quiz_category_id": 1,
+            "previous_question_ids": question_ids,
+            "min_difficulty": difficulty,
+            "max_difficulty": difficulty,
+        }
+
+        response = self.client().post("/quizzes", json=quiz)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("question")["id"], question_id)
+
+    def test_create_quiz_rating_bias_success(self):
+        """Test that a rating bias favors questions by their rating."""
+        pool = QuestionPool(loader=lambda category_id: [(1, 3, 1), (2, 3, 5)])
+        picks = [pool.choose(1, set(), rating_bias=1) for _ in range(600)]
+
+        pool.update_rating(1, 1, 5)
+        pool.update_rating(2, 1, 1)
+        updated_picks = [
+            pool.choose(1, set(), rating_bias=1) for _ in range(600)
+        ]
+
+        self.assertGreater(picks.count(2), 400)
+        self.assertGreater(updated_picks.count(1), 400)
+        self.assertEqual(pool.choose(1, {1}, range(3, 4), 1), 2)
+        self.assertIsNone(pool.choose(1, set(), range(4, 6), 1))
+
+    def test_create_quiz_invalid_difficulty_fail(self):
+        """Test failed quiz creation when the difficulty range is empty."""
+        quiz = {
+            "quiz_category_id": 1,
+            "previous_question_ids": [],
+            "min_difficulty": 4,
+            "max_difficulty": 2,
+        }
+
+        response = self.client().post("/quizzes", json=quiz)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_create_quiz_invalid_rating_bias_fail(self):
+        """Test failed quiz creation when the rating bias is too large."""
+        quiz = {
+            "quiz_category_id": 1,
+            "previous_question_ids": [],
+            "rating_bias": 100,
+        }
+
+        response = self.client().post("/quizzes", json=quiz)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_create_quiz_invalid_category_fail(self):
+        """Test failed quiz creation when the category is not an int."""
+        quiz = {
+            "quiz_category_id": "M155P311ED",
+            "previous_question_ids": [],
+        }
+
+        response = self.client().post("/quizzes", json=quiz)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
     def test_create_quiz_no_info_fail(self):
         """Test failed quiz creation when info is missing."""
         response = self.client().post("/quizzes")
@@ -423,6 +1221,94 @@ class QuizTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("success"), False)
         self.assertEqual(response.json.get("message"), "Bad Request")
 
+    def test_create_quiz_session_success(self):
+        """Test the successful creation of a quiz session."""
+        total_questions = Question.query.filter(
+            Question.category_id == 1
+        ).count()
+
+        quiz = {"quiz_category_id": 1}
+
+        response = self.client().post("/quizzes/sessions", json=quiz)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertTrue(response.json.get("session_id"))
+        self.assertEqual(response.json.get("total_questions"), total_questions)
+
+    def test_create_quiz_session_no_info_fail(self):
+        """Test failed quiz session creation when info is missing."""
+        response = self.client().post("/quizzes/sessions", json={})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_next_quiz_question_success(self):
+        """Test that a quiz session deals each question only once."""
+        quiz = {"quiz_category_id": 0, "max_questions": 5}
+        response = self.client().post("/quizzes/sessions", json=quiz)
+        session_id = response.json.get("session_id")
+        question_ids = set()
+
+        for _ in range(5):
+            response = self.client().post(
+                f"/quizzes/sessions/{session_id}/next"
+            )
+            question_ids.add(response.json.get("question")["id"])
+
+        response = self.client().post(f"/quizzes/sessions/{session_id}/next")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertIsNone(response.json.get("question"))
+        self.assertEqual(len(question_ids), 5)
+
+    def test_next_quiz_question_no_session_fail(self):
+        """Test failed quiz question retrieval when session does not exist."""
+        response = self.client().post("/quizzes/sessions/M155P311ED/next")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Not Found")
+
+    def test_delete_quiz_session_success(self):
+        """Test successful deletion of a quiz session."""
+        quiz = {"quiz_category_id": 1}
+        response = self.client().post("/quizzes/sessions", json=quiz)
+        session_id = response.json.get("session_id")
+
+        response = self.client().delete(f"/quizzes/sessions/{session_id}")
+        next_response = self.client().post(
+            f"/quizzes/sessions/{session_id}/next"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("deleted_session_id"), session_id)
+        self.assertEqual(next_response.status_code, 404)
+
+    def test_delete_quiz_session_no_session_fail(self):
+        """Test failed quiz session deletion when session does not exist."""
+        response = self.client().delete("/quizzes/sessions/M155P311ED")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Not Found")
+
+    def test_session_store_incomplete_backend_fail(self):
+        """Test that a session store missing methods cannot be created."""
+
+        class CreateOnlyStore(SessionStore):  # pylint: disable=abstract-method
+            """A session store that only implements create."""
+
+            def create(self, deck):
+                """Hands out the same session id every time."""
+                return "session"
+
+        with self.assertRaises(TypeError):
+            CreateOnlyStore()
+
     def test_quizzes_get_not_allowed_fail(self):
         """Test that get method is not allowed at /quizzes endpoint."""
         response = self.client().get("/quizzes")
@@ -452,7 +1338,7 @@ class UserTestCase(unittest.TestCase):
     """This class represents the test cases for the user endpoints.
 
     Attributes:
-        app: A flask app from the flaskr app
+        app: A flask app created by the flaskr app factory
         client: A test client for the flask app to while testing
         db_name: A str representing the name of the test database
         db_path: A str representing the location of the test database
@@ -460,11 +1346,12 @@ class UserTestCase(unittest.TestCase):
 
     def setUp(self):
         """Set-up for the UserTestCase."""
-        self.app = app
-        self.client = self.app.test_client
         self.db_name = "trivia_test"
         self.db_path = f"{DB_DIALECT}://{DB_HOST}:{DB_PORT}/{self.db_name}"
-        setup_db(self.app, self.db_path)
+        self.app = create_app({"DATABASE_PATH": self.db_path})
+        self.client = self.app.test_client
+        db.app = self.app
+        upgrade_db()
 
     def tearDown(self):
         """Executed after each test."""
@@ -537,6 +1424,83 @@ class UserTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("new_score"), old_score + 2)
         self.assertGreaterEqual(user.score, 2)
 
+    def test_patch_user_score_concurrent_success(self):
+        """Test that concurrent score changes are never lost."""
+        user_id = User.query.order_by(User.id.desc()).first().id
+        old_score = User.query.get(user_id).score
+        increments = 2000
+
+        def patch_score(_):
+            return self.client().patch(f"/users/{user_id}", json={"score": 1})
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(patch_score, range(increments)))
+
+        user = User.query.get(user_id)
+
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(user.score, old_score + increments)
+
+    def test_score_aggregator_flush_success(self):
+        """Test that aggregated score changes are all flushed to the db."""
+        user_id = User.query.order_by(User.id.desc()).first().id
+        old_score = User.query.get(user_id).score
+        increments = 2000
+        aggregator = ScoreAggregator()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(
+                executor.map(
+                    lambda _: aggregator.add(user_id, 1), range(increments)
+                )
+            )
+
+        aggregator.flush()
+
+        user = User.query.get(user_id)
+
+        self.assertEqual(aggregator.get(user_id), 0)
+        self.assertEqual(user.score, old_score + increments)
+
+    def test_patch_user_score_write_behind_success(self):
+        """Test that write-behind scores count every delta exactly once."""
+        user_id = User.query.order_by(User.id.desc()).first().id
+        old_score = User.query.get(user_id).score
+        increments = 500
+        aggregator = ScoreAggregator()
+        app = create_app(
+            {"DATABASE_PATH": self.db_path, "SCORE_AGGREGATOR": aggregator}
+        )
+
+        def patch_score(_):
+            return app.test_client().patch(
+                f"/users/{user_id}", json={"score": 1}
+            )
+
+        def flush(_):
+            with app.app_context():
+                aggregator.flush()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            flushes = executor.map(flush, range(50))
+            responses = list(executor.map(patch_score, range(increments)))
+            list(flushes)
+
+        new_scores = sorted(
+            response.json.get("new_score") for response in responses
+        )
+        with app.app_context():
+            rank = app.config["LEADERBOARD"].rank(user_id)
+            aggregator.flush()
+
+        self.assertEqual(
+            new_scores,
+            list(range(old_score + 1, old_score + increments + 1)),
+        )
+        self.assertEqual(rank["score"], old_score + increments)
+        self.assertEqual(User.query.get(user_id).score, old_score + increments)
+
     def test_patch_user_score_out_of_range_fail(self):
         """Test failed user score change when user does not exist."""
         user_id = User.query.order_by(User.id.desc()).first().id
@@ -561,6 +1525,71 @@ class UserTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("success"), False)
         self.assertEqual(response.json.get("message"), "Bad Request")
 
+    def test_get_leaderboard_success(self):
+        """Test successful retrieval of the leaderboard."""
+        response = self.client().get("/leaderboard?limit=2")
+        scores = [user["score"] for user in response.json.get("leaderboard")]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(len(scores), 2)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(response.json.get("leaderboard")[0]["rank"], 1)
+        self.assertEqual(response.json.get("total_users"), User.query.count())
+
+    def test_get_leaderboard_write_behind_success(self):
+        """Test that unflushed score changes are ranked on the leaderboard."""
+        top_user = User.query.order_by(User.score.desc()).first()
+        user = User.query.order_by(User.score).first()
+        aggregator = ScoreAggregator()
+        app = create_app(
+            {"DATABASE_PATH": self.db_path, "SCORE_AGGREGATOR": aggregator}
+        )
+        aggregator.add(user.id, top_user.score - user.score + 1)
+        aggregator.add(top_user.id, -1)
+
+        response = app.test_client().get("/leaderboard?limit=1")
+        leader = response.json.get("leaderboard")[0]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(leader["id"], user.id)
+        self.assertEqual(leader["score"], top_user.score + 1)
+        self.assertEqual(User.query.get(user.id).score, user.score)
+
+    def test_get_leaderboard_invalid_limit_fail(self):
+        """Test failed leaderboard retrieval when the limit is too small."""
+        response = self.client().get("/leaderboard?limit=0")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Bad Request")
+
+    def test_get_user_rank_success(self):
+        """Test successful retrieval of a user's rank after a score change."""
+        top_user = User.query.order_by(User.score.desc()).first()
+        user = User.query.order_by(User.score).first()
+        self.client().get(f"/leaderboard/{user.id}")
+
+        score = {"score": top_user.score - user.score + 1}
+        self.client().patch(f"/users/{user.id}", json=score)
+
+        response = self.client().get(f"/leaderboard/{user.id}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("user")["id"], user.id)
+        self.assertEqual(response.json.get("user")["rank"], 1)
+
+    def test_get_user_rank_out_of_range_fail(self):
+        """Test failed user rank retrieval when user does not exist."""
+        user_id = User.query.order_by(User.id.desc()).first().id
+
+        response = self.client().get(f"/leaderboard/{user_id+1}")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json.get("success"), False)
+        self.assertEqual(response.json.get("message"), "Not Found")
+
     def test_user_get_method_not_allowed_fail(self):
         """Test that get method is not allowed at /users/id endpoint."""
         response = self.client().get("/users/1")
@@ -586,5 +1615,374 @@ class UserTestCase(unittest.TestCase):
         self.assertEqual(response.json.get("message"), "Method Not Allowed")
 
 
+class DbTestCase(unittest.TestCase):
+    """This class represents the test cases for the db set-up.
+
+    Attributes:
+        app: A flask app created by the flaskr app factory
+        client: A test client for the flask app to while testing
+        db_name: A str representing the name of the test database
+        db_path: A str representing the location of the test database
+    """
+
+    def setUp(self):
+        """Set-up for the DbTestCase."""
+        self.db_name = "trivia_test"
+        self.db_path = f"{DB_DIALECT}://{DB_HOST}:{DB_PORT}/{self.db_name}"
+        self.app = create_app({"DATABASE_PATH": self.db_path})
+        self.client = self.app.test_client
+        db.app = self.app
+        upgrade_db()
+
+    def tearDown(self):
+        """Executed after each test."""
+
+    def test_upgrade_db_up_to_date_success(self):
+        """Test that migrations are only applied once."""
+        applied = upgrade_db()
+
+        self.assertEqual(applied, [])
+
+    def test_check_indexes_success(self):
+        """Test that every hot query is served by an index."""
+        results = check_indexes()
+
+        self.assertTrue(results)
+        for hot_query, plan, uses_index in results:
+            self.assertTrue(uses_index, f"{hot_query.name}: {plan}")
+
+    def test_get_db_health_success(self):
+        """Test successful retrieval of the connection pool's state."""
+        response = self.client().get("/health/db")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertIn("checkouts", response.json.get("pool"))
+        self.assertIn("checkout_wait_max_ms", response.json.get("pool"))
+
+    def create_replica_app(self, directory, question):
+        """Creates an app reading from a replica that lags behind the primary.
+
+        Args:
+            directory: A str representing the folder to keep the replica in
+            question: A dict representing the only question on the replica
+
+        Returns:
+            app: A flask app whose read-only endpoints read from the replica
+        """
+        replica_path = f"sqlite:///{os.path.join(directory, 'replica.db')}"
+        app = create_app(
+            {
+                "DATABASE_PATH": self.db_path,
+                "DATABASE_REPLICAS": [replica_path],
+            }
+        )
+
+        with app.app_context():
+            replica = db.get_engine(app, bind=replica_bind_key(0))
+            db.Model.metadata.create_all(replica)
+            replica.execute(Category.__table__.insert(), id=1, name="Science")
+            replica.execute(Question.__table__.insert(), id=1, **question)
+            replica.execute(
+                CategoryStats.__table__.insert(),
+                category_id=1,
+                question_count=1,
+                rating_total=question["rating"],
+                **{f"difficulty_{question['difficulty']}": 1},
+            )
+
+        return app
+
+    def test_get_questions_from_replica_success(self):
+        """Test that reads go to a replica until the client writes."""
+        new_question = {
+            "question": "Which planet is known as the Red Planet?",
+            "answer": "Mars",
+            "category_id": 1,
+            "rating": 3,
+            "difficulty": 1,
+        }
+
+        with tempfile.TemporaryDirectory() as directory:
+            client = self.create_replica_app(
+                directory, new_question
+            ).test_client()
+
+            replica_response = client.get("/questions")
+            created_response = client.post("/questions", json=new_question)
+            primary_response = client.get("/questions")
+            client.delete(
+                f"/questions/{created_response.json['created_question_id']}"
+            )
+
+        self.assertEqual(replica_response.status_code, 200)
+        self.assertEqual(replica_response.json.get("total_questions"), 1)
+        self.assertEqual(
+            replica_response.json.get("questions")[0]["answer"], "Mars"
+        )
+        self.assertIn(
+            STICKY_COOKIE, created_response.headers.get("Set-Cookie")
+        )
+        self.assertGreater(primary_response.json.get("total_questions"), 1)
+
+    def test_get_questions_replica_page_not_cached_success(self):
+        """Test that a page read from a replica is not served after a write."""
+        new_question = {
+            "question": "Which planet is known as the Red Planet?",
+            "answer": "Mars",
+            "category_id": 1,
+            "rating": 3,
+            "difficulty": 1,
+        }
+
+        with tempfile.TemporaryDirectory() as directory:
+            app = self.create_replica_app(directory, new_question)
+            writer = app.test_client()
+            reader = app.test_client()
+
+            created_response = writer.post("/questions", json=new_question)
+
+            with app.app_context():
+                total_questions = Question.query.count()
+
+            replica_response = reader.get("/questions")
+            primary_response = writer.get("/questions")
+            writer.delete(
+                f"/questions/{created_response.json['created_question_id']}"
+            )
+
+        self.assertEqual(replica_response.json.get("total_questions"), 1)
+        self.assertEqual(
+            primary_response.json.get("total_questions"), total_questions
+        )
+
+    def test_get_questions_unhealthy_replica_success(self):
+        """Test that reads go to the primary when no replica is healthy."""
+        total_questions = Question.query.count()
+        app = create_app(
+            {
+                "DATABASE_PATH": self.db_path,
+                "DATABASE_REPLICAS": ["sqlite:////nonexistent/replica.db"],
+            }
+        )
+
+        response = app.test_client().get("/questions")
+        health_response = app.test_client().get("/health/db")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("total_questions"), total_questions)
+        self.assertEqual(
+            health_response.json.get("replicas"),
+            [{"bind_key": replica_bind_key(0), "healthy": False}],
+        )
+
+    def test_create_app_without_db_success(self):
+        """Test that building the app does not connect to the db."""
+        unreachable_path = f"{DB_DIALECT}://{DB_HOST}:1/{self.db_name}"
+
+        app = create_app({"DATABASE_PATH": unreachable_path})
+
+        self.assertEqual(app.extensions["sqlalchemy"].connectors, {})
+        self.assertIn("api", app.blueprints)
+
+    def test_create_app_caches_not_shared_success(self):
+        """Test that every app keeps caches of its own."""
+        self.client().get("/categories")
+
+        app = create_app({"DATABASE_PATH": self.db_path})
+
+        for name in (
+            "CATEGORY_CACHE",
+            "QUESTION_POOL",
+            "SEARCH_INDEX",
+            "LEADERBOARD",
+        ):
+            self.assertIsNot(app.config[name], self.app.config[name])
+        self.assertIsNotNone(self.app.config["CATEGORY_CACHE"].state)
+        self.assertIsNone(app.config["CATEGORY_CACHE"].state)
+
+    def test_migrate_command_success(self):
+        """Test that the migrate command reports an up to date db."""
+        result = self.app.test_cli_runner().invoke(args=["migrate"])
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("already up to date", result.output)
+
+    def test_get_cache_health_success(self):
+        """Test successful retrieval of the response cache's counters."""
+        self.client().get("/questions")
+
+        response = self.client().get("/health/cache")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json.get("success"), True)
+        self.assertEqual(response.json.get("cache").get("misses"), 1)
+        self.assertEqual(response.json.get("cache").get("entries"), 1)
+
+    def test_get_metrics_success(self):
+        """Test that requests and their SQL statements show up in metrics."""
+        self.client().get("/categories")
+
+        response = self.client().get("/metrics")
+        text = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/plain")
+        self.assertIn(
+            'trivia_requests_total{endpoint="get_categories",method="GET",'
+            'status="200"}',
+            text,
+        )
+        self.assertIn(
+            'trivia_request_duration_seconds_count{endpoint="get_categories",'
+            'method="GET"}',
+            text,
+        )
+        self.assertIn(
+            'trivia_request_sql_statements_count{endpoint="get_categories"}',
+            text,
+        )
+
+    def test_get_metrics_streamed_export_success(self):
+        """Test that statements run while a response streams are counted."""
+        app = create_app({"DATABASE_PATH": self.db_path})
+        client = app.test_client()
+
+        export = client.get("/questions/export")
+        export.get_data()
+        export.close()
+
+        statements = app.config["METRICS"].statements
+        text = client.get("/metrics").get_data(as_text=True)
+
+        self.assertEqual(export.status_code, 200)
+        self.assertGreaterEqual(
+            statements["export_questions_download"].total, 1
+        )
+        self.assertIn(
+            'trivia_requests_total{endpoint="export_questions_download",'
+            'method="GET",status="200"} 1',
+            text,
+        )
+
+    def test_get_metrics_not_shared_success(self):
+        """Test that apps in one process keep their own metrics."""
+        app = create_app({"DATABASE_PATH": self.db_path})
+        other_app = create_app({"DATABASE_PATH": self.db_path})
+
+        app.test_client().get("/categories")
+        text = other_app.test_client().get("/metrics").get_data(as_text=True)
+
+        self.assertIsNot(app.config["METRICS"], other_app.config["METRICS"])
+        self.assertIsNot(
+            app.config["POOL_STATS"], other_app.config["POOL_STATS"]
+        )
+        self.assertNotIn('endpoint="get_categories"', text)
+
+    def test_slow_query_logged_success(self):
+        """Test that statements slower than the threshold are logged."""
+        app = create_app(
+            {"DATABASE_PATH": self.db_path, "METRICS_SLOW_QUERY_SECONDS": 0}
+        )
+
+        with self.assertLogs("flaskr.metrics", "WARNING") as logs:
+            response = app.test_client().get("/categories")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Slow query", logs.output[0])
+
+    def test_lru_response_cache_size_bound_success(self):
+        """Test that the least recently used page is evicted when full."""
+        cache = LruResponseCache(max_entries=2)
+
+        for key in ("a", "b", "a", "c"):
+            page, token = cache.get(key, 1)
+            if page is None:
+                cache.set(key, 1, {"body": key}, token)
+
+        self.assertEqual(list(cache.pages), ["a", "c"])
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_response_cache_incomplete_backend_fail(self):
+        """Test that a cache backend missing methods cannot be created."""
+
+        class GetOnlyCache(ResponseCache):  # pylint: disable=abstract-method
+            """A cache backend that only implements get."""
+
+            def get(self, key, scope):
+                """Misses every lookup."""
+                return None, None
+
+        with self.assertRaises(TypeError):
+            GetOnlyCache()
+
+    def test_import_questions_command_success(self):
+        """Test that the import-questions command imports a file."""
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False
+        ) as questions_file:
+            questions_file.write(
+                "question,answer,category_id,rating,difficulty\n"
+                "What is the capital of Australia?,Canberra,3,3,3\n"
+            )
+
+        try:
+            result = self.app.test_cli_runner().invoke(
+                args=["import-questions", questions_file.name]
+            )
+        finally:
+            os.remove(questions_file.name)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Batch 1: 1 rows", result.output)
+        self.assertIn("Imported 1 questions, rejected 0 rows", result.output)
+
+    def test_export_questions_command_success(self):
+        """Test that the export-questions command writes a file."""
+        total_questions = Question.query.count()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "questions.csv")
+            result = self.app.test_cli_runner().invoke(
+                args=["export-questions", path]
+            )
+
+            with open(path) as questions_file:
+                lines = questions_file.read().splitlines()
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(len(lines) - 1, total_questions)
+
+    def test_load_engine_settings_success(self):
+        """Test that engine settings are parsed from the environment."""
+        environ = {"DB_POOL_SIZE": "20", "DB_POOL_PRE_PING": "true"}
+
+        settings = load_engine_settings(environ)
+
+        self.assertEqual(settings, {"pool_size": 20, "pool_pre_ping": True})
+
+    def test_build_engine_options_success(self):
+        """Test that engine settings are translated into engine options."""
+        settings = {"pool_size": 20, "statement_timeout": 5000}
+
+        options = build_engine_options(self.db_path, settings)
+
+        self.assertEqual(options.get("pool_size"), 20)
+        self.assertEqual(
+            options.get("connect_args"),
+            {"options": "-c statement_timeout=5000"},
+        )
+
+    def test_build_engine_options_pgbouncer_success(self):
+        """Test that pgbouncer mode avoids unsupported startup parameters."""
+        settings = {"pgbouncer": True, "statement_timeout": 5000}
+
+        options = build_engine_options(self.db_path, settings)
+
+        self.assertNotIn("connect_args", options)
+        self.assertTrue(options.get("pool_pre_ping"))
+
+
 if __name__ == "__main__":
     unittest.main()